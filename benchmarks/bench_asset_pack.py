@@ -0,0 +1,115 @@
+"""
+角色素材載入基準測試：CharacterLoader 的中繼資料讀取，原始檔案 vs .l2dpack 封裝檔
+
+量測 App 實際經由 CharacterLoader 做的事（模型設定、所有動作的 Meta、遮罩使用量）：
+- loose：讀取 model3.json、逐一開啟動作檔解析 Meta、遮罩使用量取自快取目錄（第一次需解析 .moc3）
+- pack (open)：每輪重新開啟封裝檔（open + mmap + 解析索引 + 來源過期檢查）後讀取相同資料
+- pack (shared)：重複使用已開啟的共用封裝檔（App 中同一角色的第二個之後的 CharacterLoader）
+
+繪製端（live2d-py 的 LoadModelJson：moc3、貼圖、動作曲線）在兩種情況下都讀取原始檔案，不在量測範圍內；
+封裝檔只加速上述中繼資料。
+
+cold 在每輪前以 posix_fadvise(DONTNEED) 將檔案移出頁面快取（不支援 posix_fadvise 的平台，例如 Windows，會略過）。
+
+使用方式：
+    python -m src.asset_pack build --all
+    python benchmarks/bench_asset_pack.py --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.asset_pack import build_pack, close_shared_packs, collect_runtime_files, pack_path_for  # noqa: E402
+from src.character_library import get_available_characters  # noqa: E402
+from src.character_loader import CharacterLoader  # noqa: E402
+
+
+def drop_cache(paths):
+    """將檔案移出作業系統頁面快取（模擬冷啟動）"""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def load_metadata(model_path: Path, use_pack: bool) -> int:
+    """App 載入角色時經由 CharacterLoader 讀取的中繼資料；回傳動作數"""
+    loader = CharacterLoader(model_path, use_pack=use_pack)
+    loader.load_model_config()
+    metas = loader.get_motion_meta()
+    loader.get_mask_info()
+    return sum(len(m) for m in metas.values())
+
+
+def load_loose(model_path: Path) -> int:
+    return load_metadata(model_path, use_pack=False)
+
+
+def load_pack_open(model_path: Path) -> int:
+    close_shared_packs()
+    return load_metadata(model_path, use_pack=True)
+
+
+def load_pack_shared(model_path: Path) -> int:
+    return load_metadata(model_path, use_pack=True)
+
+
+def measure(fn, arg, files, repeat: int, cold: bool):
+    samples = []
+    for _ in range(repeat):
+        if cold:
+            drop_cache(files)
+        t0 = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="角色素材載入基準測試（中繼資料）")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--rebuild", action="store_true", help="先重新建置封裝檔")
+    args = parser.parse_args()
+
+    print(f"{'character':<14} {'motions':>7} {'loose cold':>11} {'pack cold':>10} "
+          f"{'loose warm':>11} {'pack warm':>10} {'pack shared':>12}")
+    can_drop = hasattr(os, "posix_fadvise")
+    for character in get_available_characters():
+        model_path = character.model_path
+        pack_path = pack_path_for(model_path)
+        if args.rebuild or not pack_path.exists():
+            build_pack(model_path)
+        loose_files = [model_path.parent / n for n in collect_runtime_files(model_path, warn=False)]
+        motions = load_loose(model_path)  # 暖機（遮罩使用量寫入快取目錄）
+
+        loose_warm = measure(load_loose, model_path, loose_files, args.repeat, cold=False)
+        pack_warm = measure(load_pack_open, model_path, [pack_path], args.repeat, cold=False)
+        loose_cold = measure(load_loose, model_path, loose_files, args.repeat, cold=can_drop)
+        pack_cold = measure(load_pack_open, model_path, [pack_path], args.repeat, cold=can_drop)
+        load_pack_shared(model_path)
+        pack_shared = measure(load_pack_shared, model_path, [], args.repeat, cold=False)
+        print(
+            f"{character.id:<14} {motions:>7} {loose_cold:>9.2f}ms {pack_cold:>8.2f}ms "
+            f"{loose_warm:>9.2f}ms {pack_warm:>8.2f}ms {pack_shared:>10.2f}ms"
+        )
+    close_shared_packs()
+    if not can_drop:
+        print("（此平台不支援 posix_fadvise，cold 欄位等同 warm）")
+    print("（繪製端的 LoadModelJson 兩種情況都讀取原始檔案，未列入）")
+
+
+if __name__ == "__main__":
+    main()
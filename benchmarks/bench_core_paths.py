@@ -0,0 +1,312 @@
+"""
+純 Python 路徑基準測試（互動推斷、角色素材庫、角色載入、泡泡框文字格式化）
+
+以固定亂數種子產生大型合成輸入，每個案例取多個樣本的中位數（每個樣本至少 50 ms、量測時停用 GC）並與 baselines/core_paths.json 比較；
+任一案例比基準慢超過門檻（預設 30%）時以結束碼 1 結束，可直接放進 CI。
+為降低不同機器間（以及同一台機器忽快忽慢）的差異，每個樣本前先執行一段固定的純 Python 校正工作，
+基準記錄案例與校正工作的時間比，比較時只比這個比值。
+不需要顯示環境（ChatBubble._format_text 不使用 widget 狀態，只需能 import PyQt6）。
+
+使用方式：
+    python benchmarks/bench_core_paths.py                    # 與基準比較
+    python benchmarks/bench_core_paths.py --update-baseline  # 重新記錄基準
+    python benchmarks/bench_core_paths.py --only interaction --threshold 0.4
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import math
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src import character_library  # noqa: E402
+from src.character_interaction import CharacterInteraction  # noqa: E402
+from src.character_loader import CharacterLoader  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "core_paths.json"
+
+_PART_WORDS = (
+    "Head Face Hair Eye Brow Hat Mouth Arm Hand Wand Leg Robe Body Chest Bust Belly Stomach "
+    "Core Cheek Ear Neck Skirt Ribbon Tail Wing Sleeve Shoe Glove Cape Bag"
+).split()
+
+
+# ---- 合成輸入 ----
+
+def synthetic_part_ids(n: int, rng: random.Random) -> List[str]:
+    """HitPart 回傳的 PartId（大多能對應到互動區域，約 1/5 落到預設值）"""
+    ids = []
+    for i in range(n):
+        if rng.random() < 0.2:
+            ids.append(f"Part{rng.choice(['Misc', 'Effect', 'Light', 'Shadow'])}{i:04d}")
+        else:
+            side = rng.choice(["", "L", "R"])
+            ids.append(f"Part{rng.choice(_PART_WORDS)}{side}{i % 97:02d}")
+    return ids
+
+
+def write_synthetic_characters(root: Path, count: int, rng: random.Random) -> List[Path]:
+    """建立 count 個角色的 runtime 目錄（model3.json + 動作 / 表情檔）"""
+    paths = []
+    for i in range(count):
+        runtime = root / f"char_{i:03d}" / f"char_{i:03d}" / "runtime"
+        (runtime / "motions").mkdir(parents=True)
+        (runtime / "expressions").mkdir()
+        motions: Dict[str, List[Dict]] = {}
+        for group in ("Idle", "", "Tap", "Flick"):
+            entries = []
+            for j in range(rng.randint(2, 8)):
+                name = f"motions/{group or 'default'}_{j:02d}.motion3.json"
+                meta = {"Duration": round(rng.uniform(1.0, 8.0), 3), "Fps": 30.0, "Loop": group == "Idle"}
+                (runtime / name).write_text(json.dumps({"Version": 3, "Meta": meta}), encoding="utf-8")
+                entries.append({"File": name})
+            motions[group] = entries
+        expressions = []
+        for j in range(rng.randint(4, 12)):
+            name = f"expressions/exp_{j:02d}.exp3.json"
+            (runtime / name).write_text('{"Type":"Live2D Expression","Parameters":[]}', encoding="utf-8")
+            expressions.append({"Name": f"exp_{j:02d}", "File": name})
+        model = {
+            "Version": 3,
+            "FileReferences": {
+                "Moc": f"char_{i:03d}.moc3",
+                "Textures": [f"char_{i:03d}.2048/texture_{t:02d}.png" for t in range(rng.randint(1, 4))],
+                "Physics": f"char_{i:03d}.physics3.json",
+                "Expressions": expressions,
+                "Motions": motions,
+            },
+            "HitAreas": [{"Id": "HitAreaHead", "Name": "Head"}, {"Id": "HitAreaBody", "Name": "Body"}],
+        }
+        path = runtime / f"char_{i:03d}.model3.json"
+        path.write_text(json.dumps(model, ensure_ascii=False, indent=1), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def write_library_layout(root: Path):
+    """複製內建角色素材庫的目錄結構（只有 model3.json），供 _build_characters 掃描"""
+    for folder, name in (
+        ("mao_pro_en", "mao_pro.model3.json"),
+        ("hiyori_pro_zh", "hiyori_pro_t11.model3.json"),
+        ("miku_pro_jp", "miku_sample_t04.model3.json"),
+    ):
+        runtime = root / folder / folder / "runtime"
+        runtime.mkdir(parents=True)
+        (runtime / name).write_text("{}", encoding="utf-8")
+
+
+def synthetic_json_reply(n_items: int, rng: random.Random) -> str:
+    items = [
+        {
+            "id": i,
+            "name": f"項目 {i}",
+            "tags": [rng.choice(_PART_WORDS) for _ in range(4)],
+            "score": round(rng.random(), 4),
+            "nested": {"ok": bool(i % 2), "note": "說明文字 " * 3},
+        }
+        for i in range(n_items)
+    ]
+    return json.dumps({"results": items, "count": n_items}, ensure_ascii=False)
+
+
+def synthetic_markdown_reply(sections: int) -> str:
+    body = []
+    for n in range(sections):
+        body.append(
+            f"## 第 {n} 節\n\n這是一段說明，包含 **粗體** 與 `code()`。\n\n"
+            f"- 重點一\n- 重點二\n\n```python\ndef f_{n}(x):\n    return x * {n}\n```\n"
+        )
+    return "\n".join(body)
+
+
+# ---- 案例 ----
+
+def build_cases(tmp: Path, seed: int) -> Dict[str, Callable[[], object]]:
+    rng = random.Random(seed)
+    cases: Dict[str, Callable[[], object]] = {}
+
+    interaction = CharacterInteraction()
+    part_ids = synthetic_part_ids(5000, rng)
+    cases["interaction.get_interaction_for_part[5000]"] = lambda: [
+        interaction.get_interaction_for_part(p) for p in part_ids
+    ]
+
+    library_root = tmp / "library"
+    write_library_layout(library_root)
+
+    def build_library():
+        original = character_library.PROJECT_ROOT
+        character_library.PROJECT_ROOT = library_root
+        try:
+            for _ in range(200):
+                character_library._build_characters()
+        finally:
+            character_library.PROJECT_ROOT = original
+
+    cases["library._build_characters[x200]"] = build_library
+
+    model_paths = write_synthetic_characters(tmp / "characters", 300, rng)
+
+    def resolve_paths():
+        for path in model_paths:
+            loader = CharacterLoader(path, use_pack=False)
+            loader.load_model_config()
+            loader.get_moc_path()
+            loader.get_texture_paths()
+            loader.get_motions_path()
+            loader.get_expressions_path()
+
+    cases["loader.paths[300 characters]"] = resolve_paths
+    cases["loader.get_motion_meta[300 characters]"] = lambda: [
+        CharacterLoader(path, use_pack=False).get_motion_meta() for path in model_paths
+    ]
+    cases["interaction.load_hit_areas[300 characters]"] = lambda: [
+        CharacterInteraction(path) for path in model_paths
+    ]
+
+    try:
+        from src.chat_bubble import ChatBubble
+    except ImportError as e:
+        print(f"略過 ChatBubble 案例（{e}）")
+    else:
+        # _format_text 不使用 widget 狀態，直接以未綁定方式呼叫，不需建立 QApplication
+        format_text = ChatBubble._format_text
+        json_reply = synthetic_json_reply(2000, rng)
+        markdown_reply = synthetic_markdown_reply(400)
+        bracket_reply = "[注意] " + markdown_reply  # 以 [ 開頭但不是 JSON：會嘗試解析後失敗
+        cases[f"bubble._format_text[json {len(json_reply) // 1024} KB]"] = lambda: format_text(None, json_reply)
+        # 非 JSON 的回覆單次只需數微秒，重複 500 次才量得到
+        cases[f"bubble._format_text[markdown {len(markdown_reply) // 1024} KB x500]"] = lambda: [
+            format_text(None, markdown_reply) for _ in range(500)
+        ]
+        cases[f"bubble._format_text[bracket {len(bracket_reply) // 1024} KB x500]"] = lambda: [
+            format_text(None, bracket_reply) for _ in range(500)
+        ]
+
+    return cases
+
+
+def calibrate() -> float:
+    """固定的純 Python 整數運算（不配置物件，結果較穩定），用於縮放不同機器的結果"""
+    start = time.perf_counter()
+    acc = 0
+    for i in range(300_000):
+        acc = (acc * 31 + i) & 0xFFFF
+    return time.perf_counter() - start
+
+
+def measure(fn: Callable[[], object], repeat: int, min_sample_ms: float = 50.0) -> Tuple[float, float]:
+    """
+    回傳 (單次呼叫 ms, 單次呼叫 / 校正工作的時間比)，皆為 repeat 個樣本的中位數。
+    每個樣本重複呼叫到至少 min_sample_ms，並緊接在一次校正之後量測（機器忽快忽慢時兩者一起變化）；
+    量測期間停用 GC，避免前面建立的大量物件觸發回收造成雜訊。
+    """
+    fn()  # 暖機（正規表示式編譯、檔案快取）
+    gc.collect()
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        fn()
+        single_ms = (time.perf_counter() - start) * 1000
+        loops = max(1, math.ceil(min_sample_ms / max(single_ms, 1e-3)))
+        samples = []
+        relative = []
+        for _ in range(repeat):
+            calibration_ms = calibrate() * 1000
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            ms = (time.perf_counter() - start) * 1000 / loops
+            samples.append(ms)
+            relative.append(ms / calibration_ms)
+    finally:
+        if was_enabled:
+            gc.enable()
+    return statistics.median(samples), statistics.median(relative)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="純 Python 路徑基準測試")
+    parser.add_argument("--repeat", type=int, default=9)
+    parser.add_argument("--threshold", type=float, default=0.3, help="允許比基準慢的比例")
+    parser.add_argument("--only", default=None, help="只執行名稱包含此字串的案例")
+    parser.add_argument("--update-baseline", action="store_true", help="以本次結果覆寫基準")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    calibrations = [calibrate() for _ in range(5)]
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = build_cases(Path(tmp), args.seed)
+        results: Dict[str, float] = {}
+        relative: Dict[str, float] = {}
+        for name, fn in cases.items():
+            if args.only and args.only not in name:
+                continue
+            results[name], relative[name] = measure(fn, args.repeat)
+            calibrations.append(calibrate())
+    calibration_ms = statistics.median(calibrations) * 1000
+
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        baseline = {
+            "calibration_ms": round(calibration_ms, 3),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cases_ms": {name: round(ms, 4) for name, ms in results.items()},
+            # 相對於校正工作的時間比：比較時使用，不受整台機器暫時變慢影響
+            "cases_relative": {name: round(rel, 5) for name, rel in relative.items()},
+        }
+        args.baseline.write_text(json.dumps(baseline, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        for name, ms in results.items():
+            print(f"{ms:>10.3f} ms  {name}")
+        print(f"已寫入基準: {args.baseline}")
+        return 0
+
+    try:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        baseline = None
+    if not baseline:
+        for name, ms in results.items():
+            print(f"{ms:>10.3f} ms  {name}")
+        print(f"找不到基準（{args.baseline}），請先執行 --update-baseline")
+        return 0
+
+    print(f"calibration {calibration_ms:.1f} ms（基準 {baseline['calibration_ms']:.1f} ms）")
+    print(f"{'ms':>10} {'base_ms':>10} {'ratio':>7}  case")
+    failed = []
+    base_relative = baseline.get("cases_relative", {})
+    for name, ms in results.items():
+        base = base_relative.get(name)
+        if base is None:
+            print(f"{ms:>10.3f} {'-':>10} {'-':>7}  {name}（基準中沒有此案例）")
+            continue
+        ratio = relative[name] / base
+        flag = ""
+        if ratio > 1 + args.threshold:
+            failed.append(name)
+            flag = "  ← 退步"
+        # base_ms：基準換算到本次的機器速度
+        print(f"{ms:>10.3f} {ms / ratio:>10.3f} {ratio:>7.2f}  {name}{flag}")
+
+    if failed:
+        print(f"{len(failed)} 個案例比基準慢超過 {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
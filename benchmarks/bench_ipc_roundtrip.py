@@ -0,0 +1,150 @@
+"""
+IPC 指令往返延遲基準測試
+
+預設啟動一個僅含 IPC 服務的子行程（不載入 GUI / Live2D / LLM），量測：
+- ping 往返延遲（持久連線）
+- 模擬串流指令（20 個 chunk 事件）的完成延遲
+- 每次都新建連線的 ping（腳本一次性呼叫的情境）
+- 以 `python -m src.ipc_client ping` 啟動新行程的總成本
+
+使用方式：
+    python benchmarks/bench_ipc_roundtrip.py            # 自帶測試服務
+    python benchmarks/bench_ipc_roundtrip.py --live     # 對執行中的 Desktop Helper 量測
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+BENCH_SERVER_NAME = f"DesktopHelperLLM-bench-{os.getpid()}"
+
+
+def _serve(server_name: str):
+    """子行程：只跑 IPC 服務與事件迴圈"""
+    from PyQt6.QtCore import QCoreApplication
+    from src.ipc_server import IPCServer
+
+    app = QCoreApplication(sys.argv[:1])
+
+    def fake_stream(request):
+        for i in range(20):
+            request.event("chunk", text=f"chunk{i} ")
+        return "done"
+
+    server = IPCServer({"stream": fake_stream}, server_name=server_name)
+    if not server.listen():
+        sys.exit(1)
+    print("ready", flush=True)
+    app.exec()
+
+
+def _percentiles(samples_ms):
+    samples = sorted(samples_ms)
+    def pick(q):
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+    return (
+        f"n={len(samples)} mean={statistics.mean(samples):.3f}ms "
+        f"p50={pick(0.50):.3f}ms p95={pick(0.95):.3f}ms p99={pick(0.99):.3f}ms"
+    )
+
+
+def run(server_name: str, iterations: int, include_stream: bool):
+    from src.ipc_client import IPCClient
+
+    client = IPCClient(server_name=server_name)
+    if not client.connect(timeout_ms=3000):
+        raise SystemExit("無法連線到 IPC 服務")
+
+    for _ in range(20):  # 暖機
+        client.request("ping")
+
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        client.request("ping")
+        samples.append((time.perf_counter() - t0) * 1000)
+    print(f"ping（持久連線）      {_percentiles(samples)}")
+
+    if include_stream:
+        samples = []
+        for _ in range(max(1, iterations // 10)):
+            t0 = time.perf_counter()
+            for _event in client.events("stream", text="bench"):
+                pass
+            samples.append((time.perf_counter() - t0) * 1000)
+        print(f"stream（20 chunks）   {_percentiles(samples)}")
+    client.close()
+
+    samples = []
+    for _ in range(max(1, iterations // 10)):
+        t0 = time.perf_counter()
+        c = IPCClient(server_name=server_name)
+        c.connect(timeout_ms=3000)
+        c.request("ping")
+        c.close()
+        samples.append((time.perf_counter() - t0) * 1000)
+    print(f"ping（每次新連線）    {_percentiles(samples)}")
+
+
+def run_cli(server_name: str, runs: int):
+    """量測以新行程呼叫 CLI 的成本（Python 直譯器 + PyQt6 QtCore/QtNetwork 載入）"""
+    if server_name != BENCH_SERVER_NAME:
+        cmd = [sys.executable, "-m", "src.ipc_client", "ping"]
+    else:
+        # 測試服務使用臨時名稱，改以內嵌程式碼呼叫
+        cmd = [
+            sys.executable, "-c",
+            "from src.ipc_client import IPCClient;"
+            f"c=IPCClient(server_name={server_name!r});c.connect(3000);c.request('ping')",
+        ]
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, cwd=PROJECT_ROOT, check=True, stdout=subprocess.DEVNULL)
+        samples.append((time.perf_counter() - t0) * 1000)
+    print(f"CLI 新行程 ping       {_percentiles(samples)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--live", action="store_true", help="對執行中的 Desktop Helper 量測")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--cli-runs", type=int, default=5)
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.serve)
+        return
+
+    if args.live:
+        from src.ipc_server import default_server_name
+        name = default_server_name()
+        run(name, args.iterations, include_stream=False)
+        run_cli(name, args.cli_runs)
+        return
+
+    proc = subprocess.Popen(
+        [sys.executable, __file__, "--serve", BENCH_SERVER_NAME],
+        cwd=PROJECT_ROOT, stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        if proc.stdout.readline().strip() != "ready":
+            raise SystemExit("測試 IPC 服務啟動失敗")
+        run(BENCH_SERVER_NAME, args.iterations, include_stream=True)
+        run_cli(BENCH_SERVER_NAME, args.cli_runs)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+熱路徑日誌成本基準測試
+
+比較呼叫端（GUI 執行緒）每次記錄的耗時：
+- print：原本的直接輸出（stdout 導向檔案；Windows 主控台會更慢且可能阻塞）
+- print+traceback：原本 paintGL 失敗時的作法
+- disabled：停用等級（DEBUG）以快取的布林值略過
+- debug_call：停用等級直接呼叫 logger.debug（isEnabledFor 檢查）
+- queued：啟用等級，放進背景佇列
+- rate_limited：同一錯誤（含例外）重複發生，超過限速後直接略過
+
+使用方式：
+    python benchmarks/bench_logging.py
+    python benchmarks/bench_logging.py --count 20000
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import logging
+import sys
+import tempfile
+import time
+import traceback
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.app_log import get_logger, log_enabled, setup_logging, shutdown_logging  # noqa: E402
+
+
+def per_call_us(fn, count: int) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    return (time.perf_counter() - start) * 1e6 / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="熱路徑日誌成本基準測試")
+    parser.add_argument("--count", type=int, default=10000)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = open(Path(tmp) / "stdout.txt", "w", encoding="utf-8")
+        with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+            results["print"] = per_call_us(lambda i: print(f"點擊部位: PartHead{i}"), args.count)
+
+            def print_traceback(i):
+                try:
+                    raise RuntimeError(f"draw failed {i}")
+                except RuntimeError as e:
+                    print(f"渲染錯誤: {e}")
+                    traceback.print_exc()
+
+            results["print+traceback"] = per_call_us(print_traceback, args.count)
+
+            setup_logging(level="INFO", log_file=str(Path(tmp) / "app.log"))
+            log = get_logger("bench")
+            debug_enabled = log_enabled(log, logging.DEBUG)
+
+            def disabled(i):
+                if debug_enabled:
+                    log.debug("點擊部位: %s", i)
+
+            results["disabled"] = per_call_us(disabled, args.count)
+            results["debug_call"] = per_call_us(lambda i: log.debug("點擊部位: %s", i), args.count)
+            # 每則模板不同，避免被限速
+            results["queued"] = per_call_us(lambda i: log.info(f"事件 {i}"), min(args.count, 5000))
+
+            def rate_limited(i):
+                try:
+                    raise RuntimeError(f"draw failed {i}")
+                except RuntimeError as e:
+                    log.error("渲染錯誤: %s", e, exc_info=True)
+
+            results["rate_limited"] = per_call_us(rate_limited, args.count)
+            shutdown_logging()
+        sink.close()
+
+    print(f"{'case':<16} {'us/call':>9}")
+    for name, us in results.items():
+        print(f"{name:<16} {us:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+低耗電待機基準測試
+
+載入角色後，先以即時 Live2D 繪製 N 秒，再切換為預渲染待機循環播放 N 秒，
+比較兩種模式的行程 CPU 使用率與每幀 CPU / GPU 時間（GPU 時間需要 PyOpenGL 與驅動支援計時查詢）。
+需要 PyQt6、live2d-py（含 live2d.Model）與可用的顯示環境。
+
+使用方式：
+    python benchmarks/bench_low_power_idle.py
+    python benchmarks/bench_low_power_idle.py --character hiyori_pro_zh --seconds 20
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# 由 benchmark 直接控制進入 / 離開播放，不依閒置計時
+os.environ["LOW_POWER_IDLE"] = "1"
+os.environ["LOW_POWER_IDLE_DELAY_SEC"] = "86400"
+
+
+def process_cpu_seconds() -> float:
+    t = os.times()
+    return t.user + t.system
+
+
+def measure(app, widget, mode: str, seconds: float) -> dict:
+    """執行事件迴圈 seconds 秒，回傳行程 CPU 使用率"""
+    widget.frame_meter.reset()
+    cpu_start = process_cpu_seconds()
+    wall_start = time.perf_counter()
+    while time.perf_counter() - wall_start < seconds:
+        app.processEvents()
+        time.sleep(0.001)
+    wall = time.perf_counter() - wall_start
+    cpu = process_cpu_seconds() - cpu_start
+    stats = widget.frame_meter.summary().get(mode, {"frames": 0, "cpu_ms": 0.0, "gpu_ms": None})
+    return {"mode": mode, "cpu_percent": cpu / wall * 100.0, "fps": stats["frames"] / wall, **stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="低耗電待機基準測試")
+    parser.add_argument("--character", default=None, help="角色 id（預設使用預設角色）")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    try:
+        from PyQt6.QtWidgets import QApplication
+        from src.live2d_widget import LIVE2D_AVAILABLE, Live2DWidget
+        from src.low_power import FrameCostMeter
+        from src.character_library import get_available_characters, get_default_character
+    except ImportError as e:
+        print(f"缺少相依套件，略過：{e}")
+        return
+    if not LIVE2D_AVAILABLE:
+        print("live2d-py 未安裝，略過")
+        return
+
+    app = QApplication(sys.argv)
+    character = get_default_character()
+    if args.character:
+        character = next((c for c in get_available_characters() if c.id == args.character), character)
+
+    widget = Live2DWidget()
+    widget.frame_meter = FrameCostMeter()
+    widget.resize(340, 430)
+    widget.load_model(character.model_path)
+    widget.show()
+    # 等待 GL 初始化與模型載入
+    deadline = time.perf_counter() + 10.0
+    while widget.model is None and time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    if widget.model is None:
+        print("模型載入失敗")
+        return
+
+    results = [measure(app, widget, "live", args.seconds)]
+
+    widget._idle_playback_timer.stop()
+    started = time.perf_counter()
+    widget._enter_idle_playback()
+    if not widget.idle_playback_active:
+        print("無法進入預渲染播放（需要 live2d.Model 與 Idle 動作）")
+        return
+    print(f"準備待機循環: {(time.perf_counter() - started) * 1000:.0f} ms（第二次起讀取快取）")
+    results.append(measure(app, widget, "playback", args.seconds))
+
+    print(f"character={character.id} seconds={args.seconds}")
+    print(f"{'mode':<9} {'fps':>6} {'cpu%':>7} {'cpu_ms/frame':>13} {'gpu_ms/frame':>13}")
+    for r in results:
+        gpu = f"{r['gpu_ms']:.3f}" if r["gpu_ms"] is not None else "n/a"
+        print(f"{r['mode']:<9} {r['fps']:>6.1f} {r['cpu_percent']:>7.1f} {r['cpu_ms']:>13.3f} {gpu:>13}")
+
+    widget.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+串流 Markdown 渲染基準測試（20 KB 回覆）
+
+比較每個串流片段在 GUI 執行緒上的耗時：
+- incremental：IncrementalMarkdownRenderer（只重新渲染最後的開啟區塊）
+- full：每個片段都重新渲染整份 Markdown（舊作法的等價成本）
+- bubble：實際的 ChatBubble.set_text_live（需要 PyQt6；以 offscreen 平台執行）
+- plain：舊版 setPlainText 整份文字（需要 PyQt6，僅供參考）
+
+使用方式：
+    python benchmarks/bench_markdown_render.py
+    python benchmarks/bench_markdown_render.py --size 20000 --chunk 24
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.markdown_renderer import IncrementalMarkdownRenderer, render_markdown  # noqa: E402
+
+
+SECTION = """## 第 {n} 節：範例說明
+
+這是一段說明文字，包含 **粗體**、*斜體* 與 `inline_code()`，用來模擬 Gemini 的一般回覆。
+第二行延續同一個段落，讓段落有一定長度。
+
+- 第一個重點：處理串流片段
+- 第二個重點：只更新最後的區塊
+- 第三個重點：快取已完成區塊的高亮結果
+
+```python
+def process_{n}(items: list[int]) -> int:
+    # 計算總和並回傳
+    total = 0
+    for item in items:
+        if item % 2 == 0:
+            total += item * {n}
+    return total  # 結果
+```
+
+"""
+
+
+def build_reply(size: int) -> str:
+    parts = []
+    n = 0
+    while sum(len(p) for p in parts) < size:
+        n += 1
+        parts.append(SECTION.format(n=n))
+    return "".join(parts)[:size]
+
+
+def chunks_of(text: str, chunk: int):
+    return [text[i:i + chunk] for i in range(0, len(text), chunk)]
+
+
+def report(name: str, samples_us):
+    samples = sorted(samples_us)
+    p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+    print(
+        f"{name:<12} chunks={len(samples):>5} total={sum(samples) / 1000:>9.1f}ms "
+        f"mean={statistics.mean(samples) / 1000:>7.3f}ms p95={p95 / 1000:>7.3f}ms "
+        f"max={samples[-1] / 1000:>7.3f}ms"
+    )
+
+
+def bench_incremental(chunks):
+    renderer = IncrementalMarkdownRenderer()
+    samples = []
+    for delta in chunks:
+        t0 = time.perf_counter_ns()
+        renderer.feed(delta)
+        renderer.take_closed_html()
+        renderer.open_html()
+        samples.append((time.perf_counter_ns() - t0) / 1000)
+    return samples
+
+
+def bench_full(chunks):
+    text = ""
+    samples = []
+    for delta in chunks:
+        text += delta
+        t0 = time.perf_counter_ns()
+        render_markdown(text)
+        samples.append((time.perf_counter_ns() - t0) / 1000)
+    return samples
+
+
+def bench_qt(chunks):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt6.QtWidgets import QApplication
+        from src.chat_bubble import ChatBubble
+    except ImportError:
+        print("（未安裝 PyQt6，略過 ChatBubble 量測）")
+        return None, None
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    bubble = ChatBubble()
+    bubble.show_message("思考中...", duration=0)
+    text = ""
+    samples = []
+    for delta in chunks:
+        text += delta
+        t0 = time.perf_counter_ns()
+        bubble.set_text_live(text)
+        app.processEvents()
+        samples.append((time.perf_counter_ns() - t0) / 1000)
+
+    plain = []
+    text = ""
+    for delta in chunks:
+        text += delta
+        t0 = time.perf_counter_ns()
+        bubble.text_edit.setPlainText(text)
+        app.processEvents()
+        plain.append((time.perf_counter_ns() - t0) / 1000)
+    bubble.close()
+    return samples, plain
+
+
+def main():
+    parser = argparse.ArgumentParser(description="串流 Markdown 渲染基準測試")
+    parser.add_argument("--size", type=int, default=20000, help="回覆大小（字元）")
+    parser.add_argument("--chunk", type=int, default=24, help="每個串流片段的字元數")
+    parser.add_argument("--no-qt", action="store_true", help="只量測純 Python 渲染器")
+    args = parser.parse_args()
+
+    chunks = chunks_of(build_reply(args.size), args.chunk)
+    report("incremental", bench_incremental(chunks))
+    report("full", bench_full(chunks))
+    if not args.no_qt:
+        bubble, plain = bench_qt(chunks)
+        if bubble:
+            report("bubble", bubble)
+            report("plain", plain)
+
+
+if __name__ == "__main__":
+    main()
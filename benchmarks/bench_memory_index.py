@@ -0,0 +1,107 @@
+"""
+長期記憶檢索基準測試
+
+以隨機（已正規化）向量填滿 10k / 100k 筆的索引，量測單一查詢與批次查詢的延遲；
+另以合成問答量測 HashingEmbedder 的嵌入時間（檢索前的固定成本）。
+加上 --memmap 時先寫入暫存檔再以 memmap 重新開啟，量測第一次（冷）與之後的查詢。
+
+使用方式：
+    python benchmarks/bench_memory_index.py
+    python benchmarks/bench_memory_index.py --sizes 10000 100000 --dim 256 --memmap
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import numpy as np  # noqa: E402
+
+from src.memory_index import HashingEmbedder, VectorIndex  # noqa: E402
+
+_WORDS = "今天 天氣 主人 工作 報告 晚餐 咖啡 電影 音樂 遊戲 旅行 貓咪 生日 考試 程式 下雨 散步 睡覺 心情 週末".split()
+
+
+def synthetic_turn(rng: random.Random) -> str:
+    user = "".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 12)))
+    reply = "".join(rng.choice(_WORDS) for _ in range(rng.randint(20, 60)))
+    return f"{user}\n{reply}"
+
+
+def random_unit_vectors(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def time_queries(index: VectorIndex, queries: np.ndarray, k: int, batch: int) -> list:
+    times = []
+    for i in range(0, len(queries) - batch + 1, batch):
+        start = time.perf_counter()
+        index.search(queries[i:i + batch], k)
+        times.append((time.perf_counter() - start) * 1000 / batch)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="長期記憶檢索基準測試")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--memmap", action="store_true", help="以 memmap 開啟磁碟上的索引")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    embedder = HashingEmbedder(dim=args.dim)
+    texts = [synthetic_turn(random.Random(args.seed + i)) for i in range(200)]
+    start = time.perf_counter()
+    embedder.embed(texts)
+    embed_ms = (time.perf_counter() - start) * 1000 / len(texts)
+    print(f"dim={args.dim} k={args.k} embed {embed_ms:.3f} ms/turn（平均 {statistics.mean(map(len, texts)):.0f} 字）")
+
+    print(f"{'size':>8} {'storage':<7} {'p50_ms':>8} {'p95_ms':>8} {f'batch{args.batch}_ms/q':>15} {'first_ms':>9}")
+    queries = random_unit_vectors(args.queries, args.dim, rng)
+    for size in args.sizes:
+        vectors = random_unit_vectors(size, args.dim, rng)
+        with tempfile.TemporaryDirectory() as tmp:
+            first_ms = None
+            if args.memmap:
+                path = Path(tmp) / "vectors.f32"
+                VectorIndex(args.dim, path).add(vectors)
+                index = VectorIndex(args.dim, path)
+                start = time.perf_counter()
+                index.search(queries[:1], args.k)
+                first_ms = (time.perf_counter() - start) * 1000
+                storage = "memmap"
+            else:
+                index = VectorIndex(args.dim)
+                index.add(vectors)
+                storage = "ram"
+
+            single = time_queries(index, queries, args.k, 1)
+            batched = time_queries(index, queries, args.k, args.batch)
+            first = f"{first_ms:.2f}" if first_ms is not None else "-"
+            print(
+                f"{size:>8} {storage:<7} {percentile(single, 0.5):>8.3f} {percentile(single, 0.95):>8.3f} "
+                f"{statistics.mean(batched):>15.3f} {first:>9}"
+            )
+            del index
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+多角色同時顯示基準測試
+
+依序以 1 / 2 / 4 個角色視窗同時繪製 N 秒，量測相對於基準（只有一個未載入模型的 GL widget）的
+RSS 與顯示卡記憶體增量、每個視窗的平均 FPS，以及行程 CPU 使用率。
+所有視窗共用 live2d_runtime（Core 只初始化一次）與共享的 GL context。
+顯示卡記憶體需要 PyOpenGL 與支援 GL_NVX_gpu_memory_info / GL_ATI_meminfo 的驅動。
+需要 PyQt6、live2d-py 與可用的顯示環境。
+
+使用方式：
+    python benchmarks/bench_multi_character.py
+    python benchmarks/bench_multi_character.py --counts 1 2 4 --seconds 10 --same
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# 只量測即時繪製，不切換為預渲染待機循環
+os.environ["LOW_POWER_IDLE"] = "0"
+
+
+def process_cpu_seconds() -> float:
+    t = os.times()
+    return t.user + t.system
+
+
+def pump(app, seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+
+
+def run(app, characters, count: int, seconds: float, anchor) -> dict:
+    from src.live2d_widget import Live2DWidget
+    from src.low_power import FrameCostMeter
+
+    before = anchor.memory_stats()
+    widgets = []
+    for i in range(count):
+        widget = Live2DWidget()
+        widget.frame_meter = FrameCostMeter()
+        widget.resize(280, 400)
+        widget.move(40 + i * 290, 40)
+        widget.load_model(characters[i % len(characters)].model_path)
+        widget.show()
+        widgets.append(widget)
+
+    # 等待 GL 初始化與模型載入
+    deadline = time.perf_counter() + 20.0
+    while any(w.model is None for w in widgets) and time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    loaded = sum(w.model is not None for w in widgets)
+    pump(app, 1.0)
+
+    for w in widgets:
+        w.frame_meter.reset()
+    cpu_start = process_cpu_seconds()
+    wall_start = time.perf_counter()
+    pump(app, seconds)
+    wall = time.perf_counter() - wall_start
+    cpu = process_cpu_seconds() - cpu_start
+
+    after = anchor.memory_stats()
+    fps = [w.frame_meter.summary().get("live", {"frames": 0})["frames"] / wall for w in widgets]
+
+    for w in widgets:
+        w.cleanup()
+        w.close()
+        w.deleteLater()
+    app.processEvents()
+    gc.collect()
+
+    vram_mb = None
+    if before["vram_free_kb"] is not None and after["vram_free_kb"] is not None:
+        vram_mb = (before["vram_free_kb"] - after["vram_free_kb"]) / 1024
+    rss_mb = None
+    if before["rss"] is not None and after["rss"] is not None:
+        rss_mb = (after["rss"] - before["rss"]) / 2**20
+    return {
+        "count": count,
+        "loaded": loaded,
+        "rss_mb": rss_mb,
+        "vram_mb": vram_mb,
+        "fps_min": min(fps),
+        "fps_avg": sum(fps) / len(fps),
+        "cpu_percent": cpu / wall * 100.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多角色同時顯示基準測試")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--same", action="store_true", help="所有視窗使用同一個角色（預設輪流使用各角色）")
+    args = parser.parse_args()
+
+    try:
+        from PyQt6.QtWidgets import QApplication
+        from src.live2d_runtime import enable_shared_gl_contexts, live2d_runtime
+        from src.live2d_widget import LIVE2D_AVAILABLE, Live2DWidget
+        from src.character_library import get_available_characters, get_default_character
+    except ImportError as e:
+        print(f"缺少相依套件，略過：{e}")
+        return
+    if not LIVE2D_AVAILABLE:
+        print("live2d-py 未安裝，略過")
+        return
+
+    enable_shared_gl_contexts()
+    app = QApplication(sys.argv)
+    characters = [get_default_character()] if args.same else get_available_characters()
+
+    # 基準：一個不載入模型的 widget，持有 Live2D Core 並提供查詢顯示卡記憶體用的 context
+    anchor = Live2DWidget()
+    anchor.resize(16, 16)
+    anchor.show()
+    pump(app, 0.5)
+
+    results = [run(app, characters, count, args.seconds, anchor) for count in args.counts]
+
+    def _fmt(v) -> str:
+        return f"{v:.1f}" if v is not None else "n/a"
+
+    print(f"characters={','.join(c.id for c in characters)} seconds={args.seconds}")
+    print(f"{'windows':>7} {'loaded':>6} {'rss_mb':>8} {'vram_mb':>8} {'fps_avg':>8} {'fps_min':>8} {'cpu%':>7}")
+    for r in results:
+        print(
+            f"{r['count']:>7} {r['loaded']:>6} {_fmt(r['rss_mb']):>8} {_fmt(r['vram_mb']):>8} "
+            f"{r['fps_avg']:>8.1f} {r['fps_min']:>8.1f} {r['cpu_percent']:>7.1f}"
+        )
+    print(f"live2d_runtime: {live2d_runtime.stats()}")
+
+    anchor.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+集中排程器基準測試
+
+1. 喚醒次數：以模擬時鐘重現閒置中的計時工作（視線探測、預取補充、閒置動作 / 表情、逾時），
+   比較各自使用獨立計時器（每次到期都喚醒一次）與集中排程器合併喚醒的次數
+2. 操作成本：排程 / 取消 / 執行的每次耗時（GUI 執行緒上的額外負擔）
+
+不需要顯示環境（只使用不依賴事件迴圈的 TaskQueue）。
+
+使用方式：
+    python benchmarks/bench_scheduler.py
+    python benchmarks/bench_scheduler.py --minutes 60 --seed 2
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.scheduler import TaskQueue  # noqa: E402
+
+# (名稱, 間隔秒, 抖動比例, 容許延後比例)：對應實際使用的計時器設定
+IDLE_WORKLOAD = (
+    ("gaze_probe", 0.5, 0.0, 0.1),
+    ("prefetch_idle", 20.0, 0.0, 0.25),
+    ("idle_motion", 45.0, 0.5, 0.2),
+    ("idle_expression", 90.0, 0.5, 0.2),
+    ("hibernate_check", 300.0, 0.0, 0.05),
+)
+
+
+class _SimClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def simulate(minutes: float, seed: int, coalesce: bool) -> dict:
+    """回傳喚醒次數與執行的工作數；coalesce=False 時每個工作的 slack 為 0 且各自喚醒"""
+    rng = random.Random(seed)
+    clock = _SimClock()
+    queue = TaskQueue(time_fn=clock)
+    end = minutes * 60.0
+    fired = {name: 0 for name, *_ in IDLE_WORKLOAD}
+
+    def schedule(name, interval, jitter, slack):
+        delay = interval * (1.0 + rng.uniform(-jitter, jitter)) if jitter else interval
+
+        def fire():
+            fired[name] += 1
+            schedule(name, interval, jitter, slack)
+
+        queue.call_at(clock.now + delay, fire, delay * slack if coalesce else 0.0)
+
+    for spec in IDLE_WORKLOAD:
+        schedule(*spec)
+
+    wakeups = 0
+    while True:
+        deadline = queue.next_deadline()
+        if deadline is None or deadline > end:
+            break
+        clock.now = deadline
+        if coalesce:
+            queue.run_due()
+            wakeups += 1
+        else:
+            # 獨立計時器：同一時刻到期的工作也各自喚醒
+            wakeups += queue.run_due()
+    return {"wakeups": wakeups, "tasks": sum(fired.values()), "per_min": wakeups / minutes}
+
+
+def op_costs(count: int) -> dict:
+    queue = TaskQueue()
+    rng = random.Random(0)
+    noop = lambda: None  # noqa: E731
+    now = time.monotonic()
+
+    start = time.perf_counter()
+    tasks = [queue.call_at(now + rng.uniform(0, 60), noop, 1.0) for _ in range(count)]
+    schedule_us = (time.perf_counter() - start) * 1e6 / count
+
+    start = time.perf_counter()
+    for task in tasks[::2]:
+        queue.cancel(task)
+    cancel_us = (time.perf_counter() - start) * 1e6 / (count // 2)
+
+    # 一般情況：佇列中只有十幾個工作，每次喚醒執行其中一個
+    small = TaskQueue()
+    for i in range(16):
+        small.call_at(now + 3600 + i, noop)
+    start = time.perf_counter()
+    for i in range(count):
+        small.call_at(now - 1, noop)
+        small.run_due(now)
+    wake_us = (time.perf_counter() - start) * 1e6 / count
+    return {"schedule_us": schedule_us, "cancel_us": cancel_us, "wake_us[16 pending]": wake_us}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="集中排程器基準測試")
+    parser.add_argument("--minutes", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    separate = simulate(args.minutes, args.seed, coalesce=False)
+    merged = simulate(args.minutes, args.seed, coalesce=True)
+    print(f"閒置 {args.minutes:g} 分鐘（{', '.join(name for name, *_ in IDLE_WORKLOAD)}）")
+    print(f"{'mode':<12} {'wakeups':>8} {'tasks':>7} {'per_min':>8}")
+    for name, r in (("separate", separate), ("scheduler", merged)):
+        print(f"{name:<12} {r['wakeups']:>8} {r['tasks']:>7} {r['per_min']:>8.1f}")
+    print(f"喚醒減少 {1 - merged['wakeups'] / separate['wakeups']:.0%}")
+
+    for name, us in op_costs(args.count).items():
+        print(f"{name:<22} {us:>7.2f} us")
+
+
+if __name__ == "__main__":
+    main()
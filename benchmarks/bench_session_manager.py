@@ -0,0 +1,80 @@
+"""
+多對話引擎負載測試
+
+以本地模擬後端（固定首字延遲與生成速度）量測不同工作階段數下的吞吐量，
+確認吞吐量隨工作階段數成長，直到觸及全域併發上限。
+
+使用方式：
+    python benchmarks/bench_session_manager.py
+    python benchmarks/bench_session_manager.py --max-concurrency 16 --sessions 1 4 16 64
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.session_manager import MockAsyncBackend, SessionManager  # noqa: E402
+
+
+async def run_once(num_sessions: int, messages: int, max_concurrency: int, args) -> dict:
+    backend = MockAsyncBackend(
+        first_token_delay=args.first_token_delay,
+        chunk_interval=args.chunk_interval,
+    )
+    manager = SessionManager(backend, max_concurrency=max_concurrency, max_turns=4)
+    latencies = []
+
+    async def session(i: int) -> int:
+        chars = 0
+        for n in range(messages):
+            t0 = time.perf_counter()
+            chars += len(await manager.send(f"s{i}", f"session {i} message {n}"))
+            latencies.append((time.perf_counter() - t0) * 1000)
+        return chars
+
+    start = time.perf_counter()
+    chars = sum(await asyncio.gather(*(session(i) for i in range(num_sessions))))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "sessions": num_sessions,
+        "msgs/s": num_sessions * messages / elapsed,
+        "chars/s": chars / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+        "peak_in_flight": backend.max_in_flight,
+        "context_turns": max(len(s.history) // 2 for s in manager._sessions.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多對話引擎負載測試")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64, 128])
+    parser.add_argument("--messages", type=int, default=5, help="每個工作階段的訊息數")
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    parser.add_argument("--chunk-interval", type=float, default=0.01)
+    args = parser.parse_args()
+
+    print(f"max_concurrency={args.max_concurrency} messages/session={args.messages}")
+    print(f"{'sessions':>8} {'msgs/s':>9} {'chars/s':>10} {'p50_ms':>8} {'p95_ms':>8} {'in_flight':>9} {'turns':>5}")
+    baseline = None
+    for n in args.sessions:
+        r = asyncio.run(run_once(n, args.messages, args.max_concurrency, args))
+        baseline = baseline or r["msgs/s"]
+        print(
+            f"{r['sessions']:>8} {r['msgs/s']:>9.1f} {r['chars/s']:>10.0f} "
+            f"{r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['peak_in_flight']:>9} {r['context_turns']:>5}"
+            f"   x{r['msgs/s'] / baseline:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
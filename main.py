@@ -2,23 +2,57 @@
 Desktop Helper - 主程式入口點
 在 Windows 桌面上顯示動漫角色形象的 LLM 助手
 """
+import os
 import sys
+import time
+
+# 啟動計時基準：在載入 PyQt / Live2D 之前記錄
+_PROCESS_START = time.perf_counter()
+
 from pathlib import Path
 
 from PyQt6.QtWidgets import QApplication
 
+from src.app_log import setup_logging
 from src.desktop_window import DesktopCharacterWindow
+from src.live2d_runtime import enable_shared_gl_contexts
 from src.character_loader import CharacterLoader
 from src.character_library import get_default_character, get_available_characters
+from src.ipc_client import IPCClient, IPCError
+from src.ipc_server import IPCServer
+from src.startup_snapshot import load_startup_state, startup_timer
 
 
 def main():
     """主函數"""
+    startup_timer.begin(_PROCESS_START)
+    # 背景日誌執行緒（需在建立 widget 之前，熱路徑依此決定是否記錄 DEBUG）
+    setup_logging()
+
+    # 多個角色視窗共享 GL context（必須在建立 QApplication 之前設定）
+    enable_shared_gl_contexts()
+
     # 創建應用程式
     app = QApplication(sys.argv)
     
     # 設置應用程式名稱
     app.setApplicationName("Desktop Helper")
+
+    # 單一實例：先佔用 IPC 名稱（同時啟動兩個實例時只有一個能成功），
+    # 佔用失敗且已有實例在執行時，請它顯示視窗後直接結束，避免重複建立角色與 Gemini 客戶端
+    ipc_server = IPCServer({})
+    ipc_listening = ipc_server.listen()
+    if ipc_server.already_running:
+        client = IPCClient(timeout_ms=3000)
+        try:
+            if client.connect():
+                client.request("show")
+        except IPCError as e:
+            print(f"無法通知執行中的實例: {e}")
+        finally:
+            client.close()
+        print("Desktop Helper 已在執行中（可使用 python -m src.ipc_client 控制）")
+        sys.exit(0)
     
     # 從角色素材庫取得角色
     try:
@@ -27,6 +61,16 @@ def main():
     except Exception as e:
         print(f"錯誤：找不到任何可用的角色模型: {e}")
         sys.exit(1)
+
+    # 上次結束時的角色與視窗位置（仍存在時優先使用）
+    startup_state = load_startup_state()
+    if startup_state:
+        for c in all_characters:
+            if c.id == startup_state.character_id:
+                default_character = c
+                break
+        else:
+            startup_state = None
     
     # 載入角色配置（目前僅驗證文件存在）
     try:
@@ -43,8 +87,21 @@ def main():
         model_path=default_character.model_path,
         characters=all_characters,
         initial_character_id=default_character.id,
+        startup_state=startup_state,
     )
     window.show()
+    startup_timer.mark("window_shown")
+
+    # 同伴角色（COMPANION_CHARACTERS=角色ID,角色ID）
+    for character_id in filter(None, (c.strip() for c in os.getenv("COMPANION_CHARACTERS", "").split(","))):
+        if not window.open_companion(character_id):
+            print(f"找不到同伴角色: {character_id}")
+
+    # 本地 IPC 控制介面（腳本 / 快捷鍵工具可直接驅動此實例）
+    ipc_server.handlers.update(window.get_ipc_handlers())
+    ipc_server.setParent(window)
+    if ipc_listening:
+        print(f"IPC 服務已啟動: {ipc_server.server_name}")
     
     print("桌面角色視窗已啟動")
     print("提示：可以拖動視窗移動位置")
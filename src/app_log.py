@@ -0,0 +1,223 @@
+"""
+結構化日誌模組 - 以背景執行緒寫出日誌，熱路徑（繪製、點擊、串流）不會因主控台輸出而阻塞
+- 呼叫端只把紀錄放進有上限的佇列；訊息與例外堆疊的格式化、寫入主控台 / 輪替檔案都在背景執行緒
+  （例外以 exc_info 原樣傳遞；訊息參數在背景執行緒才套用，呼叫後不應再修改傳入的物件）
+- 同一訊息（logger + 等級 + 訊息模板）在時間窗內超過次數即略過，下次輸出時附上略過的數量
+- 檔案為 JSON Lines（時間、等級、logger、訊息、額外欄位、例外），主控台為一般文字
+- 繪製路徑以 log_enabled() 的結果快取判斷，停用的等級不會建立任何紀錄
+
+設定（環境變數）：
+    LOG_LEVEL=INFO          主控台 / 檔案的最低等級（DEBUG 可看到每次點擊等細節）
+    LOG_FILE=               日誌檔路徑，預設為快取目錄的 logs/desktop_helper.log；設為 0 停用
+    LOG_MAX_BYTES=2097152   單一檔案上限，超過時輪替
+    LOG_BACKUPS=3           保留的舊檔數
+    LOG_RATE_LIMIT=5/10     同一訊息每 10 秒最多 5 則
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from src.app_paths import cache_subdir
+
+ROOT_LOGGER = "desktop_helper"
+
+# 紀錄本身的標準屬性；其餘屬性（extra=...）視為結構化欄位
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "suppressed"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """取得模組的 logger（desktop_helper.<name>）"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def log_enabled(logger: logging.Logger, level: int) -> bool:
+    """等級是否啟用；熱路徑在初始化時呼叫一次並保存結果"""
+    return logger.isEnabledFor(level)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    同一訊息模板在 window 秒內最多輸出 burst 則，其餘略過；
+    時間窗過後第一則輸出時，於 record.suppressed 記錄期間略過的數量。
+    """
+
+    def __init__(self, burst: int = 5, window: float = 10.0):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._lock = threading.Lock()
+        # (logger, 等級, 模板) -> [時間窗起點, 本窗已輸出數, 已略過數]
+        self._state: Dict[Tuple[str, int, str], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._state.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state else 0
+                self._state[key] = [now, 1, 0]
+                if len(self._state) > 4096:
+                    # 避免大量不同模板讓表無限成長：丟掉過期的項目，仍太多時整個重來
+                    self._state = {k: v for k, v in self._state.items() if now - v[0] < self.window}
+                    if len(self._state) > 2048:
+                        self._state = {key: [now, 1, 0]}
+                record.suppressed = suppressed
+                return True
+            if state[1] < self.burst:
+                state[1] += 1
+                record.suppressed = 0
+                return True
+            state[2] += 1
+            return False
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """佇列已滿時直接丟棄（寫入端不等待），並計數"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 不在呼叫端格式化（QueueHandler 預設會格式化訊息與例外），連同 exc_info 原樣交給背景執行緒
+        return record
+
+
+class _FormattingQueueListener(logging.handlers.QueueListener):
+    """背景執行緒取出紀錄後，先把例外轉成文字（所有 handler 共用同一份）"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        # 釋放 traceback 參照的堆疊框架
+        record.exc_info = None
+        return record
+
+
+class JsonLineFormatter(logging.Formatter):
+    """一行一筆 JSON：ts / level / logger / msg / 額外欄位 / exc"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """主控台：維持原本 print 的樣子，只在警告以上加等級前綴"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = record.getMessage()
+        if record.levelno >= logging.WARNING:
+            text = f"[{record.levelname}] {text}"
+        if getattr(record, "suppressed", 0):
+            text += f"（已略過 {record.suppressed} 則相同訊息）"
+        if record.exc_text:
+            text += "\n" + record.exc_text
+        return text
+
+
+def _parse_rate(value: str) -> Tuple[int, float]:
+    try:
+        burst, window = value.split("/", 1)
+        return max(1, int(burst)), max(0.1, float(window))
+    except ValueError:
+        return 5, 10.0
+
+
+def setup_logging(level: Optional[str] = None, log_file: Optional[str] = None, max_queue: int = 10000) -> logging.Logger:
+    """
+    設定 desktop_helper logger 並啟動背景寫入執行緒（重複呼叫時不會重複啟動）。
+
+    Args:
+        level: 最低等級，預設讀取 LOG_LEVEL
+        log_file: 日誌檔路徑，預設讀取 LOG_FILE；"0" 表示不寫檔
+        max_queue: 佇列上限，滿了之後的紀錄直接丟棄
+    """
+    global _listener
+    root = logging.getLogger(ROOT_LOGGER)
+    with _setup_lock:
+        if _listener is not None:
+            return root
+
+        level_name = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+        root.setLevel(getattr(logging, level_name, logging.INFO))
+        root.propagate = False
+
+        handlers = []
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(ConsoleFormatter())
+        handlers.append(console)
+
+        log_file = log_file if log_file is not None else os.getenv("LOG_FILE", "")
+        if log_file != "0":
+            path = Path(log_file) if log_file else cache_subdir("logs") / "desktop_helper.log"
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                file_handler = logging.handlers.RotatingFileHandler(
+                    path,
+                    maxBytes=int(os.getenv("LOG_MAX_BYTES", str(2 * 1024 * 1024))),
+                    backupCount=int(os.getenv("LOG_BACKUPS", "3")),
+                    encoding="utf-8",
+                )
+                file_handler.setFormatter(JsonLineFormatter())
+                handlers.append(file_handler)
+            except OSError as e:
+                print(f"無法開啟日誌檔 {path}: {e}")
+
+        log_queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        queue_handler = _DroppingQueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter(*_parse_rate(os.getenv("LOG_RATE_LIMIT", "5/10"))))
+        root.addHandler(queue_handler)
+
+        _listener = _FormattingQueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+    return root
+
+
+def shutdown_logging():
+    """寫完佇列中剩餘的紀錄並停止背景執行緒"""
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
@@ -0,0 +1,70 @@
+"""
+應用程式資料路徑模組 - 集中管理快取 / 狀態檔案的存放位置
+"""
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+APP_DIR_NAME = "DesktopHelper"
+
+
+def user_cache_dir() -> Path:
+    """
+    可隨時刪除的快取目錄（啟動快照、預渲染畫面等）。
+    可用 DESKTOP_HELPER_CACHE_DIR 覆寫；預設：
+    - Windows：%LOCALAPPDATA%/DesktopHelper/cache
+    - macOS：~/Library/Caches/DesktopHelper
+    - 其他：$XDG_CACHE_HOME/DesktopHelper（預設 ~/.cache/DesktopHelper）
+    """
+    override = os.getenv("DESKTOP_HELPER_CACHE_DIR")
+    if override:
+        path = Path(override)
+    elif sys.platform == "win32":
+        base = os.getenv("LOCALAPPDATA") or str(Path.home() / "AppData" / "Local")
+        path = Path(base) / APP_DIR_NAME / "cache"
+    elif sys.platform == "darwin":
+        path = Path.home() / "Library" / "Caches" / APP_DIR_NAME
+    else:
+        base = os.getenv("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+        path = Path(base) / APP_DIR_NAME
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def cache_subdir(name: str) -> Path:
+    """快取目錄下的子目錄（不存在時建立）"""
+    path = user_cache_dir() / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def user_data_dir() -> Path:
+    """
+    需要保留的使用者資料（長期記憶等）。
+    可用 DESKTOP_HELPER_DATA_DIR 覆寫；預設：
+    - Windows：%APPDATA%/DesktopHelper
+    - macOS：~/Library/Application Support/DesktopHelper
+    - 其他：$XDG_DATA_HOME/DesktopHelper（預設 ~/.local/share/DesktopHelper）
+    """
+    override = os.getenv("DESKTOP_HELPER_DATA_DIR")
+    if override:
+        path = Path(override)
+    elif sys.platform == "win32":
+        base = os.getenv("APPDATA") or str(Path.home() / "AppData" / "Roaming")
+        path = Path(base) / APP_DIR_NAME
+    elif sys.platform == "darwin":
+        path = Path.home() / "Library" / "Application Support" / APP_DIR_NAME
+    else:
+        base = os.getenv("XDG_DATA_HOME") or str(Path.home() / ".local" / "share")
+        path = Path(base) / APP_DIR_NAME
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def data_subdir(name: str) -> Path:
+    """資料目錄下的子目錄（不存在時建立）"""
+    path = user_data_dir() / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
@@ -0,0 +1,447 @@
+"""
+角色素材封裝模組 - 將角色 runtime 目錄打包成單一索引檔（.l2dpack）
+動作曲線預先轉為 float32 陣列、貼圖預先解碼為 RGBA8888，
+載入時只需一次 open + mmap，之後的讀取都是零複製的 memoryview。
+
+建置：
+    python -m src.asset_pack build --all
+    python -m src.asset_pack build path/to/model.model3.json
+    python -m src.asset_pack info path/to/model.l2dpack
+
+注意：live2d-py 的 LoadModelJson() 只能從檔案系統讀取，繪製端（moc3、貼圖、動作）仍讀取原始檔案；
+目前封裝檔只供 Python 端的中繼資料使用（CharacterLoader 的模型設定、動作 Meta、遮罩使用量），
+預轉換的動作曲線與貼圖保留給之後能從記憶體載入的執行環境。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.mask_buffer import MocMaskInfo, parse_moc_masks
+
+PACK_MAGIC = b"L2DPACK1"
+PACK_VERSION = 1
+PACK_SUFFIX = ".l2dpack"
+
+# 檔頭：magic(8) + 索引位移(u64) + 索引長度(u64)
+_HEADER = struct.Struct("<8sQQ")
+# 資料區塊對齊（float32 陣列與貼圖可直接 cast / 上傳）
+_ALIGN = 16
+
+
+@dataclass(frozen=True)
+class PackedCurve:
+    """單一動作曲線；segments 為 motion3.json 的 Segments 原樣序列（float32）"""
+
+    target: str
+    id: str
+    segments: memoryview
+    fade_in: Optional[float] = None
+    fade_out: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class PackedMotion:
+    """預先轉換的動作（Meta 與曲線）"""
+
+    meta: Dict
+    curves: List[PackedCurve]
+    user_data: List[Dict]
+
+    @property
+    def duration(self) -> float:
+        return float(self.meta.get("Duration", 0.0))
+
+
+@dataclass(frozen=True)
+class PackedTexture:
+    """預先解碼的貼圖；format 為 "rgba8888"（未安裝 PyQt6 時為原始 "png"）"""
+
+    width: int
+    height: int
+    format: str
+    data: memoryview
+
+
+def pack_path_for(model_path: Path) -> Path:
+    """角色封裝檔的預設位置：runtime 目錄旁的 <模型名>.l2dpack"""
+    model_path = Path(model_path)
+    stem = model_path.name.split(".model3.json")[0]
+    return model_path.parent.parent / f"{stem}{PACK_SUFFIX}"
+
+
+def collect_runtime_files(model_path: Path, warn: bool = True) -> List[str]:
+    """
+    列出 .model3.json 參照的所有檔案（相對於 runtime 目錄，含 model3.json 本身）。
+    不存在的檔案（例如未隨專案附上的貼圖）會被略過。
+    """
+    model_path = Path(model_path)
+    runtime = model_path.parent
+    with open(model_path, "r", encoding="utf-8") as f:
+        refs = json.load(f).get("FileReferences", {})
+
+    names: List[str] = [model_path.name]
+    for key in ("Moc", "Physics", "Pose", "DisplayInfo", "UserData"):
+        if refs.get(key):
+            names.append(refs[key])
+    names.extend(refs.get("Textures", []))
+    for expr in refs.get("Expressions", []):
+        if expr.get("File"):
+            names.append(expr["File"])
+    for motions in refs.get("Motions", {}).values():
+        for motion in motions:
+            if motion.get("File"):
+                names.append(motion["File"])
+            if motion.get("Sound"):
+                names.append(motion["Sound"])
+
+    seen = set()
+    result = []
+    for name in names:
+        if name in seen:
+            continue
+        seen.add(name)
+        if (runtime / name).is_file():
+            result.append(name)
+        elif warn:
+            print(f"警告: 找不到素材檔案，略過: {runtime / name}")
+    return result
+
+
+def convert_motion(data: bytes) -> Tuple[Dict, array]:
+    """motion3.json -> (中繼資料, 所有曲線 Segments 串接成的 float32 陣列)"""
+    motion = json.loads(data)
+    values = array("f")
+    curves = []
+    for curve in motion.get("Curves", []):
+        segments = curve.get("Segments", [])
+        entry = {
+            "Target": curve.get("Target", "Parameter"),
+            "Id": curve.get("Id", ""),
+            "offset": len(values),
+            "count": len(segments),
+        }
+        for key in ("FadeInTime", "FadeOutTime"):
+            if key in curve:
+                entry[key] = curve[key]
+        values.extend(segments)
+        curves.append(entry)
+    meta = {
+        "Meta": motion.get("Meta", {}),
+        "Curves": curves,
+        "UserData": motion.get("UserData", []),
+    }
+    return meta, values
+
+
+def decode_texture(data: bytes) -> Optional[Tuple[int, int, bytes]]:
+    """以 QImage 解碼 PNG 為 RGBA8888；未安裝 PyQt6 或解碼失敗時回傳 None"""
+    try:
+        from PyQt6.QtGui import QImage
+    except ImportError:
+        return None
+    image = QImage.fromData(data)
+    if image.isNull():
+        return None
+    image = image.convertToFormat(QImage.Format.Format_RGBA8888)
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    # 去除每列對齊填充（RGBA8888 每列 4*width，一般已無填充）
+    row = image.width() * 4
+    raw = bytes(bits)
+    if image.bytesPerLine() != row:
+        raw = b"".join(
+            raw[y * image.bytesPerLine(): y * image.bytesPerLine() + row]
+            for y in range(image.height())
+        )
+    return image.width(), image.height(), raw
+
+
+def _source_signature(runtime: Path, names: Iterable[str]) -> Dict[str, List[int]]:
+    """來源檔案的 (大小, mtime_ns)，用於判斷封裝檔是否過期"""
+    signature = {}
+    for name in names:
+        st = os.stat(runtime / name)
+        signature[name] = [st.st_size, st.st_mtime_ns]
+    return signature
+
+
+def build_pack(model_path: Path, out_path: Optional[Path] = None, decode_textures: bool = True) -> Path:
+    """
+    將角色打包成單一 .l2dpack 檔案。
+
+    Args:
+        model_path: .model3.json 路徑
+        out_path: 輸出路徑；None 時使用 pack_path_for()
+        decode_textures: 是否預先解碼貼圖（需要 PyQt6）
+
+    Returns:
+        輸出檔案路徑
+    """
+    model_path = Path(model_path)
+    runtime = model_path.parent
+    out_path = Path(out_path) if out_path else pack_path_for(model_path)
+    names = collect_runtime_files(model_path)
+
+    entries: Dict[str, Dict] = {}
+    masks: Optional[MocMaskInfo] = None
+    tmp_path = out_path.with_suffix(out_path.suffix + ".tmp")
+    with open(tmp_path, "wb") as out:
+        out.write(_HEADER.pack(PACK_MAGIC, 0, 0))
+        for name in names:
+            data = (runtime / name).read_bytes()
+            entry: Dict = {"kind": "raw"}
+            if name.endswith(".motion3.json"):
+                meta, values = convert_motion(data)
+                entry = {"kind": "motion", "meta": meta}
+                data = values.tobytes()
+            elif name.endswith(".json"):
+                entry = {"kind": "json"}
+            elif name.endswith(".moc3"):
+                masks = parse_moc_masks(data)
+            elif name.lower().endswith(".png"):
+                decoded = decode_texture(data) if decode_textures else None
+                if decoded:
+                    width, height, data = decoded
+                    entry = {"kind": "texture", "width": width, "height": height, "format": "rgba8888"}
+                else:
+                    entry = {"kind": "texture", "width": 0, "height": 0, "format": "png"}
+
+            pad = (-out.tell()) % _ALIGN
+            if pad:
+                out.write(b"\0" * pad)
+            entry["offset"] = out.tell()
+            entry["length"] = len(data)
+            out.write(data)
+            entries[name] = entry
+
+        index = {
+            "version": PACK_VERSION,
+            "model": model_path.name,
+            "sources": _source_signature(runtime, names),
+            "entries": entries,
+        }
+        if masks is not None:
+            # 遮罩使用量（載入時依此決定 mask buffer 配置，不需重新讀取 .moc3）
+            index["masks"] = masks.to_dict()
+        index_bytes = json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        index_offset = out.tell()
+        out.write(index_bytes)
+        out.seek(0)
+        out.write(_HEADER.pack(PACK_MAGIC, index_offset, len(index_bytes)))
+    # 舊的封裝檔若仍被對映（Windows 上無法覆寫），先關閉
+    with _shared_lock:
+        cached = _shared_packs.pop(out_path, None)
+    if cached is not None:
+        cached[0].close()
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+class AssetPack:
+    """
+    唯讀的角色封裝檔。
+
+    整個檔案以一次 open + mmap 對映，索引在建構時解析；
+    read() / motion() / texture() 回傳指向對映區的 memoryview，不會複製資料。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, index_offset, index_len = _HEADER.unpack_from(self._mmap, 0)
+        if magic != PACK_MAGIC:
+            self.close()
+            raise ValueError(f"不是有效的角色封裝檔: {self.path}")
+        index = json.loads(bytes(self._view[index_offset:index_offset + index_len]))
+        if index.get("version") != PACK_VERSION:
+            self.close()
+            raise ValueError(f"不支援的封裝檔版本: {index.get('version')}")
+        self.model_name: str = index["model"]
+        self.sources: Dict[str, List[int]] = index.get("sources", {})
+        self._entries: Dict[str, Dict] = index["entries"]
+        self.mask_info: Optional[MocMaskInfo] = (
+            MocMaskInfo.from_dict(index["masks"]) if "masks" in index else None
+        )
+
+    def __enter__(self) -> "AssetPack":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """釋放對映（仍被引用的 memoryview 會使 mmap 延後關閉）"""
+        if self._mmap is None:
+            return
+        self._view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+        self._mmap = None
+
+    # ---- 查詢 ----
+
+    def names(self) -> List[str]:
+        return list(self._entries)
+
+    def kind(self, name: str) -> str:
+        return self._entries[name]["kind"]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def read(self, name: str) -> memoryview:
+        """取得檔案內容（零複製）"""
+        entry = self._entries[name]
+        return self._view[entry["offset"]:entry["offset"] + entry["length"]]
+
+    def read_json(self, name: str) -> Dict:
+        return json.loads(bytes(self.read(name)))
+
+    @property
+    def model_config(self) -> Dict:
+        """封裝內的 .model3.json 內容"""
+        return self.read_json(self.model_name)
+
+    def motion(self, name: str) -> PackedMotion:
+        """取得預先轉換的動作曲線（Segments 為 float32 memoryview）"""
+        entry = self._entries[name]
+        if entry["kind"] != "motion":
+            raise ValueError(f"{name} 不是動作檔")
+        values = self.read(name).cast("f")
+        meta = entry["meta"]
+        curves = [
+            PackedCurve(
+                target=c["Target"],
+                id=c["Id"],
+                segments=values[c["offset"]:c["offset"] + c["count"]],
+                fade_in=c.get("FadeInTime"),
+                fade_out=c.get("FadeOutTime"),
+            )
+            for c in meta["Curves"]
+        ]
+        return PackedMotion(meta=meta["Meta"], curves=curves, user_data=meta["UserData"])
+
+    def motion_meta(self, name: str) -> Dict:
+        """只取動作的 Meta（不觸及曲線資料）"""
+        return self._entries[name]["meta"]["Meta"]
+
+    def texture(self, name: str) -> PackedTexture:
+        entry = self._entries[name]
+        if entry["kind"] != "texture":
+            raise ValueError(f"{name} 不是貼圖")
+        return PackedTexture(entry["width"], entry["height"], entry["format"], self.read(name))
+
+    def is_stale(self, runtime_dir: Path) -> bool:
+        """來源檔案大小 / 修改時間與建置時不同（或已不存在）時視為過期"""
+        runtime_dir = Path(runtime_dir)
+        try:
+            current = _source_signature(runtime_dir, self.sources)
+        except OSError:
+            return True
+        return current != self.sources
+
+
+def open_pack_for(model_path: Path) -> Optional[AssetPack]:
+    """開啟角色的封裝檔；不存在、損毀或已過期時回傳 None（呼叫端改用原始檔案）"""
+    path = pack_path_for(model_path)
+    if not path.exists():
+        return None
+    try:
+        pack = AssetPack(path)
+    except (OSError, ValueError) as e:
+        print(f"警告: 無法開啟角色封裝檔 {path}: {e}")
+        return None
+    if pack.is_stale(Path(model_path).parent):
+        print(f"角色封裝檔已過期，改用原始檔案（請重新執行 python -m src.asset_pack build）: {path}")
+        pack.close()
+        return None
+    return pack
+
+
+# 封裝檔路徑 -> (AssetPack, 開啟時的檔案大小與修改時間)
+_shared_packs: Dict[Path, Tuple[AssetPack, Tuple[int, int]]] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_pack_for(model_path: Path) -> Optional[AssetPack]:
+    """
+    與 open_pack_for 相同，但每個封裝檔只保留一個開啟中的 AssetPack（CharacterLoader 共用，呼叫端不需關閉）。
+    每次取得時仍檢查來源檔案是否過期、封裝檔是否被重新建置。
+    """
+    path = pack_path_for(model_path)
+    with _shared_lock:
+        cached = _shared_packs.pop(path, None)
+        if cached is not None:
+            pack, signature = cached
+            try:
+                st = path.stat()
+                current = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                current = None
+            if current == signature and not pack.is_stale(Path(model_path).parent):
+                _shared_packs[path] = cached
+                return pack
+            pack.close()
+        pack = open_pack_for(model_path)
+        if pack is not None:
+            st = path.stat()
+            _shared_packs[path] = (pack, (st.st_size, st.st_mtime_ns))
+        return pack
+
+
+def close_shared_packs():
+    """關閉所有共用的封裝檔（結束程式或重新建置封裝檔前）"""
+    with _shared_lock:
+        packs = [pack for pack, _ in _shared_packs.values()]
+        _shared_packs.clear()
+    for pack in packs:
+        pack.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="角色素材封裝工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("build", help="建置封裝檔")
+    p.add_argument("models", nargs="*", type=Path, help=".model3.json 路徑")
+    p.add_argument("--all", action="store_true", help="建置所有內建角色")
+    p.add_argument("--no-decode", action="store_true", help="貼圖保留 PNG，不預先解碼")
+
+    p = sub.add_parser("info", help="顯示封裝檔內容")
+    p.add_argument("pack", type=Path)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        models = list(args.models)
+        if args.all:
+            from src.character_library import get_available_characters
+
+            models.extend(c.model_path for c in get_available_characters())
+        if not models:
+            parser.error("請指定 .model3.json 路徑或使用 --all")
+        for model in models:
+            out = build_pack(model, decode_textures=not args.no_decode)
+            print(f"{out}  ({out.stat().st_size / 1024:.0f} KB)")
+    else:
+        with AssetPack(args.pack) as pack:
+            print(f"model: {pack.model_name}")
+            for name in pack.names():
+                entry = pack._entries[name]
+                print(f"  {entry['kind']:<8} {entry['length']:>10}  {name}")
+
+
+if __name__ == "__main__":
+    main()
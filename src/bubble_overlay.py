@@ -0,0 +1,189 @@
+"""
+泡泡框疊加層模組 - 將對話泡泡直接繪製在 Live2D 的 OpenGL 畫面中
+取代額外的半透明置頂視窗：文字只在內容改變時光柵化成快取影像，
+每一幀由 Live2DWidget 在同一次 GL 繪製中貼上（QPainter 的 GL 引擎會以貼圖繪製並快取）。
+文件內容與 ChatBubble 共用 IncrementalDocument：串流時只替換最後的開啟區塊，不重新產生整份文件。
+"""
+from __future__ import annotations
+
+import time
+from typing import Callable, Optional
+
+from PyQt6.QtCore import QObject, QPointF, QRect, QRectF
+from PyQt6.QtGui import QColor, QFont, QImage, QPainter, QPen, QTextDocument
+
+from src.chat_bubble import IncrementalDocument
+from src.scheduler import scheduler
+
+
+class BubbleOverlay(QObject):
+    """
+    與 ChatBubble 相同介面的疊加層泡泡框。
+
+    - 不建立任何視窗，也不需要跟隨主視窗 move()
+    - 淡入 / 淡出依繪製時間計算，沿用 Live2D 的繪製節奏，不另開動畫計時器
+    """
+
+    FADE_MS = 300.0
+
+    def __init__(self, host, parent: Optional[QObject] = None):
+        """
+        Args:
+            host: 承載疊加層的 Live2DWidget（需在 paintGL 中呼叫 paint()）
+        """
+        super().__init__(parent or host)
+        self.host = host
+        self.text = ""
+        self.paint_callback: Optional[Callable[[], None]] = None
+        self.auto_hide_timer = scheduler.timer(self.fade_out, slack=0.05, owner=self)
+
+        self.font = QFont("Microsoft YaHei", 10)
+        self._document = QTextDocument()
+        self._document.setDefaultFont(self.font)
+        self._document.setDocumentMargin(10)
+        self._content = IncrementalDocument(self._document)
+
+        self._visible = False
+        self._fade_start = 0.0
+        self._fading_out = False
+        self._scroll = 0.0          # 從底部往上捲動的像素數
+        self._image: Optional[QImage] = None
+        self._image_key = None      # (寬, 高, dpr, 捲動, 文件版本) 變化時重新光柵化
+
+    # ---- 與 ChatBubble 相容的介面 ----
+
+    def rect(self) -> QRect:
+        """疊加層在 host 內的位置（上方區域）"""
+        w = max(80, self.host.width() - 20)
+        h = max(60, min(200, int(self.host.height() * 0.42)))
+        return QRect(10, 8, w, h)
+
+    def width(self) -> int:
+        return self.rect().width()
+
+    def height(self) -> int:
+        return self.rect().height()
+
+    def isVisible(self) -> bool:
+        return self._visible
+
+    def move(self, *args):
+        """疊加層跟隨 GL 畫面，不需移動"""
+
+    def close(self):
+        self.auto_hide_timer.stop()
+        self._visible = False
+        self._image = None
+
+    def show_message(self, text: str, duration: int = 10000):
+        self.text = text
+        self._content.set_text(text)
+        self._scroll = 0.0
+        if not self._visible or self._fading_out:
+            self._visible = True
+            self._fading_out = False
+            self._fade_start = time.monotonic()
+        if duration > 0:
+            self.auto_hide_timer.start(duration)
+        self.host.update()
+
+    def set_text_live(self, text: str):
+        self.text = text
+        self._content.update_text(text)
+        self.host.update()
+
+    def finish_live(self):
+        self._content.finish()
+        self.host.update()
+
+    def fade_out(self):
+        if self._visible and not self._fading_out:
+            self._fading_out = True
+            self._fade_start = time.monotonic()
+            self.host.update()
+
+    def release_caches(self):
+        """釋放隱藏時不需要的渲染快取與光柵化影像（休眠時呼叫）"""
+        if self._visible:
+            return
+        self.text = ""
+        self._content.reset()
+        self._image = None
+
+    def show_transcript(self, entries):
+        """疊加層空間有限：以最後幾則訊息的純文字呈現"""
+        lines = []
+        for e in list(entries)[-6:]:
+            who = "你" if e["role"] == "user" else "助手"
+            lines.append(f"**{who}**：{e['content']}")
+        self.show_message("\n\n".join(lines), duration=0)
+
+    def is_showing_transcript(self) -> bool:
+        return False
+
+    # ---- 互動 ----
+
+    def contains(self, pos: QPointF) -> bool:
+        return self._visible and QRectF(self.rect()).contains(pos)
+
+    def scroll_by(self, pixels: float):
+        """捲動內容（正值往上看較早的內容）"""
+        max_scroll = max(0.0, self._document.size().height() - self.rect().height())
+        new_scroll = min(max_scroll, max(0.0, self._scroll + pixels))
+        if new_scroll != self._scroll:
+            self._scroll = new_scroll
+            self.host.update()
+
+    # ---- 繪製 ----
+
+    def _opacity(self) -> float:
+        t = min(1.0, (time.monotonic() - self._fade_start) * 1000.0 / self.FADE_MS)
+        if self._fading_out:
+            if t >= 1.0:
+                self._visible = False
+            return (1.0 - t) ** 3
+        return 1.0 - (1.0 - t) ** 3  # OutCubic，與 ChatBubble 淡入一致
+
+    def _rasterize(self, rect: QRect, dpr: float):
+        """內容（文件版本）或尺寸改變時才重新光柵化文字"""
+        self._document.setTextWidth(rect.width())
+        key = (rect.width(), rect.height(), dpr, self._scroll, self._document.revision())
+        if self._image is not None and key == self._image_key:
+            return
+
+        image = QImage(int(rect.width() * dpr), int(rect.height() * dpr),
+                       QImage.Format.Format_ARGB32_Premultiplied)
+        image.setDevicePixelRatio(dpr)
+        image.fill(QColor(0, 0, 0, 0))
+        p = QPainter(image)
+        p.setRenderHint(QPainter.RenderHint.Antialiasing)
+        bg = QRectF(1, 1, rect.width() - 2, rect.height() - 2)
+        p.setBrush(QColor(255, 255, 255, 240))
+        p.setPen(QPen(QColor(200, 200, 200, 200), 2))
+        p.drawRoundedRect(bg, 15, 15)
+        # 內容超出時預設顯示最底部（最新的串流內容）
+        doc_h = self._document.size().height()
+        offset = max(0.0, doc_h - rect.height()) - self._scroll
+        p.setClipRect(bg.adjusted(4, 4, -4, -4))
+        p.translate(0, -offset)
+        self._document.drawContents(p, QRectF(0, offset, rect.width(), rect.height()))
+        p.end()
+        self._image = image
+        self._image_key = key
+
+    def paint(self, painter: QPainter):
+        """由 host 在 GL 繪製後呼叫"""
+        if not self._visible:
+            return
+        opacity = self._opacity()
+        rect = self.rect()
+        self._rasterize(rect, self.host.devicePixelRatioF())
+        if self._visible and self._image is not None:
+            painter.setOpacity(opacity)
+            painter.drawImage(rect.topLeft(), self._image)
+            painter.setOpacity(1.0)
+        if self._visible and (opacity < 1.0 or self._fading_out):
+            # 淡入 / 淡出期間持續要求重繪（模型未載入時沒有動畫計時器驅動）
+            self.host.update()
+        if self.paint_callback:
+            self.paint_callback()
@@ -7,20 +7,26 @@ import json
 from pathlib import Path
 from typing import Dict, Optional, List
 
+from src.asset_pack import AssetPack, shared_pack_for
+from src.mask_buffer import MaskBufferPlan, MocMaskInfo, mask_info_index, plan_mask_buffers
+
 
 class CharacterLoader:
     """Live2D 角色載入器"""
     
-    def __init__(self, model_path: Path):
+    def __init__(self, model_path: Path, use_pack: bool = True):
         """
         初始化角色載入器
         
         Args:
             model_path: Live2D 模型文件的路徑（.model3.json 文件）
+            use_pack: 若存在最新的 .l2dpack 封裝檔，優先從封裝檔讀取中繼資料
+                （同一封裝檔由所有 CharacterLoader 共用一個 mmap，不需關閉）
         """
         self.model_path = Path(model_path)
         self.runtime_path = self.model_path.parent / "runtime"
         self.model_config: Optional[Dict] = None
+        self.asset_pack: Optional[AssetPack] = shared_pack_for(self.model_path) if use_pack else None
     
     def load_model_config(self) -> Dict:
         """
@@ -29,6 +35,10 @@ class CharacterLoader:
         Returns:
             模型配置字典
         """
+        if self.asset_pack is not None:
+            self.model_config = self.asset_pack.model_config
+            return self.model_config
+
         if not self.model_path.exists():
             raise FileNotFoundError(f"模型文件不存在: {self.model_path}")
         
@@ -87,3 +97,49 @@ class CharacterLoader:
                 expressions[name] = self.runtime_path / file_path
         
         return expressions
+
+    def get_motion_meta(self) -> Dict[str, List[Dict]]:
+        """
+        獲取各動作群組的 Meta（Duration、Fps、Loop 等）。
+        有封裝檔時直接讀取索引，不需開啟任何動作檔。
+        """
+        if not self.model_config:
+            self.load_model_config()
+
+        motions_config = self.model_config.get("FileReferences", {}).get("Motions", {})
+        result: Dict[str, List[Dict]] = {}
+        for motion_group, motion_files in motions_config.items():
+            metas = []
+            for motion in motion_files:
+                name = motion["File"]
+                if self.asset_pack is not None and name in self.asset_pack:
+                    metas.append(self.asset_pack.motion_meta(name))
+                    continue
+                try:
+                    with open(self.model_path.parent / name, 'r', encoding='utf-8') as f:
+                        metas.append(json.load(f).get("Meta", {}))
+                except (OSError, ValueError):
+                    metas.append({})
+            result[motion_group] = metas
+
+        return result
+
+    def get_mask_info(self) -> Optional[MocMaskInfo]:
+        """
+        獲取模型的遮罩使用量。
+        優先讀取封裝檔索引，否則讀取 .moc3 並快取於快取目錄；無法解析時回傳 None。
+        """
+        if self.asset_pack is not None and self.asset_pack.mask_info is not None:
+            return self.asset_pack.mask_info
+        if not self.model_config:
+            self.load_model_config()
+
+        moc_file = self.model_config.get("FileReferences", {}).get("Moc")
+        if not moc_file:
+            return None
+        return mask_info_index.get(self.model_path.parent / moc_file)
+
+    def get_mask_buffer_plan(self, region_px: int = 128) -> Optional[MaskBufferPlan]:
+        """依遮罩使用量決定 mask buffer 數量與解析度（無法讀取 .moc3 時回傳 None）"""
+        info = self.get_mask_info()
+        return plan_mask_buffers(info, region_px) if info is not None else None
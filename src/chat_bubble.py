@@ -3,10 +3,134 @@
 """
 from __future__ import annotations
 
-from PyQt6.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve, pyqtProperty
-from PyQt6.QtGui import QPainter, QColor, QFont, QPen
+import json
+from typing import Callable, Optional
+
+from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve, pyqtProperty
+from PyQt6.QtGui import QPainter, QColor, QFont, QPen, QTextCursor, QTextDocument
 from PyQt6.QtWidgets import QWidget, QTextEdit, QFrame
 
+from src.markdown_renderer import IncrementalMarkdownRenderer
+from src.scheduler import scheduler
+from src.virtual_text_view import VirtualTextView
+
+
+def json_code_block(text: str) -> Optional[str]:
+    """整段為有效 JSON 時回傳美化後的 json 程式碼區塊，否則回傳 None"""
+    stripped = text.strip()
+    if not (stripped.startswith('{') or stripped.startswith('[')):
+        return None
+    try:
+        parsed = json.loads(text)
+    except (ValueError, RecursionError):
+        return None  # 不是有效 JSON，保持原樣
+    return "```json\n" + json.dumps(parsed, indent=2, ensure_ascii=False) + "\n```"
+
+
+def format_reply_text(text: str) -> str:
+    """
+    格式化回覆文本，保留換行和結構
+
+    Returns:
+        格式化後的 Markdown 文本（整段為有效 JSON 時轉為 json 程式碼區塊，否則為原文）
+    """
+    return json_code_block(text) or text
+
+
+class IncrementalDocument:
+    """
+    以增量 Markdown 渲染維護一份 QTextDocument（ChatBubble 與 BubbleOverlay 共用）：
+    已完成區塊插入文件後不再變動，每次更新只替換最後的開啟區塊。
+    串流期間不嘗試解析 JSON；是否以 JSON 程式碼區塊顯示只在 set_text() 與 finish() 時判斷一次。
+    """
+
+    def __init__(self, document: QTextDocument):
+        self.document = document
+        self.text = ""
+        self._renderer = IncrementalMarkdownRenderer()
+        self._open_block_pos = 0  # 文件中「開啟中區塊」的起始位置
+        # 內容已完成（整段訊息或串流結束，可能已改以 JSON 程式碼區塊顯示），之後的更新需整份重新渲染
+        self._sealed = False
+
+    def reset(self):
+        self.text = ""
+        self._renderer.reset()
+        self._open_block_pos = 0
+        self._sealed = False
+        self.document.clear()
+
+    def set_text(self, text: str):
+        """顯示一則完整訊息（整份重新渲染）"""
+        self._render_full(text, text)
+        self.finish()
+
+    def update_text(self, text: str):
+        """串流更新：只是在原內容後追加時只餵入新增的片段，否則整份重新渲染"""
+        previous = self.text
+        if not self._sealed and text.startswith(previous):
+            self.text = text
+            self._renderer.feed(text[len(previous):])
+            self._apply_render_update()
+        else:
+            self._render_full(text, text)
+
+    def finish(self):
+        """內容已完整：整段為 JSON 時改以程式碼區塊重新渲染，否則關閉最後的開啟區塊"""
+        if self._sealed:
+            return
+        block = json_code_block(self.text)
+        if block is not None:
+            self._render_full(self.text, block)
+        self._renderer.finish()
+        self._apply_render_update()
+        self._sealed = True
+
+    def _render_full(self, text: str, markdown: str):
+        """清空並重新渲染整份內容"""
+        self.reset()
+        self.text = text
+        self._renderer.feed(markdown)
+        self._apply_render_update()
+
+    def _apply_render_update(self):
+        """
+        將渲染器的變更套用到文件：
+        移除上一次的開啟區塊 → 附加新完成的區塊 → 插入目前開啟區塊。
+        已完成區塊不會被移除或重新產生。
+        """
+        closed = self._renderer.take_closed_html()
+        open_html = self._renderer.open_html()
+        cursor = QTextCursor(self.document)
+        cursor.beginEditBlock()
+        cursor.setPosition(self._open_block_pos)
+        cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        for block_html in closed:
+            self._insert_block_html(cursor, block_html)
+        self._open_block_pos = cursor.position()
+        if open_html:
+            self._insert_block_html(cursor, open_html)
+        cursor.endEditBlock()
+
+    @staticmethod
+    def _insert_block_html(cursor: QTextCursor, block_html: str):
+        if cursor.position() > 0:
+            cursor.insertBlock()
+        cursor.insertHtml(block_html)
+
+
+class _ReplyTextEdit(QTextEdit):
+    """回覆文字區：文字實際繪製到 viewport 後呼叫 on_paint（遙測 first_paint）"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.on_paint: Optional[Callable[[], None]] = None
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.on_paint:
+            self.on_paint()
+
 
 class ChatBubble(QWidget):
     """對話泡泡框組件（支持滾動和格式化顯示）"""
@@ -15,9 +139,7 @@ class ChatBubble(QWidget):
         super().__init__(parent)
         self.text = ""
         self._opacity = 0.0
-        self.auto_hide_timer = QTimer(self)
-        self.auto_hide_timer.timeout.connect(self.fade_out)
-        self.auto_hide_timer.setSingleShot(True)
+        self.auto_hide_timer = scheduler.timer(self.fade_out, slack=0.05, owner=self)
         
         # 泡泡框大小固定（過長內容用內部文字區滾動）
         self.fixed_width = 420
@@ -33,13 +155,12 @@ class ChatBubble(QWidget):
         
         # 設置字體
         self.font = QFont("Microsoft YaHei", 10)
-        self.code_font = QFont("Consolas", 9)  # 代碼字體
         
         # 設置固定大小
         self.setFixedSize(self.fixed_width, self.fixed_height)
 
         # 文字顯示區：使用 QTextEdit 處理多行與滾動
-        self.text_edit = QTextEdit(self)
+        self.text_edit = _ReplyTextEdit(self)
         self.text_edit.setReadOnly(True)
         # 取消邊框外觀
         self.text_edit.setFrameShape(QFrame.Shape.NoFrame)
@@ -58,6 +179,12 @@ class ChatBubble(QWidget):
             }
         """)
         self.text_edit.setFont(self.font)
+        # 增量 Markdown 渲染：已完成區塊插入文件後不再變動，每次更新只替換最後的開啟區塊
+        self._document = IncrementalDocument(self.text_edit.document())
+
+        # 對話紀錄檢視：虛擬化排版，只處理可見段落，長紀錄也不會讓排版物件無限成長
+        self.transcript_view = VirtualTextView(self, font=self.font)
+        self.transcript_view.hide()
         # 讓滑鼠滾輪直接作用在文字區
         self.setMouseTracking(True)
         
@@ -99,11 +226,8 @@ class ChatBubble(QWidget):
         # 大小固定，不再依內容改變；過長內容由內部 QTextEdit 滾動
         self.setFixedSize(self.fixed_width, self.fixed_height)
 
-        formatted = self._format_text(text)
-        # 根據內容型態切換字體
-        is_code = formatted.strip().startswith('{') or formatted.strip().startswith('[')
-        self.text_edit.setFont(self.code_font if is_code else self.font)
-        self.text_edit.setPlainText(formatted)
+        self._show_text_view()
+        self._document.set_text(text)
         self.text_edit.move(5, 5)
         self.text_edit.resize(self.width() - 10, self.height() - 10)
         
@@ -121,39 +245,68 @@ class ChatBubble(QWidget):
         適用於 LLM 串流過程中持續追加內容。
         """
         self.text = text
-        formatted = self._format_text(text)
-        # 這裡不切換字體，以免在使用者滾動時突然跳動；僅更新內容
+        self._show_text_view()
         # 保留 QTextEdit 目前的滾動位置
         scroll_bar = self.text_edit.verticalScrollBar()
         value = scroll_bar.value()
-        self.text_edit.setPlainText(formatted)
+        self._document.update_text(text)
         scroll_bar.setValue(value)
         self.update()
-    
-    def _format_text(self, text: str) -> str:
+
+    def finish_live(self):
+        """串流結束：關閉最後的區塊；整段回覆為 JSON 時改以程式碼區塊顯示"""
+        scroll_bar = self.text_edit.verticalScrollBar()
+        value = scroll_bar.value()
+        self._document.finish()
+        scroll_bar.setValue(value)
+        self.update()
+
+    def show_transcript(self, entries):
         """
-        格式化文本，保留換行和結構
-        
+        顯示對話紀錄（不自動隱藏）。
+
         Args:
-            text: 原始文本
-            
-        Returns:
-            格式化後的文本
+            entries: LLMClient.chat_history 格式的清單（{"role", "content"}）
         """
-        # 保留換行
-        formatted = text
-        
-        # 檢測 JSON 格式（簡單檢測）
-        if text.strip().startswith('{') or text.strip().startswith('['):
-            # 嘗試美化 JSON（簡單版本）
-            try:
-                import json
-                parsed = json.loads(text)
-                formatted = json.dumps(parsed, indent=2, ensure_ascii=False)
-            except:
-                pass  # 如果不是有效 JSON，保持原樣
-        
-        return formatted
+        self.auto_hide_timer.stop()
+        self.text_edit.hide()
+        self.transcript_view.setGeometry(5, 5, self.width() - 10, self.height() - 10)
+        self.transcript_view.set_entries((e["role"], e["content"]) for e in entries)
+        self.transcript_view.show()
+        if not self.isVisible() or self._opacity < 1.0:
+            self.show()
+            self.fade_in_animation.start()
+
+    def is_showing_transcript(self) -> bool:
+        return self.isVisible() and self.transcript_view.isVisible()
+
+    def release_caches(self):
+        """釋放隱藏時不需要的渲染快取與文件內容（休眠時呼叫）"""
+        if self.isVisible():
+            return
+        self.text = ""
+        self._document.reset()
+        self.transcript_view.clear()
+
+    @property
+    def paint_callback(self) -> Optional[Callable[[], None]]:
+        """文字區繪製完成後的回呼（供遙測記錄 first_paint；None 表示不使用）"""
+        return self.text_edit.on_paint
+
+    @paint_callback.setter
+    def paint_callback(self, callback: Optional[Callable[[], None]]):
+        self.text_edit.on_paint = callback
+
+    def _show_text_view(self):
+        """從對話紀錄切回一般回覆顯示"""
+        if self.transcript_view.isVisible():
+            self.transcript_view.hide()
+            self.transcript_view.clear()
+            self.text_edit.show()
+
+    def _format_text(self, text: str) -> str:
+        """格式化文本（見 format_reply_text）"""
+        return format_reply_text(text)
     
     def fade_out(self):
         """淡出並隱藏"""
@@ -173,3 +326,4 @@ class ChatBubble(QWidget):
         painter.setPen(QPen(QColor(200, 200, 200, 200), 2))
         painter.drawRoundedRect(rect, 15, 15)
         # 文字由內部 QTextEdit 負責繪製與滾動
+        painter.end()
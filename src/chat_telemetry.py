@@ -0,0 +1,300 @@
+"""
+對話管線遙測模組 - 記錄每則訊息的延遲分段（TTFT、吞吐量、GUI 執行緒耗時）
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Optional
+
+
+# 每則訊息依序經過的標記點（submit → request_sent → first_token → first_paint → last_token → finished）
+SPAN_MARKS = (
+    "submit",
+    "worker_started",
+    "request_sent",
+    "first_token",
+    "first_paint",
+    "last_token",
+    "finished",
+)
+
+
+class ErrorChunk(str):
+    """
+    以串流片段回傳的錯誤訊息（stream_message 在 raise_errors=False 時產生）。
+    遙測不將其計為 token，GUI / 無頭模式改走錯誤路徑。
+    """
+
+
+class ToolStatusChunk(str):
+    """
+    工具呼叫的狀態行（「🔧 工具 完成（N ms）」等）。
+    只供 UI 顯示：不寫入對話歷史 / 長期記憶，遙測也不計為輸出 token。
+    """
+
+
+def _now_us() -> int:
+    """單調時鐘（微秒），所有標記共用同一時間基準"""
+    return time.perf_counter_ns() // 1000
+
+
+@dataclass
+class ChatTrace:
+    """單則訊息的追蹤紀錄"""
+
+    trace_id: int
+    message_chars: int
+    marks: Dict[str, int] = field(default_factory=dict)  # 標記名稱 -> 時間戳（微秒）
+    chunk_count: int = 0
+    output_chars: int = 0
+    gui_chunk_us: List[int] = field(default_factory=list)  # 每個片段在 GUI 執行緒的處理耗時
+    stopped: bool = False
+    error: Optional[str] = None
+    cjk_ratio: float = 0.0  # 輸出文字中 CJK 字元比例，用於 token 估算
+
+    def mark(self, name: str, ts_us: Optional[int] = None):
+        """記錄標記點；同名標記只保留第一次（例如 first_token）"""
+        if name not in self.marks:
+            self.marks[name] = ts_us if ts_us is not None else _now_us()
+
+    def duration_ms(self, start: str, end: str) -> Optional[float]:
+        """兩個標記點之間的耗時（毫秒），任一缺失時回傳 None"""
+        if start in self.marks and end in self.marks:
+            return (self.marks[end] - self.marks[start]) / 1000.0
+        return None
+
+    @property
+    def ttft_ms(self) -> Optional[float]:
+        """Time-to-first-token：送出到收到第一個片段"""
+        return self.duration_ms("submit", "first_token")
+
+    @property
+    def tokens_per_sec(self) -> Optional[float]:
+        """
+        生成吞吐量（估算 token/秒）。
+        Gemini 串流片段不附 token 數，這裡以字元數估算（約 4 字元 / token，CJK 約 1 字 / token）。
+        """
+        span = self.duration_ms("first_token", "last_token")
+        if not span or span <= 0:
+            return None
+        return estimate_tokens_from_chars(self.output_chars, self.cjk_ratio) / (span / 1000.0)
+
+    def summary(self) -> Dict:
+        """轉為可序列化的摘要字典"""
+        gui = self.gui_chunk_us
+        return {
+            "trace_id": self.trace_id,
+            "message_chars": self.message_chars,
+            "output_chars": self.output_chars,
+            "chunks": self.chunk_count,
+            "stopped": self.stopped,
+            "error": self.error,
+            "marks_us": dict(self.marks),
+            "ttft_ms": self.ttft_ms,
+            "first_paint_ms": self.duration_ms("submit", "first_paint"),
+            "total_ms": self.duration_ms("submit", "finished"),
+            "tokens_per_sec": self.tokens_per_sec,
+            "gui_chunk_ms_total": sum(gui) / 1000.0,
+            "gui_chunk_ms_max": (max(gui) / 1000.0) if gui else 0.0,
+        }
+
+
+def estimate_tokens_from_chars(chars: int, cjk_ratio: float = 0.0) -> float:
+    """以字元數估算 token 數（英文約 4 字元 / token，CJK 約 1 字 / token）"""
+    return chars * (cjk_ratio * 1.0 + (1.0 - cjk_ratio) * 0.25)
+
+
+def _cjk_ratio(text: str) -> float:
+    if not text:
+        return 0.0
+    cjk = sum(1 for ch in text if "　" <= ch <= "鿿" or "豈" <= ch <= "﫿")
+    return cjk / len(text)
+
+
+def estimate_tokens(text: str) -> float:
+    """估算一段文字的 token 數（依其中 CJK 字元比例）"""
+    return estimate_tokens_from_chars(len(text), _cjk_ratio(text))
+
+
+class ChatTelemetry:
+    """
+    對話遙測收集器。
+    以固定容量的環形緩衝保存最近的追蹤紀錄，可匯出為 JSON 或 Chrome trace 格式
+    （chrome://tracing / Perfetto 可直接開啟）。
+
+    標記可由背景執行緒（串流 worker）與 GUI 執行緒同時寫入，以鎖保護。
+    """
+
+    def __init__(self, capacity: int = 200, enabled: bool = True, verbose: bool = True):
+        self.enabled = enabled
+        self.verbose = verbose  # 每則訊息結束時是否列印摘要
+        self._traces: Deque[ChatTrace] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def begin(self, message: str) -> Optional[ChatTrace]:
+        """開始一則新訊息的追蹤；停用時回傳 None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            trace = ChatTrace(trace_id=self._next_id, message_chars=len(message))
+            self._next_id += 1
+            trace.mark("submit")
+            self._traces.append(trace)
+        return trace
+
+    def mark(self, trace: Optional[ChatTrace], name: str):
+        """在指定 trace 上記錄標記點（trace 為 None 時不做事）"""
+        if trace is None:
+            return
+        ts = _now_us()
+        with self._lock:
+            trace.mark(name, ts)
+
+    def mark_latest(self, trace: Optional[ChatTrace], name: str):
+        """覆寫標記點為目前時間（例如 last_token 隨每個片段前移）"""
+        if trace is None:
+            return
+        ts = _now_us()
+        with self._lock:
+            trace.marks[name] = ts
+
+    def record_chunk(self, trace: Optional[ChatTrace], chunk: str, gui_elapsed_us: int):
+        """記錄一個串流片段在 GUI 執行緒的處理耗時"""
+        if trace is None:
+            return
+        with self._lock:
+            trace.chunk_count += 1
+            trace.output_chars += len(chunk)
+            trace.gui_chunk_us.append(gui_elapsed_us)
+
+    def finish(
+        self,
+        trace: Optional[ChatTrace],
+        full_text: str = "",
+        stopped: bool = False,
+        error: Optional[str] = None,
+    ):
+        """結束追蹤，並印出一行摘要"""
+        if trace is None:
+            return
+        with self._lock:
+            trace.mark("finished")
+            trace.stopped = stopped
+            trace.error = error
+            trace.cjk_ratio = _cjk_ratio(full_text)
+            summary = trace.summary()
+        if not self.verbose:
+            return
+
+        def _fmt(v: Optional[float]) -> str:
+            return f"{v:.0f}" if v is not None else "-"
+
+        tps = summary["tokens_per_sec"]
+        print(
+            f"[telemetry] #{trace.trace_id} ttft={_fmt(summary['ttft_ms'])}ms "
+            f"first_paint={_fmt(summary['first_paint_ms'])}ms "
+            f"total={_fmt(summary['total_ms'])}ms chunks={trace.chunk_count} "
+            f"tok/s={f'{tps:.1f}' if tps else '-'} "
+            f"gui={summary['gui_chunk_ms_total']:.1f}ms(max {summary['gui_chunk_ms_max']:.1f})"
+        )
+
+    def traces(self) -> List[ChatTrace]:
+        """取得目前緩衝中的所有追蹤紀錄（由舊到新）"""
+        with self._lock:
+            return list(self._traces)
+
+    def to_json(self) -> str:
+        """匯出所有追蹤摘要為 JSON 字串"""
+        # 串流 worker 可能仍在寫入標記：在鎖內產生摘要（summary 會複製標記）
+        with self._lock:
+            summaries = [t.summary() for t in self._traces]
+        return json.dumps(summaries, ensure_ascii=False, indent=2)
+
+    def to_chrome_trace(self) -> Dict:
+        """
+        轉換為 Chrome Trace Event 格式。
+        每則訊息佔一個 tid，相鄰標記之間輸出為 complete event（ph="X"），
+        GUI 片段處理輸出為 counter event。
+        """
+        events: List[Dict] = []
+        # 在鎖內複製標記與片段耗時，串流 worker 仍在寫入時也不會在迭代中改變
+        with self._lock:
+            snapshot = [(t.trace_id, dict(t.marks), list(t.gui_chunk_us)) for t in self._traces]
+        for tid, trace_marks, gui_chunk_us in snapshot:
+            marks = sorted(trace_marks.items(), key=lambda kv: kv[1])
+            events.append({
+                "name": "thread_name", "ph": "M", "pid": 1, "tid": tid,
+                "args": {"name": f"message #{tid}"},
+            })
+            for (name, ts), (next_name, next_ts) in zip(marks, marks[1:]):
+                events.append({
+                    "name": f"{name}→{next_name}", "cat": "chat", "ph": "X",
+                    "pid": 1, "tid": tid, "ts": ts, "dur": max(0, next_ts - ts),
+                })
+            for name, ts in marks:
+                events.append({
+                    "name": name, "cat": "mark", "ph": "i", "s": "t",
+                    "pid": 1, "tid": tid, "ts": ts,
+                })
+            if gui_chunk_us:
+                events.append({
+                    "name": "gui_chunk_ms", "ph": "C", "pid": 1, "tid": tid,
+                    "ts": trace_marks.get("finished", trace_marks.get("submit", 0)),
+                    "args": {
+                        "total": sum(gui_chunk_us) / 1000.0,
+                        "max": max(gui_chunk_us) / 1000.0,
+                    },
+                })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: Path):
+        """
+        匯出到檔案。副檔名為 .json 時輸出摘要；
+        檔名以 .trace.json 結尾時輸出 Chrome trace 格式。
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.name.endswith(".trace.json"):
+            content = json.dumps(self.to_chrome_trace(), ensure_ascii=False)
+        else:
+            content = self.to_json()
+        path.write_text(content, encoding="utf-8")
+        with self._lock:
+            count = len(self._traces)
+        print(f"[telemetry] 已匯出 {count} 筆追蹤紀錄: {path}")
+
+
+def traced_stream(
+    llm_client,
+    message: str,
+    telemetry: Optional[ChatTelemetry] = None,
+    trace: Optional[ChatTrace] = None,
+    **stream_kwargs,
+) -> Iterator[str]:
+    """
+    包裝 llm_client.stream_message，於串流執行緒中記錄
+    worker_started / request_sent / first_token / last_token 標記。
+    錯誤片段（ErrorChunk）與工具狀態行（ToolStatusChunk）不計入 first_token / last_token。
+    GUI 串流 worker 與無頭模式共用。
+    """
+    if telemetry is None or trace is None:
+        yield from llm_client.stream_message(message, **stream_kwargs)
+        return
+
+    telemetry.mark(trace, "worker_started")
+    stream = llm_client.stream_message(
+        message,
+        on_request=lambda: telemetry.mark(trace, "request_sent"),
+        **stream_kwargs,
+    )
+    for delta in stream:
+        if delta and not isinstance(delta, (ErrorChunk, ToolStatusChunk)):
+            telemetry.mark(trace, "first_token")
+            telemetry.mark_latest(trace, "last_token")
+        yield delta
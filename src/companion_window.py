@@ -0,0 +1,57 @@
+"""
+同伴角色視窗模組 - 與主角色同時顯示在桌面上的額外角色
+只有 Live2D 畫面（沒有輸入框與對話泡泡），與主視窗共用同一份 Live2D 執行環境。
+"""
+from PyQt6.QtCore import Qt, QPoint, pyqtSignal
+from PyQt6.QtWidgets import QMenu, QVBoxLayout, QWidget
+
+from src.character_library import CharacterInfo
+from src.live2d_widget import Live2DWidget
+
+
+class CompanionWindow(QWidget):
+    """無邊框、透明背景的同伴角色視窗；左鍵拖動，右鍵選單關閉"""
+
+    closed = pyqtSignal(str)  # 角色 ID
+
+    def __init__(self, character: CharacterInfo, parent=None):
+        super().__init__(parent)
+        self.character = character
+        self._drag_position = QPoint()
+
+        self.setWindowFlags(
+            Qt.WindowType.FramelessWindowHint |
+            Qt.WindowType.WindowStaysOnTopHint |
+            Qt.WindowType.Tool
+        )
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+        # 關閉後刪除視窗，讓模型與 Live2D 引用一併釋放
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.setFixedSize(280, 400)
+        self.setWindowTitle(character.name)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.live2d_widget = Live2DWidget(self)
+        layout.addWidget(self.live2d_widget)
+        self.live2d_widget.load_model(character.model_path)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self._drag_position = event.globalPosition().toPoint() - self.frameGeometry().topLeft()
+            event.accept()
+
+    def mouseMoveEvent(self, event):
+        if event.buttons() == Qt.MouseButton.LeftButton:
+            self.move(event.globalPosition().toPoint() - self._drag_position)
+            event.accept()
+
+    def contextMenuEvent(self, event):
+        menu = QMenu(self)
+        menu.addAction("關閉", self.close)
+        menu.exec(event.globalPos())
+
+    def closeEvent(self, event):
+        self.live2d_widget.cleanup()
+        self.closed.emit(self.character.id)
+        event.accept()
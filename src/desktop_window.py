@@ -1,38 +1,68 @@
 """
 桌面視窗模組 - 實現透明背景的桌面角色顯示視窗
 """
+import gc
+import os
 import sys
+import threading
+import time
 from pathlib import Path
-from typing import Optional, List
+from typing import Dict, Optional, List
 
-from PyQt6.QtCore import Qt, QPoint, QTimer, pyqtSignal, QThread
-from PyQt6.QtGui import QPainter, QColor, QIcon
+from PyQt6.QtCore import Qt, QEvent, QObject, QPoint, pyqtSignal, QThread
+from PyQt6.QtGui import QPainter, QColor, QIcon, QKeySequence
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QMainWindow, QVBoxLayout, QHBoxLayout,
     QLineEdit, QPushButton, QSizePolicy
 )
 
 from src.live2d_widget import Live2DWidget
+from src.live2d_runtime import live2d_runtime
+from src.motion_queue import MotionPriority
+from src.companion_window import CompanionWindow
 from src.chat_bubble import ChatBubble
+from src.bubble_overlay import BubbleOverlay
 from src.llm_client import LLMClient
 from src.character_interaction import CharacterInteraction
 from src.character_library import CharacterInfo
+from src.chat_telemetry import ChatTelemetry, ChatTrace, ErrorChunk, ToolStatusChunk, estimate_tokens, traced_stream
+from src.document_summarizer import DocumentSource, DocumentSummarizer
+from src.rate_limiter import TokenBucket
+from src.response_prefetcher import ResponsePrefetcher
+from src.ipc_server import DEFERRED, IPCRequest
+from src.session_manager import GeminiAsyncBackend, SessionManager, SessionManagerThread
+from src.session_replay import SessionRecorder
+from src.hibernation import InactivityMonitor, memory_report
+from src.input_queue import PendingInputQueue
+from src.scheduler import scheduler
+from src.startup_snapshot import StartupState, save_startup_state, snapshot_enabled, startup_timer
+from src.tool_calling import TimerService, default_registry
 
 
 class LLMStreamWorker(QThread):
     """
     在背景執行 LLM 串流請求的工作執行緒。
-    透過 signal 將片段回傳給主執行緒更新 UI。
+    透過 signal 將片段回傳給主執行緒更新 UI；工具狀態行另以 status_received 傳送（只顯示不記錄）。
     """
     chunk_received = pyqtSignal(str)
+    status_received = pyqtSignal(str)
     error = pyqtSignal(str)
     finished = pyqtSignal()
 
-    def __init__(self, llm_client: LLMClient, message: str):
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        message: str,
+        telemetry: Optional[ChatTelemetry] = None,
+        trace: Optional[ChatTrace] = None,
+    ):
         super().__init__()
         self.llm_client = llm_client
         self.message = message
         self._stop_requested = False
+        # 遙測：在背景執行緒中記錄 request_sent / first_token / last_token
+        self._telemetry = telemetry
+        self._trace = trace
 
     def stop(self):
         """要求停止串流（盡快結束迭代）"""
@@ -40,10 +70,19 @@ class LLMStreamWorker(QThread):
 
     def run(self):
         try:
-            for delta in self.llm_client.stream_message(self.message):
+            stream = traced_stream(
+                self.llm_client, self.message, self._telemetry, self._trace
+            )
+            for delta in stream:
                 if self._stop_requested:
                     break
-                if delta:
+                if isinstance(delta, ErrorChunk):
+                    # 錯誤片段不當作回覆內容（也不計入遙測的輸出量）
+                    self.error.emit(str(delta))
+                    break
+                if isinstance(delta, ToolStatusChunk):
+                    self.status_received.emit(str(delta))
+                elif delta:
                     self.chunk_received.emit(delta)
         except Exception as e:
             self.error.emit(str(e))
@@ -51,8 +90,59 @@ class LLMStreamWorker(QThread):
             self.finished.emit()
 
 
+class DocumentSummaryWorker(QThread):
+    """
+    在背景執行文件分段摘要的工作執行緒。
+    與 LLMStreamWorker 相同的片段 / 狀態 / 錯誤 / 結束信號，另外以 progress 回報閱讀進度。
+    """
+    chunk_received = pyqtSignal(str)
+    status_received = pyqtSignal(str)
+    progress = pyqtSignal(str)
+    error = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, llm_client: LLMClient, source: DocumentSource, instruction: Optional[str] = None):
+        super().__init__()
+        self.source = source
+        self.instruction = instruction
+        self.summarizer = DocumentSummarizer.from_env(llm_client, on_progress=self.progress.emit)
+
+    def stop(self):
+        """要求停止（進行中的分段請求完成後結束）"""
+        self.summarizer.stop()
+
+    def run(self):
+        try:
+            for delta in self.summarizer.summarize(self.source, self.instruction):
+                if delta:
+                    self.chunk_received.emit(delta)
+        except Exception as e:
+            self.error.emit(f"文件摘要失敗: {e}")
+        finally:
+            self.finished.emit()
+
+
+class _SessionReplyBridge(QObject):
+    """將多對話引擎（背景事件迴圈）的回呼以 queued signal 轉回 GUI 執行緒"""
+    chunk = pyqtSignal(object, str)
+    done = pyqtSignal(object, str)
+    failed = pyqtSignal(object, str)
+
+
+class _ToolBridge(QObject):
+    """工具執行緒與 GUI 執行緒之間的橋接（剪貼簿只能在 GUI 執行緒存取、提醒到時更新泡泡框）"""
+    call = pyqtSignal(object)
+    timer_fired = pyqtSignal(str)
+
+
 class DesktopCharacterWindow(QMainWindow):
     """透明背景的桌面角色顯示視窗"""
+
+    # 信號：LLM 回覆片段 / 回覆完成（完整文字）/ 回覆失敗（錯誤訊息）
+    # 供 IPC 等外部呼叫端訂閱串流結果
+    reply_chunk = pyqtSignal(str)
+    reply_finished = pyqtSignal(str)
+    reply_failed = pyqtSignal(str)
     
     def __init__(
         self,
@@ -60,14 +150,17 @@ class DesktopCharacterWindow(QMainWindow):
         parent=None,
         characters: Optional[List[CharacterInfo]] = None,
         initial_character_id: Optional[str] = None,
+        startup_state: Optional[StartupState] = None,
     ):
         super().__init__(parent)
+        # 上次結束時保存的視窗位置與快照（用於立即顯示第一幀）
+        self.startup_state = startup_state
         self._drag_position = QPoint()
         self.model_path = model_path
         self.characters: List[CharacterInfo] = characters or []
         self._current_character_index: int = 0
         self.live2d_widget: Optional[Live2DWidget] = None
-        self.chat_bubble: Optional[ChatBubble] = None
+        self.chat_bubble: Optional[ChatBubble] = None  # 或 BubbleOverlay（疊加層模式）
         self.llm_client: Optional[LLMClient] = None
         self.text_input: Optional[QLineEdit] = None
         self.voice_button: Optional[QPushButton] = None
@@ -75,14 +168,59 @@ class DesktopCharacterWindow(QMainWindow):
         self.send_button: Optional[QPushButton] = None
         self.character_interaction: Optional[CharacterInteraction] = None
         self._interaction_locked = False
-        self._interaction_lock_timer = QTimer(self)
-        self._interaction_lock_timer.setSingleShot(True)
-        self._interaction_lock_timer.timeout.connect(self._unlock_interaction)
+        self._interaction_lock_timer = scheduler.timer(self._unlock_interaction, slack=0.05, owner=self)
 
         # LLM 串流相關狀態
-        self._llm_worker: Optional[LLMStreamWorker] = None
+        self._llm_worker: Optional[QThread] = None
         self._current_stream_text: str = ""
+        # 泡泡框顯示的內容：回覆加上工具狀態行 / 串流期間到期的提醒（這些不寫入回覆與紀錄）
+        self._current_display_text: str = ""
+        self._stream_reminders: List[str] = []
+        # 串流期間對輸入的提示（佇列已滿、重複等），暫時附加在泡泡框內容之後
+        self._input_notice: str = ""
+        self._input_notice_timer = scheduler.timer(self._clear_input_notice, owner=self)
         self._is_streaming: bool = False
+        self._stream_stopped_by_user: bool = False
+
+        # 對話遙測（預設停用，CHAT_TELEMETRY=1 啟用；CHAT_TRACE_FILE 指定關閉時的匯出路徑）
+        self.telemetry = ChatTelemetry(
+            enabled=os.getenv("CHAT_TELEMETRY", "0") == "1",
+        )
+        self._current_trace: Optional[ChatTrace] = None
+
+        # 互動錄製（SESSION_RECORD_FILE 指定輸出檔，關閉視窗時寫出；以 python -m src.session_replay 回放）
+        self.session_recorder: Optional[SessionRecorder] = SessionRecorder.from_env()
+
+        # 串流期間輸入的訊息先排隊，回覆結束後合併送出（INPUT_QUEUE=0 停用）
+        self.input_queue: Optional[PendingInputQueue] = PendingInputQueue.from_env()
+
+        # 點擊回應預取（INTERACTION_PREFETCH=1 啟用；於 _init_ui 建立 LLM 客戶端後初始化）
+        self.response_prefetcher: Optional[ResponsePrefetcher] = None
+        self._prefetch_idle_timer = scheduler.timer(self._on_prefetch_idle, single_shot=False, slack=0.25, owner=self)
+
+        # 多對話引擎（IPC "chat" 指令使用；第一次使用時才建立）
+        self._session_thread: Optional[SessionManagerThread] = None
+        self._session_bridge = _SessionReplyBridge(self)
+        self._session_bridge.chunk.connect(lambda req, d: req.event("chunk", text=d))
+        self._session_bridge.done.connect(lambda req, text: req.reply(text))
+        self._session_bridge.failed.connect(lambda req, msg: req.error(msg))
+
+        # 本機工具呼叫（ASSISTANT_TOOLS=1 啟用；於 _init_ui 建立 LLM 客戶端後初始化）
+        self.tool_timers: Optional[TimerService] = None
+        self._tool_bridge = _ToolBridge(self)
+        self._tool_bridge.call.connect(lambda fn: fn())
+        self._tool_bridge.timer_fired.connect(self._on_tool_timer)
+
+        # 同伴角色：與主角色同時顯示的其他角色視窗（角色 ID -> 視窗）
+        self.companions: Dict[str, CompanionWindow] = {}
+
+        # 休眠：長時間閒置 / 隱藏後釋放模型與貼圖（HIBERNATE_IDLE_SEC / HIBERNATE_HIDDEN_SEC，皆為 0 時停用）
+        self.inactivity_monitor: Optional[InactivityMonitor] = InactivityMonitor.from_env(self)
+        self._last_hibernation_report: Optional[str] = None
+        if self.inactivity_monitor:
+            self.inactivity_monitor.timed_out.connect(self._hibernate)
+            self.inactivity_monitor.activity.connect(self._wake_from_hibernation)
+            self.inactivity_monitor.start()
 
         # 根據 initial_character_id 設定目前角色
         if self.characters and initial_character_id:
@@ -102,6 +240,9 @@ class DesktopCharacterWindow(QMainWindow):
             self.model_path = self.characters[0].model_path
 
         self._init_ui()
+        if self.session_recorder:
+            current = self._get_current_character()
+            self.session_recorder.start(current.id if current else None)
     
     def _init_ui(self):
         """初始化 UI 設置"""
@@ -131,10 +272,26 @@ class DesktopCharacterWindow(QMainWindow):
         self.live2d_widget.model_loaded.connect(self._on_model_loaded)
         self.live2d_widget.part_clicked.connect(self._on_part_clicked)
         layout.addWidget(self.live2d_widget, stretch=1)
+
+        # 啟動快照：角色與上次相同時，在模型載入前先顯示上次的最後一幀
+        current = self._get_current_character()
+        if (
+            self.startup_state
+            and snapshot_enabled()
+            and current
+            and current.id == self.startup_state.character_id
+        ):
+            self.live2d_widget.snapshot = self.startup_state.load_snapshot()
         
-        # 創建對話泡泡框（獨立置頂小視窗；不在透明視窗內）
-        # 注意：目前泡泡框不是主透明視窗的一部分，而是額外的 top-level widget
-        self.chat_bubble = ChatBubble()
+        # 創建對話泡泡框
+        # 預設為獨立置頂小視窗（額外的 top-level widget）；
+        # CHAT_BUBBLE_OVERLAY=1 時改為繪製在 Live2D GL 畫面中的疊加層，不再需要第二個半透明視窗
+        self._bubble_overlay_mode = os.getenv("CHAT_BUBBLE_OVERLAY", "0") == "1"
+        if self._bubble_overlay_mode:
+            self.chat_bubble = BubbleOverlay(self.live2d_widget)
+            self.live2d_widget.overlay = self.chat_bubble
+        else:
+            self.chat_bubble = ChatBubble()
         
         # 創建輸入區域
         input_widget = QWidget(self)
@@ -178,7 +335,7 @@ class DesktopCharacterWindow(QMainWindow):
         """
         self.send_button.setStyleSheet(self._send_style_normal)
         self.send_button.setToolTip("發送訊息")
-        self.send_button.clicked.connect(self._on_send_message)
+        self.send_button.clicked.connect(self._on_send_button)
         input_layout.addWidget(self.send_button)
 
         # 角色切換按鈕（若有多個角色才顯示）
@@ -225,6 +382,8 @@ class DesktopCharacterWindow(QMainWindow):
             }
         """)
         self.text_input.returnPressed.connect(self._on_send_message)
+        # 拖放檔案 / 貼上長文字時改走文件摘要
+        self.text_input.installEventFilter(self)
         input_layout.addWidget(self.text_input, stretch=1)
         
         # 語音輸入按鈕
@@ -257,6 +416,11 @@ class DesktopCharacterWindow(QMainWindow):
         except Exception as e:
             print(f"LLM 客戶端初始化失敗: {e}")
             print("對話功能將不可用")
+
+        if self.llm_client and os.getenv("INTERACTION_PREFETCH", "0") == "1":
+            self._init_response_prefetcher()
+        if self.llm_client and os.getenv("ASSISTANT_TOOLS", "0") == "1":
+            self._init_tools()
         
         # 初始化角色互動管理器與載入模型
         if self.model_path:
@@ -265,6 +429,70 @@ class DesktopCharacterWindow(QMainWindow):
         # 設置初始位置（桌面右下角）
         self._set_initial_position()
 
+    def _init_response_prefetcher(self):
+        """建立點擊回應預取器，並以閒置計時器定期補充回應池"""
+        pool_size = int(os.getenv("INTERACTION_PREFETCH_POOL", "3"))
+        per_hour = float(os.getenv("INTERACTION_PREFETCH_QUOTA", "30"))
+        self.response_prefetcher = ResponsePrefetcher(
+            self.llm_client,
+            pool_size=pool_size,
+            quota=TokenBucket.per_hour(per_hour, burst=min(per_hour, 6)),
+        )
+        self.response_prefetcher.start()
+        self._prefetch_idle_timer.start(20000)
+        print(f"點擊回應預取已啟用（每區 {pool_size} 則，每小時最多 {per_hour:g} 次請求）")
+
+    def _init_tools(self):
+        """建立本機工具（檔案搜尋、剪貼簿、允許清單指令、計時提醒）並交給 LLM 客戶端"""
+        self.tool_timers = TimerService(self._tool_bridge.timer_fired.emit)
+        registry = default_registry(
+            clipboard_get=lambda: self._call_in_gui(lambda: QApplication.clipboard().text()),
+            clipboard_set=lambda text: self._call_in_gui(lambda: QApplication.clipboard().setText(text)),
+            timers=self.tool_timers,
+        )
+        self.llm_client.set_tools(registry)
+        print(f"本機工具已啟用: {', '.join(registry.names())}")
+
+    def _call_in_gui(self, fn, timeout: float = 2.0):
+        """由工具執行緒呼叫：在 GUI 執行緒執行 fn 並等待結果"""
+        if QThread.currentThread() is self.thread():
+            return fn()
+        box = {}
+        done = threading.Event()
+
+        def run():
+            try:
+                box["value"] = fn()
+            except Exception as e:
+                box["error"] = e
+            finally:
+                done.set()
+
+        self._tool_bridge.call.emit(run)
+        if not done.wait(timeout):
+            raise TimeoutError("GUI 執行緒忙碌中")
+        if "error" in box:
+            raise box["error"]
+        return box.get("value")
+
+    def _on_tool_timer(self, message: str):
+        """計時提醒到期"""
+        self._touch_activity()
+        if not self.chat_bubble:
+            return
+        if self._is_streaming:
+            # 回覆串流中：附加在目前的泡泡框內容之後（不寫入回覆）
+            self._stream_reminders.append(message)
+            self._append_stream_display(f"\n\n⏰ {message}\n\n")
+        else:
+            self.chat_bubble.show_message(f"⏰ {message}", duration=10000)
+            self._update_bubble_position()
+
+    def _on_prefetch_idle(self):
+        """閒置時（未串流、未鎖定互動）才補充預取回應，避免與對話請求搶額度"""
+        if self.response_prefetcher and not self._is_streaming and not self._interaction_locked:
+            self.response_prefetcher.request_refill()
+
     def _lock_interaction(self, ms: int = 5000):
         """鎖定角色互動一段時間，避免回覆被連續點擊刷掉"""
         self._interaction_locked = True
@@ -274,7 +502,12 @@ class DesktopCharacterWindow(QMainWindow):
         self._interaction_locked = False
     
     def _set_initial_position(self):
-        """設置視窗初始位置"""
+        """設置視窗初始位置（優先使用上次結束時的位置）"""
+        if self.startup_state:
+            pos = QPoint(self.startup_state.x, self.startup_state.y)
+            if QApplication.screenAt(pos + QPoint(self.width() // 2, self.height() // 2)):
+                self.move(pos)
+                return
         screen = QApplication.primaryScreen().geometry()
         x = screen.width() - self.width() - 50
         y = screen.height() - self.height() - 100
@@ -307,6 +540,11 @@ class DesktopCharacterWindow(QMainWindow):
         self.character_interaction = CharacterInteraction(model_path)
         self.load_character(model_path)
 
+        current = self._get_current_character()
+        if self.response_prefetcher and current:
+            self.response_prefetcher.set_active_character(current.id, current.name)
+            self.response_prefetcher.request_refill()
+
     def _on_switch_character(self):
         """切換到下一個角色"""
         if not self.characters:
@@ -314,10 +552,31 @@ class DesktopCharacterWindow(QMainWindow):
 
         # 換下一個角色
         self._current_character_index = (self._current_character_index + 1) % len(self.characters)
+        self._apply_current_character()
+
+    def switch_character(self, character_id: str) -> bool:
+        """
+        切換到指定 ID 的角色。
+
+        Returns:
+            是否找到並切換到該角色
+        """
+        for idx, c in enumerate(self.characters):
+            if c.id == character_id:
+                if idx != self._current_character_index:
+                    self._current_character_index = idx
+                    self._apply_current_character()
+                return True
+        return False
+
+    def _apply_current_character(self):
+        """依目前的角色索引重新載入互動設定、模型與按鈕文字"""
         current = self._get_current_character()
         if not current:
             return
 
+        if self.session_recorder:
+            self.session_recorder.switch(current.id)
         self.model_path = current.model_path
         # 更新互動管理與模型
         self._init_character_state(self.model_path)
@@ -326,6 +585,41 @@ class DesktopCharacterWindow(QMainWindow):
         if self.switch_character_button:
             self.switch_character_button.setText(current.name)
     
+    # ---- 同伴角色 ----
+
+    def open_companion(self, character_id: str) -> bool:
+        """
+        在主視窗旁顯示另一個角色（共用同一份 Live2D 執行環境）。
+
+        Returns:
+            是否找到該角色（已開啟時只會把視窗移到最上層）
+        """
+        if character_id in self.companions:
+            self.companions[character_id].raise_()
+            return True
+        character = next((c for c in self.characters if c.id == character_id), None)
+        if character is None:
+            return False
+        window = CompanionWindow(character)
+        window.closed.connect(lambda cid: self.companions.pop(cid, None))
+        # 依序排在主視窗左側
+        offset = (len(self.companions) + 1) * (window.width() - 40)
+        window.move(max(0, self.x() - offset), self.y() + self.height() - window.height())
+        window.show()
+        self.companions[character_id] = window
+        return True
+
+    def close_companion(self, character_id: str) -> bool:
+        window = self.companions.get(character_id)
+        if window is None:
+            return False
+        window.close()
+        return True
+
+    def close_companions(self):
+        for window in list(self.companions.values()):
+            window.close()
+
     def _on_model_loaded(self, success: bool):
         """處理模型載入完成事件"""
         if success:
@@ -336,14 +630,91 @@ class DesktopCharacterWindow(QMainWindow):
         else:
             print("角色模型載入失敗，顯示佔位符")
     
+    # ---- 休眠 ----
+
+    def _touch_activity(self):
+        """程式化的互動（IPC、送出訊息）也算作活動，並在休眠中時喚醒"""
+        if self.inactivity_monitor:
+            self.inactivity_monitor.touch()
+
+    def _hibernate(self):
+        """閒置逾時：釋放模型 / 貼圖與 Python 端快取，並記錄前後的記憶體用量"""
+        if self._is_streaming or not self.live2d_widget:
+            return
+        before = self.live2d_widget.memory_stats()
+        if not self.live2d_widget.hibernate():
+            return
+        self._prefetch_idle_timer.stop()
+        if self.chat_bubble:
+            self.chat_bubble.release_caches()
+        gc.collect()
+        after = self.live2d_widget.memory_stats()
+        self._last_hibernation_report = memory_report(before, after)
+        print(f"進入休眠：{self._last_hibernation_report}")
+
+    def _wake_from_hibernation(self):
+        """休眠後的第一次互動：背景預讀素材並重新載入模型"""
+        if self.live2d_widget and self.live2d_widget.hibernated:
+            print("從休眠恢復，重新載入角色模型")
+            self.live2d_widget.wake()
+        if self.response_prefetcher and not self._prefetch_idle_timer.isActive():
+            self._prefetch_idle_timer.start()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.inactivity_monitor:
+            self.inactivity_monitor.set_hidden(False)
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        if self.inactivity_monitor:
+            self.inactivity_monitor.set_hidden(True)
+
     def closeEvent(self, event):
         """處理視窗關閉事件"""
+        if self.inactivity_monitor:
+            self.inactivity_monitor.stop()
+        if self.response_prefetcher:
+            self.response_prefetcher.stop()
+        if self._session_thread:
+            self._session_thread.stop()
+        if self.tool_timers:
+            self.tool_timers.cancel_all()
+        if self._llm_worker:
+            # 先停止進行中的回覆，避免匯出遙測時串流執行緒仍在寫入
+            self._llm_worker.stop()
+            self._llm_worker.wait(2000)
+        if self.llm_client and self.llm_client.memory:
+            # 等待背景執行緒寫完尚未嵌入的問答
+            self.llm_client.memory.close()
+        trace_file = os.getenv("CHAT_TRACE_FILE")
+        if trace_file and self.telemetry.traces():
+            try:
+                self.telemetry.export(Path(trace_file))
+            except Exception as e:
+                # 匯出失敗不影響之後的互動紀錄、啟動狀態保存與模型釋放
+                print(f"匯出遙測紀錄失敗: {e}")
+        if self.session_recorder:
+            try:
+                print(f"互動紀錄已寫入: {self.session_recorder.save()}（{len(self.session_recorder)} 筆）")
+            except OSError as e:
+                print(f"寫入互動紀錄失敗: {e}")
         if self.chat_bubble:
             self.chat_bubble.close()
+        self._save_startup_state()
+        self.close_companions()
         if self.live2d_widget:
             self.live2d_widget.cleanup()
         event.accept()
     
+    def _save_startup_state(self):
+        """保存目前角色、視窗位置與最後一幀，供下次啟動立即顯示"""
+        current = self._get_current_character()
+        if not current or not self.live2d_widget:
+            return
+        frame = self.live2d_widget.current_frame() if snapshot_enabled() else None
+        save_startup_state(current.id, self.x(), self.y(), frame)
+
     def mousePressEvent(self, event):
         """處理滑鼠按下事件（用於拖動）"""
         if event.button() == Qt.MouseButton.LeftButton:
@@ -357,15 +728,35 @@ class DesktopCharacterWindow(QMainWindow):
             event.accept()
     
     def mouseDoubleClickEvent(self, event):
-        """處理雙擊事件（可選：切換顯示/隱藏）"""
-        # TODO: 實現雙擊切換顯示狀態
-        pass
+        """處理雙擊事件：切換對話紀錄顯示"""
+        if not self.chat_bubble or self._is_streaming:
+            return
+        if self.chat_bubble.is_showing_transcript():
+            self.chat_bubble.fade_out()
+            return
+        history = self.llm_client.chat_history if self.llm_client else []
+        if not history:
+            self.chat_bubble.show_message("目前還沒有對話紀錄", duration=3000)
+        else:
+            self.chat_bubble.show_transcript(history)
+        self._update_bubble_position()
     
+    def _on_send_button(self):
+        """發送按鈕：串流中顯示為停止，一律停止生成"""
+        if self._is_streaming:
+            self._stop_streaming()
+            return
+        self._on_send_message()
+
     def _on_send_message(self):
         """處理發送 / 停止訊息"""
-        # 若正在串流中，按鈕行為改為「停止」
+        # 串流中：輸入框有文字時排隊等回覆結束，空白時停止生成
         if self._is_streaming:
-            self._stop_streaming()
+            message = self.text_input.text().strip() if self.text_input else ""
+            if message and self.input_queue:
+                self._queue_input(message)
+            else:
+                self._stop_streaming()
             return
 
         if not self.text_input or not self.llm_client:
@@ -375,11 +766,202 @@ class DesktopCharacterWindow(QMainWindow):
         if not message:
             return
 
+        # 輸入的是本機檔案路徑：不自動讀取上傳，請使用者改用拖放（保留輸入框內容）
+        if self._is_file_path(message):
+            if self.chat_bubble:
+                self.chat_bubble.show_message("要摘要檔案，請把檔案拖放到輸入框", duration=3000)
+                self._update_bubble_position()
+            return
+
         # 清空輸入框
         self.text_input.clear()
 
+        # 文字長到不適合單次送出：改為分段摘要
+        if self._is_document_text(message):
+            self.submit_document(DocumentSource.from_text(message))
+        else:
+            self.submit_prompt(message)
+
+    def _queue_input(self, message: str):
+        """串流期間的輸入：排入待送佇列（重複的訊息直接捨棄）"""
+        if self._is_file_path(message):
+            self._show_input_notice("要摘要檔案，請把檔案拖放到輸入框")
+            return
+        if self._is_document_text(message):
+            # 文件摘要無法與一般訊息合併，保留在輸入框等回覆結束
+            self._show_input_notice("請等目前的回覆結束後再送出文件")
+            return
+        status = self.input_queue.add(message)
+        if status == "full":
+            # 佇列已滿：保留在輸入框，稍後再送
+            self._show_input_notice(f"最多排入 {self.input_queue.max_messages} 則訊息，請等目前的回覆結束")
+            return
+        if status == "duplicate":
+            self._show_input_notice("相同的訊息已經送出或排入，不再重複送出")
+        self.text_input.clear()
+        self._update_input_hint()
+
+    def _show_input_notice(self, text: str):
+        """對輸入的提示：串流中附加在泡泡框內容之後 3 秒（不打斷回覆），否則直接顯示在泡泡框"""
+        if not self.chat_bubble:
+            return
+        if self._is_streaming:
+            self._input_notice = text
+            self._input_notice_timer.start(3000)
+            self._render_stream_display()
+        else:
+            self.chat_bubble.show_message(text, duration=3000)
+            self._update_bubble_position()
+
+    def _clear_input_notice(self):
+        if self._input_notice:
+            self._input_notice = ""
+            if self._is_streaming:
+                self._render_stream_display()
+
+    def _update_input_hint(self):
+        """輸入框提示：顯示排隊中的訊息數"""
+        if not self.text_input:
+            return
+        pending = self.input_queue.pending if self.input_queue else 0
+        if pending:
+            self.text_input.setPlaceholderText(f"已排入 {pending} 則訊息，回覆結束後送出...")
+        else:
+            self.text_input.setPlaceholderText("輸入訊息...")
+
+    def _flush_input_queue(self):
+        """回覆結束：把排隊的訊息合併為一則送出；送出失敗時放回輸入框"""
+        if not self.input_queue or not self.input_queue.pending:
+            return
+        if self.submit_prompt(self.input_queue.text):
+            self.input_queue.take()
+            self._update_input_hint()
+        else:
+            self._restore_queued_input()
+
+    def _restore_queued_input(self):
+        """把排隊的訊息放回輸入框（接在輸入框現有文字之前），不自動送出"""
+        if not self.input_queue or not self.input_queue.pending or not self.text_input:
+            return
+        # 輸入框只有單行：以空白連接
+        parts = self.input_queue.text.split("\n")
+        current = self.text_input.text().strip()
+        if current:
+            parts.append(current)
+        self.text_input.setText(" ".join(parts))
+        self.input_queue.clear()
+        self._update_input_hint()
+
+    def submit_prompt(self, message: str) -> bool:
+        """
+        送出提示詞並開始串流顯示（UI 輸入與 IPC 共用）。
+
+        Returns:
+            是否已開始（LLM 不可用或已在串流中時回傳 False）
+        """
+        message = message.strip()
+        if not message or not self.llm_client or self._is_streaming:
+            return False
+
+        if self.input_queue:
+            self.input_queue.note_sent(message)
+        # 遙測：從使用者送出開始計時
+        self._current_trace = self.telemetry.begin(message)
+        if self.session_recorder:
+            self.session_recorder.send(message)
+        self._touch_activity()
+
         # 開始串流顯示，並在期間鎖定角色點擊
         self._start_streaming(message)
+        return True
+
+    def submit_document(self, source: DocumentSource, instruction: Optional[str] = None) -> bool:
+        """
+        以分段摘要處理長文件，並把進度與最後的摘要串流到泡泡框。
+
+        Returns:
+            是否已開始（LLM 不可用或已在串流中時回傳 False）
+        """
+        if not self.llm_client or self._is_streaming:
+            return False
+        self._current_trace = self.telemetry.begin(f"（文件）{source.name}")
+        self._touch_activity()
+        worker = DocumentSummaryWorker(self.llm_client, source, instruction)
+        worker.progress.connect(self._on_document_progress)
+        self._run_stream_worker(worker)
+        return True
+
+    @staticmethod
+    def _is_document_text(text: str) -> bool:
+        """超過 DOCUMENT_THRESHOLD_TOKENS（預設 3000）的文字視為文件"""
+        threshold = float(os.getenv("DOCUMENT_THRESHOLD_TOKENS", "3000"))
+        # 先以字元數粗略排除短訊息，避免每次送出都逐字估算
+        return len(text) > threshold and estimate_tokens(text) > threshold
+
+    @staticmethod
+    def _is_file_path(text: str) -> bool:
+        """輸入的是本機檔案的絕對路徑（只有拖放的檔案才會被讀取上傳）"""
+        path = Path(text.strip("\"'"))
+        return len(text) < 1024 and path.is_absolute() and path.is_file()
+
+    @staticmethod
+    def _dropped_file(mime) -> Optional[Path]:
+        for url in mime.urls() if mime.hasUrls() else []:
+            if url.isLocalFile() and Path(url.toLocalFile()).is_file():
+                return Path(url.toLocalFile())
+        return None
+
+    def eventFilter(self, obj, event) -> bool:
+        """輸入框：拖放檔案或貼上長文字時改為文件摘要（輸入框內的文字作為額外指示）"""
+        if obj is self.text_input and self.llm_client:
+            etype = event.type()
+            if etype == QEvent.Type.KeyPress and event.matches(QKeySequence.StandardKey.Paste):
+                text = QApplication.clipboard().text()
+                if self._is_document_text(text):
+                    self._submit_document_from_input(DocumentSource.from_text(text))
+                    return True
+            elif etype in (QEvent.Type.DragEnter, QEvent.Type.DragMove):
+                if self._dropped_file(event.mimeData()):
+                    event.acceptProposedAction()
+                    return True
+            elif etype == QEvent.Type.Drop:
+                path = self._dropped_file(event.mimeData())
+                if path:
+                    event.acceptProposedAction()
+                    try:
+                        source = DocumentSource.from_path(path)
+                    except (OSError, ValueError) as e:
+                        # 二進位檔或無法讀取：不送出任何請求
+                        if self.chat_bubble:
+                            self.chat_bubble.show_message(f"無法摘要這個檔案：{e}", duration=3000)
+                            self._update_bubble_position()
+                        return True
+                    self._submit_document_from_input(source)
+                    return True
+        return super().eventFilter(obj, event)
+
+    def _submit_document_from_input(self, source: DocumentSource):
+        if self._is_streaming:
+            if self.chat_bubble:
+                self.chat_bubble.show_message("請等目前的回覆結束後再試", duration=3000)
+                self._update_bubble_position()
+            return
+        instruction = self.text_input.text().strip() or None
+        self.text_input.clear()
+        self.submit_document(source, instruction)
+
+    def _on_document_progress(self, text: str):
+        """摘要開始串流前，在泡泡框顯示閱讀進度"""
+        if self.chat_bubble and self._is_streaming and not self._current_display_text:
+            self.chat_bubble.set_text_live(text)
+            self._update_bubble_position()
+
+    def play_motion(self, group: str, index: int = 0) -> bool:
+        """以 motion group + index 播放動作（供 IPC 使用，優先度高於點擊）"""
+        if not self.live2d_widget:
+            return False
+        self._touch_activity()
+        return self.live2d_widget.play_motion_group(group, index, MotionPriority.LLM)
     
     def _on_voice_input(self):
         """處理語音輸入按鈕點擊"""
@@ -392,7 +974,17 @@ class DesktopCharacterWindow(QMainWindow):
         """啟動 LLM 串流回應"""
         if not self.llm_client:
             return
+        self._run_stream_worker(
+            LLMStreamWorker(
+                self.llm_client,
+                message,
+                telemetry=self.telemetry,
+                trace=self._current_trace,
+            )
+        )
 
+    def _run_stream_worker(self, worker):
+        """進入串流狀態並啟動背景工作執行緒（一般對話與文件摘要共用）"""
         # UI 初始化：顯示思考中文字，並放置泡泡框位置
         if self.chat_bubble:
             self.chat_bubble.show_message("思考中...", duration=0)
@@ -401,6 +993,10 @@ class DesktopCharacterWindow(QMainWindow):
         # 狀態切換為串流中，鎖定角色互動
         self._is_streaming = True
         self._interaction_locked = True
+        if self.inactivity_monitor:
+            self.inactivity_monitor.set_busy(True)
+        if self.live2d_widget:
+            self.live2d_widget.set_live_required(True)
 
         # 變更按鈕為停止圖示（黑色方形）
         if self.send_button:
@@ -410,8 +1006,12 @@ class DesktopCharacterWindow(QMainWindow):
 
         # 啟動背景工作執行緒
         self._current_stream_text = ""
-        self._llm_worker = LLMStreamWorker(self.llm_client, message)
+        self._current_display_text = ""
+        self._stream_reminders = []
+        self._stream_stopped_by_user = False
+        self._llm_worker = worker
         self._llm_worker.chunk_received.connect(self._on_stream_chunk)
+        self._llm_worker.status_received.connect(self._on_stream_status)
         self._llm_worker.error.connect(self._on_stream_error)
         self._llm_worker.finished.connect(self._on_stream_finished)
         self._llm_worker.start()
@@ -419,6 +1019,9 @@ class DesktopCharacterWindow(QMainWindow):
     def _stop_streaming(self):
         """使用者主動停止串流"""
         if self._llm_worker and self._is_streaming:
+            if self.session_recorder:
+                self.session_recorder.stop()
+            self._stream_stopped_by_user = True
             self._llm_worker.stop()
         # 真正的結束與 UI 還原在 _on_stream_finished 中處理
 
@@ -427,6 +1030,12 @@ class DesktopCharacterWindow(QMainWindow):
         self._is_streaming = False
         self._interaction_locked = False
         self._llm_worker = None
+        self._input_notice = ""
+        self._input_notice_timer.stop()
+        if self.inactivity_monitor:
+            self.inactivity_monitor.set_busy(False)
+        if self.live2d_widget:
+            self.live2d_widget.set_live_required(False)
 
         if self.send_button:
             self.send_button.setText("⏎")
@@ -435,35 +1044,99 @@ class DesktopCharacterWindow(QMainWindow):
 
     def _on_stream_chunk(self, delta: str):
         """接收 LLM 串流片段，累積並更新泡泡框"""
+        start_ns = time.perf_counter_ns()
+        if self.session_recorder:
+            self.session_recorder.chunk(delta)
+        is_first = not self._current_stream_text
         self._current_stream_text += delta
+        if self.chat_bubble and is_first and self._current_trace:
+            # 第一個片段送達後，於泡泡框下一次實際繪製時記錄 first_paint
+            self.chat_bubble.paint_callback = self._on_first_bubble_paint
+        self._append_stream_display(delta)
+        self.telemetry.record_chunk(
+            self._current_trace, delta, (time.perf_counter_ns() - start_ns) // 1000
+        )
+        self.reply_chunk.emit(delta)
+
+    def _on_stream_status(self, text: str):
+        """工具狀態行：只顯示在泡泡框，不計入回覆、錄製與遙測"""
+        self._append_stream_display(text)
+
+    def _append_stream_display(self, text: str):
+        self._current_display_text += text
+        self._render_stream_display()
+
+    def _render_stream_display(self):
         if self.chat_bubble:
+            text = self._current_display_text
+            if self._input_notice:
+                text += f"\n\n> {self._input_notice}"
             # 串流期間僅更新文字內容，不重置滾動與淡入動畫
-            self.chat_bubble.set_text_live(self._current_stream_text)
+            self.chat_bubble.set_text_live(text)
             self._update_bubble_position()
 
+    def _on_first_bubble_paint(self):
+        """泡泡框首次繪製出串流內容"""
+        self.telemetry.mark(self._current_trace, "first_paint")
+        if self.chat_bubble:
+            self.chat_bubble.paint_callback = None
+
+    def _finish_trace(self, error: Optional[str] = None):
+        """結束目前訊息的遙測追蹤"""
+        if self._current_trace:
+            self.telemetry.finish(
+                self._current_trace,
+                full_text=self._current_stream_text,
+                stopped=self._stream_stopped_by_user,
+                error=error,
+            )
+            self._current_trace = None
+        if self.chat_bubble:
+            self.chat_bubble.paint_callback = None
+
     def _on_stream_error(self, error_msg: str):
         """處理串流中的錯誤"""
         if self.chat_bubble:
-            self.chat_bubble.show_message(error_msg, duration=5000)
+            # 串流期間到期的提醒一併顯示，不因錯誤訊息取代泡泡框內容而遺失
+            reminders = "".join(f"\n\n⏰ {m}" for m in self._stream_reminders)
+            self.chat_bubble.show_message(error_msg + reminders, duration=10000 if reminders else 5000)
             self._update_bubble_position()
+        self._stream_reminders = []
+        self._finish_trace(error=error_msg)
         self._end_streaming_state()
+        # 失敗時不自動重送排隊的訊息（多半是額度或網路問題），放回輸入框由使用者決定
+        self._restore_queued_input()
+        self.reply_failed.emit(error_msg)
 
     def _on_stream_finished(self):
         """串流自然結束或被停止後呼叫"""
         # 若有最終內容，只更新文字內容並設置自動隱藏，不重新觸發淡入動畫（避免閃爍）
-        if self._current_stream_text and self.chat_bubble:
+        if self._current_display_text and self.chat_bubble:
             # 使用 set_text_live 更新內容，不重置滾動位置
-            self.chat_bubble.set_text_live(self._current_stream_text)
+            self.chat_bubble.set_text_live(self._current_display_text)
+            self.chat_bubble.finish_live()
             # 設置自動隱藏計時器（如果尚未設置）
             if self.chat_bubble.auto_hide_timer.remainingTime() <= 0:
                 self.chat_bubble.auto_hide_timer.start(15000)
             self._update_bubble_position()
 
+        was_streaming = self._is_streaming
+        if self.session_recorder:
+            self.session_recorder.end()
+        self._finish_trace()
         self._end_streaming_state()
+        # 錯誤路徑已在 _on_stream_error 結束串流並發出 reply_failed
+        if was_streaming:
+            self.reply_finished.emit(self._current_stream_text)
+            if self._stream_stopped_by_user:
+                # 使用者按下停止：排隊的訊息放回輸入框，不立即送出
+                self._restore_queued_input()
+            else:
+                self._flush_input_queue()
     
     def _update_bubble_position(self):
         """更新對話泡泡框位置（顯示在角色上方）"""
-        if not self.chat_bubble:
+        if not self.chat_bubble or self._bubble_overlay_mode:
             return
 
         # 以 Live2D 渲染區（接近角色頭部）作為錨點，而不是用整個主視窗 top
@@ -491,68 +1164,230 @@ class DesktopCharacterWindow(QMainWindow):
     
     def _on_part_clicked(self, hit_area_id: str):
         """處理角色部位點擊事件"""
+        if self.session_recorder:
+            self.session_recorder.click(hit_area_id)
         if not self.character_interaction or not self.live2d_widget:
             return
 
-        # 回覆後 5 秒內或 LLM 串流期間禁止再次觸發，避免刷掉泡泡框內容
-        if self._interaction_locked or self._is_streaming:
-            return
-        
         # 由 HitPart 回傳的 PartId 推斷互動區域，取得動作與回應
         inferred_area_id, motion_name, response = self.character_interaction.get_interaction_for_part(hit_area_id)
 
+        # 動作一律交給動作佇列：快速重複點擊同一區域會合併，回覆期間的點擊排隊等目前動作播完
+        if not self._play_click_motion(inferred_area_id, motion_name):
+            print("[INFO]  can't start motion.")
+
+        # 回覆後 5 秒內或 LLM 串流期間不更新泡泡框，避免刷掉內容
+        if self._interaction_locked or self._is_streaming:
+            return
+
+        # 預取模式：優先使用預先生成的角色風格回應，池為空時沿用靜態回覆
+        current = self._get_current_character()
+        if self.response_prefetcher and current:
+            prefetched = self.response_prefetcher.take(current.id, inferred_area_id)
+            if prefetched:
+                response = prefetched
+
+        # 顯示回應
+        if self.chat_bubble:
+            self.chat_bubble.show_message(response, duration=5000)
+            self._update_bubble_position()
+            self._lock_interaction(5000)
+
+    def _play_click_motion(self, area_id: str, motion_name: str) -> bool:
+        """依角色選擇最適合該模型的 motion group，以點擊優先度送出（同一區域的請求互相合併）"""
+        widget = self.live2d_widget
         current = self._get_current_character()
         played = False
 
-        # 依不同角色，選擇最適合該模型的 motion group
         if current:
             char_id = current.id
 
             # Mao: 使用原本 "" group + 固定索引映射
             if char_id == "mao_pro_en":
-                played = self.live2d_widget.play_motion(motion_name, group="")
+                played = widget.play_motion(motion_name, group="", key=area_id)
 
             # Hiyori: 使用 Tap / Tap@Body / Flick 等命名 group
             elif char_id == "hiyori_pro_zh":
                 group = "Tap"
                 index = 0
-                if inferred_area_id in ("HitAreaBody", "HitAreaBelly", "HitAreaChest"):
+                if area_id in ("HitAreaBody", "HitAreaBelly", "HitAreaChest"):
                     # 以身體相關的 Tap@Body 為主
                     group = "Tap@Body"
                     index = 0
-                elif inferred_area_id in ("HitAreaHand", "HitAreaFoot"):
+                elif area_id in ("HitAreaHand", "HitAreaFoot"):
                     group = "Flick"
                     index = 0
-                played = self.live2d_widget.play_motion_group(group, index)
+                played = widget.play_motion_group(group, index, key=area_id)
 
             # Miku: 使用 Tap / Flick 系列
             elif char_id == "miku_pro_jp":
                 group = "Tap"
                 index = 0
-                if inferred_area_id in ("HitAreaBody", "HitAreaBelly", "HitAreaChest"):
+                if area_id in ("HitAreaBody", "HitAreaBelly", "HitAreaChest"):
                     # 第二個 Tap 動作略帶不同表現
                     group = "Tap"
                     index = 1
-                elif inferred_area_id in ("HitAreaHand", "HitAreaFoot"):
+                elif area_id in ("HitAreaHand", "HitAreaFoot"):
                     group = "Flick"
                     index = 0
-                played = self.live2d_widget.play_motion_group(group, index)
+                played = widget.play_motion_group(group, index, key=area_id)
 
         # 若沒有對應角色或上述播放失敗，退回原本行為以避免完全無反應
         if not played:
-            played = self.live2d_widget.play_motion(motion_name, group="")
+            played = widget.play_motion(motion_name, group="", key=area_id)
+        return played
+
+    # ---- IPC 指令處理 ----
+
+    def get_ipc_handlers(self):
+        """回傳提供給 IPCServer 的指令處理表"""
+        return {
+            "show": self._ipc_show,
+            "status": self._ipc_status,
+            "send": self._ipc_send,
+            "stream": self._ipc_stream,
+            "switch_character": self._ipc_switch_character,
+            "play_motion": self._ipc_play_motion,
+            "chat": self._ipc_chat,
+            "companion": self._ipc_companion,
+        }
+
+    def _ipc_show(self, request: IPCRequest):
+        self.show()
+        self.raise_()
+        self.activateWindow()
+        return True
+
+    def _ipc_status(self, request: IPCRequest):
+        current = self._get_current_character()
+        return {
+            "character": current.id if current else None,
+            "characters": [c.id for c in self.characters],
+            "streaming": self._is_streaming,
+            "llm_available": self.llm_client is not None,
+            "hibernated": bool(self.live2d_widget and self.live2d_widget.hibernated),
+            "last_hibernation": self._last_hibernation_report,
+            "startup_ms": dict(startup_timer.marks),
+            "idle_playback": bool(self.live2d_widget and self.live2d_widget.idle_playback_active),
+            "frame_costs": (
+                self.live2d_widget.frame_meter.summary()
+                if self.live2d_widget and self.live2d_widget.frame_meter
+                else None
+            ),
+            "mask_buffer": (
+                self.live2d_widget.mask_plan.to_dict()
+                if self.live2d_widget and self.live2d_widget.mask_plan
+                else None
+            ),
+            "gaze": (
+                self.live2d_widget.gaze.stats()
+                if self.live2d_widget and self.live2d_widget.gaze
+                else None
+            ),
+            "companions": list(self.companions),
+            "scheduler": scheduler.stats(),
+            "idle_behaviors": (
+                self.live2d_widget.idle_behaviors.stats()
+                if self.live2d_widget and self.live2d_widget.idle_behaviors
+                else None
+            ),
+            "motion_queue": self.live2d_widget.motion_queue.to_dict() if self.live2d_widget else None,
+            "input_queue": self.input_queue.stats() if self.input_queue else None,
+            "live2d_runtime": live2d_runtime.stats(),
+        }
+
+    def _ipc_send(self, request: IPCRequest):
+        """送出提示詞，完成後回傳完整回覆"""
+        return self._ipc_start_reply(request, stream=False)
+
+    def _ipc_stream(self, request: IPCRequest):
+        """送出提示詞，並以 chunk 事件逐步回傳回覆片段"""
+        return self._ipc_start_reply(request, stream=True)
+
+    def _ipc_start_reply(self, request: IPCRequest, stream: bool):
+        text = str(request.args.get("text", ""))
+        if not self.llm_client:
+            raise RuntimeError("LLM 客戶端不可用")
+        if self._is_streaming:
+            raise RuntimeError("目前正在回覆其他訊息")
+
+        def on_chunk(delta: str):
+            request.event("chunk", text=delta)
+
+        def on_close():
+            if stream:
+                self.reply_chunk.disconnect(on_chunk)
+            self.reply_finished.disconnect(request.reply)
+            self.reply_failed.disconnect(request.error)
+
+        if stream:
+            self.reply_chunk.connect(on_chunk)
+        self.reply_finished.connect(request.reply)
+        self.reply_failed.connect(request.error)
+        request.on_close = on_close
+
+        if not self.submit_prompt(text):
+            request.error("無法送出訊息")
+        return DEFERRED
+
+    def _ensure_session_thread(self) -> SessionManagerThread:
+        """建立多對話引擎：與主對話共用同一個 Gemini 模型（同一組連線）"""
+        if self._session_thread is None:
+            manager = SessionManager(
+                GeminiAsyncBackend(self.llm_client.model),
+                max_concurrency=int(os.getenv("CHAT_MAX_CONCURRENCY", "4")),
+            )
+            self._session_thread = SessionManagerThread(manager)
+            self._session_thread.start()
+        return self._session_thread
+
+    def _ipc_chat(self, request: IPCRequest):
+        """
+        在獨立的對話工作階段中對話（不影響泡泡框與主對話歷史）。
+        args: {"text": ..., "session": 工作階段 ID（預設依目前角色）}
+        """
+        if not self.llm_client:
+            raise RuntimeError("LLM 客戶端不可用")
+        text = str(request.args.get("text", "")).strip()
+        if not text:
+            raise ValueError("訊息不可為空")
+        current = self._get_current_character()
+        character_id = current.id if current else None
+        session_id = str(request.args.get("session") or f"character:{character_id}")
+
+        bridge = self._session_bridge
+        self._ensure_session_thread().submit(
+            session_id,
+            text,
+            on_chunk=lambda d: bridge.chunk.emit(request, d),
+            on_done=lambda t: bridge.done.emit(request, t),
+            on_error=lambda msg: bridge.failed.emit(request, msg),
+            character_id=character_id,
+        )
+        return DEFERRED
+
+    def _ipc_switch_character(self, request: IPCRequest):
+        self._touch_activity()
+        character_id = str(request.args.get("id", ""))
+        if not self.switch_character(character_id):
+            raise ValueError(f"找不到角色: {character_id}")
+        return character_id
+
+    def _ipc_play_motion(self, request: IPCRequest):
+        group = str(request.args.get("group", ""))
+        index = int(request.args.get("index", 0))
+        return self.play_motion(group, index)
+
+    def _ipc_companion(self, request: IPCRequest):
+        character_id = str(request.args.get("id", ""))
+        if request.args.get("action", "open") == "close":
+            return self.close_companion(character_id)
+        if not self.open_companion(character_id):
+            raise ValueError(f"找不到角色: {character_id}")
+        return list(self.companions)
 
-        if not played:
-            print("[INFO]  can't start motion.")
-        
-        # 顯示回應
-        if self.chat_bubble:
-            self.chat_bubble.show_message(response, duration=5000)
-            self._update_bubble_position()
-            self._lock_interaction(5000)
-    
     def moveEvent(self, event):
         """處理視窗移動事件，同步更新泡泡框位置"""
         super().moveEvent(event)
-        if self.chat_bubble and self.chat_bubble.isVisible():
+        if self.chat_bubble and not self._bubble_overlay_mode and self.chat_bubble.isVisible():
             self._update_bubble_position()
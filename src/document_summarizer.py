@@ -0,0 +1,306 @@
+"""
+文件摘要模組 - 將大型文字檔分段摘要（map）再合併（reduce），避免整份送出超過上下文限制
+檔案以固定大小的區塊讀取並依 token 預算切段（沒有換行的超長內容也不會整段載入），
+同時進行中的段落數有上限，記憶體用量與檔案大小無關。二進位檔會被拒絕，段數超過上限時只摘要前面的部分。
+"""
+from __future__ import annotations
+
+import io
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, TextIO, Union
+
+from src.chat_telemetry import estimate_tokens
+from src.rate_limiter import TokenBucket
+
+
+READ_BLOCK_CHARS = 64 * 1024
+
+
+def read_lines(f: TextIO, block_chars: int = READ_BLOCK_CHARS) -> Iterator[str]:
+    """
+    以固定大小的區塊讀取並逐行產生（保留換行）；超過 block_chars 仍沒有換行時，
+    先產生已讀到的部分，因此任何時候保留的文字都不超過約兩個區塊。
+    """
+    rest = ""
+    while True:
+        block = f.read(block_chars)
+        if not block:
+            break
+        *lines, rest = (rest + block).split("\n")
+        for line in lines:
+            yield line + "\n"
+        if len(rest) >= block_chars:
+            yield rest
+            rest = ""
+    if rest:
+        yield rest
+
+
+def split_by_tokens(lines: Iterable[str], budget_tokens: float) -> Iterator[str]:
+    """
+    依 token 預算將逐行輸入合併成段落；超過預算的單行會被切開。
+    一次只保留一個段落在記憶體中。
+    """
+    buf: List[str] = []
+    used = 0.0
+    for line in lines:
+        tokens = estimate_tokens(line)
+        if tokens > budget_tokens:
+            # 超長單行（例如壓縮過的 JSON）：依比例切成數塊
+            if buf:
+                yield "".join(buf)
+                buf, used = [], 0.0
+            step = max(1, int(len(line) * budget_tokens / tokens))
+            for i in range(0, len(line), step):
+                yield line[i:i + step]
+            continue
+        if used + tokens > budget_tokens and buf:
+            yield "".join(buf)
+            buf, used = [], 0.0
+        buf.append(line)
+        used += tokens
+    if buf:
+        yield "".join(buf)
+
+
+class DocumentSource:
+    """要摘要的文件：本機檔案路徑或已貼上的文字"""
+
+    def __init__(self, name: str, opener: Callable[[], TextIO], size_chars: Optional[int] = None):
+        self.name = name
+        self._opener = opener
+        self.size_chars = size_chars
+
+    @classmethod
+    def from_path(cls, path: Union[str, Path]) -> "DocumentSource":
+        """
+        Raises:
+            ValueError: 檔案開頭含有 NUL 位元組（圖片、執行檔、壓縮檔等二進位檔）
+        """
+        path = Path(path)
+        with open(path, "rb") as f:
+            if b"\0" in f.read(8192):
+                raise ValueError(f"「{path.name}」不是文字檔")
+        return cls(
+            path.name,
+            lambda: open(path, "r", encoding="utf-8", errors="replace"),
+            path.stat().st_size,
+        )
+
+    @classmethod
+    def from_text(cls, text: str, name: str = "貼上的文字") -> "DocumentSource":
+        return cls(name, lambda: io.StringIO(text), len(text))
+
+    def chunks(self, budget_tokens: float) -> Iterator[str]:
+        with self._opener() as f:
+            yield from split_by_tokens(read_lines(f), budget_tokens)
+
+
+class DocumentSummarizer:
+    """
+    分段摘要（map-reduce）。
+
+    - map：每段各自摘要，最多 max_workers 個請求同時進行，每個請求先向 quota 取得額度
+    - reduce：部分摘要依 token 預算分組合併，直到剩下一組；最多 MAX_REDUCE_LEVELS 層，
+      某一層沒有讓組數減少（例如每組只放得下一則摘要）時直接進入最後合併，不會無限重複
+    - 最後一次合併以串流回傳，呼叫端可直接更新泡泡框
+    進度（已完成 / 已送出段數）透過 on_progress 回報，於工作執行緒中呼叫。
+    """
+
+    MAX_REDUCE_LEVELS = 3
+
+    def __init__(
+        self,
+        llm_client,
+        quota: Optional[TokenBucket] = None,
+        max_workers: int = 3,
+        chunk_tokens: float = 6000,
+        max_chunks: int = 30,
+        on_progress: Optional[Callable[[str], None]] = None,
+    ):
+        """
+        Args:
+            llm_client: 具備 stream_message 的 LLM 客戶端
+            quota: 請求額度限制（預設每分鐘 10 次）
+            max_workers: 同時進行的摘要請求數
+            chunk_tokens: 每段（以及每次合併）輸入的 token 預算
+            max_chunks: 最多摘要的段數（超過時只摘要前面的部分，限制單一文件的請求數）
+            on_progress: 進度文字回呼
+        """
+        self.llm_client = llm_client
+        self.quota = quota or TokenBucket.per_minute(10, burst=3)
+        self.max_workers = max(1, max_workers)
+        self.chunk_tokens = chunk_tokens
+        self.max_chunks = max(1, max_chunks)
+        self.on_progress = on_progress
+        self.truncated = False  # 是否因段數上限只摘要了前面的部分
+        self.requests = 0
+        self._stopped = threading.Event()
+
+    @classmethod
+    def from_env(cls, llm_client, on_progress: Optional[Callable[[str], None]] = None) -> "DocumentSummarizer":
+        """DOCUMENT_SUMMARY_RPM / DOCUMENT_SUMMARY_WORKERS / DOCUMENT_CHUNK_TOKENS / DOCUMENT_MAX_CHUNKS"""
+        rpm = float(os.getenv("DOCUMENT_SUMMARY_RPM", "10"))
+        return cls(
+            llm_client,
+            quota=TokenBucket.per_minute(rpm, burst=min(rpm, 3)),
+            max_workers=int(os.getenv("DOCUMENT_SUMMARY_WORKERS", "3")),
+            chunk_tokens=float(os.getenv("DOCUMENT_CHUNK_TOKENS", "6000")),
+            max_chunks=int(os.getenv("DOCUMENT_MAX_CHUNKS", "30")),
+            on_progress=on_progress,
+        )
+
+    def stop(self):
+        """要求停止；進行中的請求完成後不再送出新請求"""
+        self._stopped.set()
+
+    def _progress(self, text: str):
+        if self.on_progress:
+            self.on_progress(text)
+
+    def _complete(self, prompt: str) -> str:
+        """在額度內送出一次非串流請求（失敗時重試一次）"""
+        for attempt in range(2):
+            while not self.quota.acquire(timeout=1.0):
+                if self._stopped.is_set():
+                    raise InterruptedError
+            if self._stopped.is_set():
+                raise InterruptedError
+            self.requests += 1
+            try:
+                return "".join(
+                    self.llm_client.stream_message(prompt, record_history=False, raise_errors=True)
+                )
+            except Exception:
+                if attempt:
+                    raise
+        return ""
+
+    # ---- 提示詞 ----
+
+    @staticmethod
+    def _map_prompt(name: str, index: int, chunk: str) -> str:
+        return (
+            f"以下是文件「{name}」的第 {index} 段。請用繁體中文條列這一段的重點"
+            f"（最多 8 點，保留關鍵的數字、名稱與錯誤訊息），不要前言或結語。\n\n{chunk}"
+        )
+
+    @staticmethod
+    def _reduce_prompt(name: str, parts: List[str]) -> str:
+        joined = "\n\n".join(f"[{i + 1}]\n{p}" for i, p in enumerate(parts))
+        return (
+            f"以下是文件「{name}」連續幾段的重點。請合併成一份條列摘要，"
+            f"去除重複、保留時間順序與關鍵細節，不要前言或結語。\n\n{joined}"
+        )
+
+    @staticmethod
+    def _final_prompt(name: str, parts: List[str], instruction: Optional[str]) -> str:
+        joined = "\n\n".join(parts)
+        request = instruction or "請先用 2~3 句說明整份文件的內容，再條列最重要的重點。"
+        return (
+            f"以下是文件「{name}」各部分的重點摘要（依文件順序）。{request}"
+            f"請用繁體中文回答。\n\n{joined}"
+        )
+
+    # ---- map-reduce ----
+
+    def _map(self, source: DocumentSource) -> List[str]:
+        """依序讀取段落並行摘要；同時在記憶體中的段落不超過 2 × max_workers"""
+        summaries: List[str] = []
+        pending: Deque[Future] = deque()
+        self.truncated = False
+        submitted = 0
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="DocSummary")
+        try:
+            for chunk in source.chunks(self.chunk_tokens):
+                if self._stopped.is_set():
+                    raise InterruptedError
+                if submitted >= self.max_chunks:
+                    # 還有下一段：超過上限，只摘要前面的部分
+                    self.truncated = True
+                    self._progress(f"「{source.name}」過長，只摘要前 {self.max_chunks} 段…")
+                    break
+                submitted += 1
+                pending.append(executor.submit(self._complete, self._map_prompt(source.name, submitted, chunk)))
+                while len(pending) >= 2 * self.max_workers:
+                    summaries.append(pending.popleft().result())
+                    self._progress(f"正在閱讀「{source.name}」… 已完成 {len(summaries)} / {submitted} 段")
+            while pending:
+                summaries.append(pending.popleft().result())
+                self._progress(f"正在閱讀「{source.name}」… 已完成 {len(summaries)} / {submitted} 段")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return summaries
+
+    def _group(self, parts: List[str]) -> List[List[str]]:
+        """依 token 預算將部分摘要分組"""
+        groups: List[List[str]] = [[]]
+        used = 0.0
+        for part in parts:
+            tokens = estimate_tokens(part)
+            if groups[-1] and used + tokens > self.chunk_tokens:
+                groups.append([])
+                used = 0.0
+            groups[-1].append(part)
+            used += tokens
+        return groups
+
+    def _reduce(self, name: str, parts: List[str]) -> List[str]:
+        """
+        合併到只剩一組（可放進最後一次請求）為止。
+        超過 MAX_REDUCE_LEVELS 層或組數不再減少時，回傳目前所有部分摘要，由最後一次請求強制合併。
+        """
+        groups = self._group(parts)
+        for level in range(1, self.MAX_REDUCE_LEVELS + 1):
+            if len(groups) <= 1:
+                break
+            self._progress(f"正在合併「{name}」的摘要（第 {level} 層，{len(groups)} 組）…")
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="DocSummary") as executor:
+                # 只有一則摘要的組不需要再請求一次
+                parts = list(executor.map(
+                    lambda g: g[0] if len(g) == 1 else self._complete(self._reduce_prompt(name, g)), groups
+                ))
+            next_groups = self._group(parts)
+            if len(next_groups) >= len(groups):
+                break
+            groups = next_groups
+        return [part for group in groups for part in group] if len(groups) > 1 else groups[0]
+
+    def summarize(self, source: DocumentSource, instruction: Optional[str] = None) -> Iterator[str]:
+        """
+        產生文件摘要（串流片段）。停止時靜默結束；API 錯誤會直接拋出。
+        """
+        try:
+            summaries = self._map(source)
+            if not summaries:
+                yield "（文件是空的）"
+                return
+            parts = self._reduce(source.name, summaries)
+        except InterruptedError:
+            return
+
+        self._progress(f"正在整理「{source.name}」的摘要…")
+        while not self.quota.acquire(timeout=1.0):
+            if self._stopped.is_set():
+                return
+        self.requests += 1
+        full_text = ""
+        for delta in self.llm_client.stream_message(
+            self._final_prompt(source.name, parts, instruction), record_history=False, raise_errors=True
+        ):
+            if self._stopped.is_set():
+                break
+            full_text += delta
+            yield delta
+
+        # 對話紀錄只保存文件名稱與摘要，不保存整份文件
+        history = getattr(self.llm_client, "chat_history", None)
+        if self.truncated and not self._stopped.is_set():
+            yield f"\n\n（文件過長，只摘要了前 {self.max_chunks} 段）"
+        if full_text and history is not None:
+            history.append({"role": "user", "content": f"（摘要文件「{source.name}」）"})
+            history.append({"role": "assistant", "content": full_text})
@@ -0,0 +1,220 @@
+"""
+視線追蹤模組 - 角色的頭、身體與眼球跟隨滑鼠游標
+- 以計時器取樣全域游標位置，頻率依距離與是否移動調整：接近且移動時高頻，
+  靜止時降頻，遠離時只低頻探測是否回來；widget 隱藏或沒有模型時完全停止
+- 取樣只更新目標值，不觸發重繪；平滑與寫入參數在既有的每幀繪製中進行
+- 平滑使用向量化的臨界阻尼彈簧（一次處理所有參數，不會過衝）
+
+設定（環境變數）：
+    GAZE_TRACKING=1        設為 0 停用
+    GAZE_NEAR_PX=600       游標與角色頭部距離小於此值時才跟隨
+    GAZE_SMOOTH_SEC=0.15   平滑時間（越大越慢）
+"""
+from __future__ import annotations
+
+import math
+import os
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from PyQt6.QtCore import QObject, QPoint
+from PyQt6.QtGui import QCursor
+
+from src.app_log import get_logger
+from src.scheduler import scheduler
+
+_log = get_logger("gaze")
+
+# (參數 ID, 水平權重, 垂直權重)：游標在右 / 上方為正，輸出為加在動作結果上的偏移量
+GAZE_PARAMS: Tuple[Tuple[str, float, float], ...] = (
+    ("ParamAngleX", 30.0, 0.0),
+    ("ParamAngleY", 0.0, 30.0),
+    ("ParamBodyAngleX", 10.0, 0.0),
+    ("ParamEyeBallX", 1.0, 0.0),
+    ("ParamEyeBallY", 0.0, 1.0),
+)
+
+
+class CriticallyDampedFilter:
+    """
+    臨界阻尼彈簧平滑（向量化）：所有維度共用同一個平滑時間，一次以 NumPy 陣列運算。
+    使用 exp(-ωt) 的多項式近似，任意 dt 皆穩定；目標改變時不會過衝。
+    """
+
+    def __init__(self, size: int, smooth_time: float = 0.15):
+        self.smooth_time = max(1e-3, smooth_time)
+        self.value = np.zeros(size, dtype=np.float64)
+        self.velocity = np.zeros(size, dtype=np.float64)
+
+    def reset(self, value: Optional[Sequence[float]] = None):
+        self.value[:] = 0.0 if value is None else value
+        self.velocity[:] = 0.0
+
+    def update(self, target: np.ndarray, dt: float) -> np.ndarray:
+        omega = 2.0 / self.smooth_time
+        x = omega * dt
+        decay = 1.0 / (1.0 + x + 0.48 * x * x + 0.235 * x * x * x)
+        change = self.value - target
+        temp = (self.velocity + omega * change) * dt
+        self.velocity = (self.velocity - omega * temp) * decay
+        self.value = target + (change + temp) * decay
+        return self.value
+
+    def settled(self, target: np.ndarray, eps: float = 1e-3) -> bool:
+        return bool(np.all(np.abs(self.value - target) < eps) and np.all(np.abs(self.velocity) < eps))
+
+
+class GazeTracker(QObject):
+    """
+    依游標位置計算視線目標，並於繪製時寫入模型參數。
+
+    取樣頻率：
+    - 接近且游標移動中：FAST_MS
+    - 接近但游標靜止超過 STILL_SEC：SLOW_MS
+    - 遠離：PROBE_MS（只用來發現游標回來，目標歸零）
+    - widget 隱藏 / 沒有模型：停止，直到 start() 再次被呼叫
+    """
+
+    FAST_MS = 33
+    SLOW_MS = 250
+    PROBE_MS = 500
+    STILL_SEC = 1.0
+
+    def __init__(self, widget, near_px: float = 600.0, smooth_time: float = 0.15):
+        super().__init__(widget)
+        self.widget = widget
+        self.near_px = near_px
+        self._weights = np.array([(wx, wy) for _, wx, wy in GAZE_PARAMS], dtype=np.float64)
+        self._target = np.zeros(len(GAZE_PARAMS), dtype=np.float64)
+        self.filter = CriticallyDampedFilter(len(GAZE_PARAMS), smooth_time)
+        self._last_cursor: Optional[QPoint] = None
+        self._last_move = 0.0
+        self._last_apply: Optional[float] = None
+        # 目前模型上可用的參數：(GAZE_PARAMS 索引, 模型參數索引或 ID)
+        self._bindings: List[Tuple[int, object]] = []
+        self._by_index = False
+        self.samples = 0
+
+        # 取樣由集中排程器驅動；遠離時的探測容許延後，與其他計時合併喚醒
+        self._timer = scheduler.timer(self._sample, single_shot=False, slack=0.1, owner=widget)
+
+    @classmethod
+    def from_env(cls, widget) -> Optional["GazeTracker"]:
+        if os.getenv("GAZE_TRACKING", "1") == "0":
+            return None
+        return cls(
+            widget,
+            near_px=float(os.getenv("GAZE_NEAR_PX", "600")),
+            smooth_time=float(os.getenv("GAZE_SMOOTH_SEC", "0.15")),
+        )
+
+    # ---- 取樣（GUI 執行緒計時器） ----
+
+    def start(self):
+        if not self._timer.isActive():
+            self._last_cursor = None
+            self._timer.start(self.FAST_MS)
+
+    def stop(self):
+        self._timer.stop()
+        self._target[:] = 0.0
+
+    @property
+    def interval_ms(self) -> int:
+        """目前的取樣間隔（停止時為 0）"""
+        return self._timer.interval() if self._timer.isActive() else 0
+
+    def _sample(self):
+        widget = self.widget
+        if not widget.isVisible() or widget.model is None:
+            self.stop()
+            return
+        self.samples += 1
+        cursor = QCursor.pos()
+        # 以 widget 上方約 1/3 處（頭部附近）為視線原點
+        origin = widget.mapToGlobal(QPoint(widget.width() // 2, widget.height() // 3))
+        dx = cursor.x() - origin.x()
+        dy = origin.y() - cursor.y()
+        distance = math.hypot(dx, dy)
+
+        now = time.monotonic()
+        if cursor != self._last_cursor:
+            self._last_cursor = cursor
+            self._last_move = now
+
+        if distance > self.near_px:
+            self._target[:] = 0.0
+            interval = self.PROBE_MS
+        else:
+            # 線性對應到 -1 ~ 1，距離 near_px / 2 時達到最大角度
+            direction = np.array((dx, dy), dtype=np.float64) / self.near_px
+            self._target = self._weights @ np.clip(direction * 2.0, -1.0, 1.0)
+            moving = now - self._last_move < self.STILL_SEC
+            interval = self.FAST_MS if moving else self.SLOW_MS
+            if moving and widget.idle_playback_active:
+                # 預渲染待機中游標靠近：回到即時繪製才能跟隨
+                widget.poke()
+        if self._timer.interval() != interval:
+            self._timer.setInterval(interval)
+
+    # ---- 套用（繪製時） ----
+
+    def bind(self, model, by_index: bool):
+        """
+        模型載入後解析可用的參數。
+        by_index=True 時以 GetParameterIds() 的索引寫入（live2d.Model），否則以參數 ID（LAppModel）。
+        """
+        self._by_index = by_index
+        self._bindings = []
+        self.filter.reset()
+        self._last_apply = None
+        if by_index:
+            try:
+                ids = list(model.GetParameterIds())
+            except Exception as e:
+                _log.warning("讀取模型參數失敗，停用視線追蹤: %s", e)
+                return
+            self._bindings = [(k, ids.index(pid)) for k, (pid, _, _) in enumerate(GAZE_PARAMS) if pid in ids]
+        else:
+            self._bindings = [(k, pid) for k, (pid, _, _) in enumerate(GAZE_PARAMS)]
+
+    def unbind(self):
+        self._bindings = []
+
+    def apply(self, model):
+        """
+        推進平滑並把偏移加到本幀的參數上。
+        只應在參數剛由 Update() / 插值重設後呼叫，否則偏移會重複累加。
+        """
+        if not self._bindings:
+            return
+        now = time.monotonic()
+        dt = min(0.1, now - self._last_apply) if self._last_apply is not None else 0.0
+        self._last_apply = now
+        if not self._target.any() and self.filter.settled(self._target):
+            return
+        values = self.filter.update(self._target, dt)
+        try:
+            if self._by_index:
+                get, set_value = model.GetParameterValue, model.SetParameterValue
+                for k, index in self._bindings:
+                    set_value(index, get(index) + float(values[k]))
+            else:
+                add = getattr(model, "AddParameterValue", None)
+                for k, pid in self._bindings:
+                    if add is not None:
+                        add(pid, float(values[k]))
+                    else:
+                        model.SetParameterValue(pid, float(values[k]))
+        except Exception as e:
+            _log.warning("套用視線參數失敗，此模型停用視線追蹤: %s", e)
+            self._bindings = []
+
+    def stats(self) -> dict:
+        return {
+            "interval_ms": self.interval_ms,
+            "samples": self.samples,
+            "params": [GAZE_PARAMS[k][0] for k, _ in self._bindings],
+            "offsets": [round(float(v), 3) for v in self.filter.value],
+        }
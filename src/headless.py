@@ -0,0 +1,310 @@
+"""
+無頭模式模組 - 不需 GPU / 視窗即可執行對話與互動流程
+將 LLMClient、CharacterInteraction 與串流 worker 串接起來，提供程式化 API，
+並可作為對話管線的高併發測試工具：
+
+    python -m src.headless --sessions 50 --messages 5
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.character_interaction import CharacterInteraction
+from src.character_library import CharacterInfo, get_available_characters
+from src.chat_telemetry import ChatTelemetry, ErrorChunk, ToolStatusChunk, traced_stream
+from src.mock_llm import MockLLMClient
+
+
+class HeadlessStreamWorker(threading.Thread):
+    """
+    無頭版串流 worker（對應 GUI 的 LLMStreamWorker）。
+    以一般執行緒執行，透過回呼而非 Qt signal 回傳片段。
+    """
+
+    def __init__(
+        self,
+        assistant: "HeadlessAssistant",
+        message: str,
+        on_chunk: Optional[Callable[[str], None]] = None,
+        on_done: Optional[Callable[[str], None]] = None,
+    ):
+        super().__init__(name="HeadlessStreamWorker", daemon=True)
+        self.assistant = assistant
+        self.message = message
+        self.on_chunk = on_chunk
+        self.on_done = on_done
+        self.text = ""
+        self.error: Optional[str] = None
+        self._stop_requested = False
+
+    def stop(self):
+        """要求停止串流（盡快結束迭代）"""
+        self._stop_requested = True
+
+    def run(self):
+        assistant = self.assistant
+        trace = assistant.telemetry.begin(self.message)
+        try:
+            stream = traced_stream(
+                assistant.llm_client, self.message, assistant.telemetry, trace
+            )
+            for delta in stream:
+                if self._stop_requested:
+                    break
+                if isinstance(delta, ErrorChunk):
+                    self.error = str(delta)
+                    break
+                if isinstance(delta, ToolStatusChunk):
+                    # 工具狀態行只交給回呼顯示，不計入回覆與遙測
+                    if self.on_chunk:
+                        self.on_chunk(delta)
+                    continue
+                if delta:
+                    self.text += delta
+                    # 以回呼耗時對應 GUI 模式的「每個片段 GUI 執行緒耗時」
+                    start_ns = time.perf_counter_ns()
+                    if self.on_chunk:
+                        self.on_chunk(delta)
+                    assistant.telemetry.record_chunk(
+                        trace, delta, (time.perf_counter_ns() - start_ns) // 1000
+                    )
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            assistant.telemetry.finish(
+                trace, self.text, stopped=self._stop_requested, error=self.error
+            )
+            assistant._on_worker_done(self)
+            if self.on_done:
+                self.on_done(self.text)
+
+
+class HeadlessAssistant:
+    """
+    無頭助手：與 DesktopCharacterWindow 相同的對話與互動行為，但不建立任何視窗。
+    同一個助手一次只處理一則串流（與 GUI 相同）；多個對話請建立多個助手。
+    """
+
+    def __init__(
+        self,
+        llm_client=None,
+        characters: Optional[List[CharacterInfo]] = None,
+        initial_character_id: Optional[str] = None,
+        telemetry: Optional[ChatTelemetry] = None,
+    ):
+        """
+        Args:
+            llm_client: LLMClient 或相同介面的物件（預設使用 MockLLMClient）
+            characters: 可切換的角色清單（預設為素材庫中的可用角色）
+            initial_character_id: 初始角色 ID
+            telemetry: 共用的遙測收集器（多個助手可共用一個）
+        """
+        self.llm_client = llm_client or MockLLMClient()
+        self.characters = characters if characters is not None else get_available_characters()
+        self.telemetry = telemetry or ChatTelemetry(enabled=True)
+        self.character_interaction = CharacterInteraction()
+        self._current_character_index = 0
+        self._worker: Optional[HeadlessStreamWorker] = None
+        self._lock = threading.Lock()
+
+        if initial_character_id:
+            self.switch_character(initial_character_id)
+        else:
+            self._apply_current_character()
+
+    # ---- 角色與互動 ----
+
+    @property
+    def current_character(self) -> Optional[CharacterInfo]:
+        if not self.characters:
+            return None
+        return self.characters[self._current_character_index % len(self.characters)]
+
+    def switch_character(self, character_id: str) -> bool:
+        """切換到指定角色；找不到時回傳 False"""
+        for idx, c in enumerate(self.characters):
+            if c.id == character_id:
+                self._current_character_index = idx
+                self._apply_current_character()
+                return True
+        return False
+
+    def _apply_current_character(self):
+        current = self.current_character
+        self.character_interaction = CharacterInteraction(
+            current.model_path if current else None
+        )
+
+    def click(self, part_id: str) -> Tuple[str, str, str]:
+        """模擬點擊部件，回傳 (互動區域, 動作名稱, 回覆)"""
+        return self.character_interaction.get_interaction_for_part(part_id)
+
+    # ---- 對話 ----
+
+    @property
+    def is_streaming(self) -> bool:
+        return self._worker is not None
+
+    def submit(
+        self,
+        message: str,
+        on_chunk: Optional[Callable[[str], None]] = None,
+        on_done: Optional[Callable[[str], None]] = None,
+    ) -> Optional[HeadlessStreamWorker]:
+        """
+        在背景執行緒開始串流回覆（非阻塞）。
+
+        Returns:
+            串流 worker；若已有串流進行中則回傳 None
+        """
+        message = message.strip()
+        if not message:
+            return None
+        with self._lock:
+            if self._worker is not None:
+                return None
+            self._worker = HeadlessStreamWorker(self, message, on_chunk, on_done)
+            worker = self._worker
+        worker.start()
+        return worker
+
+    def _on_worker_done(self, worker: HeadlessStreamWorker):
+        with self._lock:
+            if self._worker is worker:
+                self._worker = None
+
+    def stop(self):
+        """停止目前的串流"""
+        worker = self._worker
+        if worker:
+            worker.stop()
+
+    def stream(self, message: str) -> Iterator[str]:
+        """在呼叫端執行緒中同步串流回覆"""
+        trace = self.telemetry.begin(message)
+        text = ""
+        error = None
+        try:
+            for delta in traced_stream(self.llm_client, message, self.telemetry, trace):
+                if isinstance(delta, ErrorChunk):
+                    # 錯誤片段照常交給呼叫端顯示，但不計入回覆與遙測輸出量
+                    error = str(delta)
+                elif not isinstance(delta, ToolStatusChunk):
+                    text += delta
+                    self.telemetry.record_chunk(trace, delta, 0)
+                yield delta
+        finally:
+            self.telemetry.finish(trace, text, error=error)
+
+    def send(self, message: str) -> str:
+        """送出訊息並等待完整回覆"""
+        return "".join(self.stream(message))
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_load_test(
+    num_sessions: int,
+    messages_per_session: int,
+    client_factory: Callable[[], object],
+    think_time: float = 0.0,
+    telemetry: Optional[ChatTelemetry] = None,
+) -> Dict[str, float]:
+    """
+    模擬多個同時進行的對話（每個對話一個 HeadlessAssistant 與獨立的客戶端 / 歷史）。
+
+    Args:
+        num_sessions: 同時進行的對話數
+        messages_per_session: 每個對話依序送出的訊息數
+        client_factory: 建立 LLM 客戶端的函式（每個對話呼叫一次）
+        think_time: 每則訊息之間的使用者思考時間（秒）
+        telemetry: 共用的遙測收集器
+
+    Returns:
+        統計結果（吞吐量、TTFT 百分位數等）
+    """
+    total_messages = num_sessions * messages_per_session
+    telemetry = telemetry or ChatTelemetry(capacity=max(200, total_messages), verbose=False)
+    assistants = [
+        HeadlessAssistant(llm_client=client_factory(), telemetry=telemetry)
+        for _ in range(num_sessions)
+    ]
+
+    def run_session(index: int) -> int:
+        assistant = assistants[index]
+        chars = 0
+        for n in range(messages_per_session):
+            chars += len(assistant.send(f"session {index} message {n}: 你好，請自我介紹"))
+            if think_time:
+                time.sleep(think_time)
+        return chars
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_sessions) as pool:
+        total_chars = sum(pool.map(run_session, range(num_sessions)))
+    elapsed = time.perf_counter() - start
+
+    summaries = [t.summary() for t in telemetry.traces()]
+    ttft = [s["ttft_ms"] for s in summaries if s["ttft_ms"] is not None]
+    total = [s["total_ms"] for s in summaries if s["total_ms"] is not None]
+    return {
+        "sessions": num_sessions,
+        "messages": total_messages,
+        "elapsed_s": elapsed,
+        "messages_per_s": total_messages / elapsed if elapsed else 0.0,
+        "chars_per_s": total_chars / elapsed if elapsed else 0.0,
+        "ttft_p50_ms": _percentile(ttft, 0.50),
+        "ttft_p95_ms": _percentile(ttft, 0.95),
+        "total_p50_ms": _percentile(total, 0.50),
+        "total_p95_ms": _percentile(total, 0.95),
+        "total_mean_ms": statistics.mean(total) if total else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="無頭模式對話管線測試")
+    parser.add_argument("--sessions", type=int, default=20, help="同時進行的對話數")
+    parser.add_argument("--messages", type=int, default=3, help="每個對話的訊息數")
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--chunk-interval", type=float, default=0.02)
+    parser.add_argument("--think-time", type=float, default=0.0)
+    parser.add_argument("--real", action="store_true", help="使用真實的 Gemini API（會消耗額度）")
+    parser.add_argument("--trace-file", type=Path, help="匯出遙測紀錄（.json / .trace.json）")
+    args = parser.parse_args(argv)
+
+    if args.real:
+        from src.llm_client import LLMClient
+        factory = LLMClient
+    else:
+        def factory():
+            return MockLLMClient(
+                first_token_delay=args.first_token_delay,
+                chunk_interval=args.chunk_interval,
+            )
+
+    # 大量對話時不逐則列印遙測摘要
+    telemetry = ChatTelemetry(capacity=max(200, args.sessions * args.messages), verbose=False)
+
+    result = run_load_test(
+        args.sessions, args.messages, factory,
+        think_time=args.think_time, telemetry=telemetry,
+    )
+    for key, value in result.items():
+        print(f"{key:>16}: {value:.2f}" if isinstance(value, float) else f"{key:>16}: {value}")
+    if args.trace_file:
+        telemetry.export(args.trace_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+休眠模組 - 長時間閒置 / 隱藏時釋放模型與貼圖記憶體
+提供閒置偵測（InactivityMonitor）與記憶體量測（RSS / 顯示卡可用記憶體）。
+"""
+from __future__ import annotations
+
+import os
+import sys
+from typing import Dict, Optional
+
+from PyQt6.QtCore import QEvent, QObject, pyqtSignal
+
+from src.scheduler import scheduler
+
+
+# 視為「使用者互動」的事件類型
+_ACTIVITY_EVENTS = {
+    QEvent.Type.MouseButtonPress,
+    QEvent.Type.MouseButtonDblClick,
+    QEvent.Type.KeyPress,
+    QEvent.Type.Wheel,
+}
+
+# GL_NVX_gpu_memory_info / GL_ATI_meminfo 的查詢代碼（單位 KB）
+_GL_GPU_MEMORY_INFO_CURRENT_AVAILABLE_VIDMEM_NVX = 0x9049
+_GL_TEXTURE_FREE_MEMORY_ATI = 0x87FC
+
+
+class InactivityMonitor(QObject):
+    """
+    閒置偵測器。
+
+    - 安裝為 QApplication 的事件過濾器，任何滑鼠 / 鍵盤輸入都會重設計時
+    - 程式化的互動（IPC、串流）由呼叫端以 touch() / set_busy() 告知
+    - 視窗隱藏時改用較短的逾時；忙碌（串流中）時不會逾時
+    """
+
+    # 信號：閒置逾時（應進入休眠）
+    timed_out = pyqtSignal()
+    # 信號：休眠後偵測到互動（應喚醒）
+    activity = pyqtSignal()
+
+    def __init__(self, idle_timeout_sec: float, hidden_timeout_sec: float, parent=None):
+        """
+        Args:
+            idle_timeout_sec: 可見但無互動多久後休眠；0 表示不因閒置休眠
+            hidden_timeout_sec: 視窗隱藏多久後休眠；0 表示不因隱藏休眠
+        """
+        super().__init__(parent)
+        self.idle_timeout_ms = int(idle_timeout_sec * 1000)
+        self.hidden_timeout_ms = int(hidden_timeout_sec * 1000)
+        self._hidden = False
+        self._busy = False
+        self.asleep = False
+        # 逾時動輒數分鐘，容許延後 5% 以便與其他計時合併喚醒
+        self._timer = scheduler.timer(self._on_timeout, slack=0.05, owner=self)
+
+    @classmethod
+    def from_env(cls, parent=None) -> Optional["InactivityMonitor"]:
+        """
+        由環境變數建立：HIBERNATE_IDLE_SEC（預設 1800）、HIBERNATE_HIDDEN_SEC（預設 300）。
+        兩者皆為 0 時停用，回傳 None。
+        """
+        idle = float(os.getenv("HIBERNATE_IDLE_SEC", "1800"))
+        hidden = float(os.getenv("HIBERNATE_HIDDEN_SEC", "300"))
+        if idle <= 0 and hidden <= 0:
+            return None
+        return cls(idle, hidden, parent)
+
+    def start(self):
+        from PyQt6.QtWidgets import QApplication
+
+        app = QApplication.instance()
+        if app is not None:
+            app.installEventFilter(self)
+        self._restart()
+
+    def stop(self):
+        from PyQt6.QtWidgets import QApplication
+
+        app = QApplication.instance()
+        if app is not None:
+            app.removeEventFilter(self)
+        self._timer.stop()
+
+    def touch(self):
+        """記錄一次互動；若正在休眠則發出 activity"""
+        if self.asleep:
+            self.asleep = False
+            self.activity.emit()
+        self._restart()
+
+    def set_busy(self, busy: bool):
+        """忙碌中（例如串流回覆）不會逾時"""
+        self._busy = busy
+        if busy:
+            self.touch()
+        else:
+            self._restart()
+
+    def set_hidden(self, hidden: bool):
+        self._hidden = hidden
+        self._restart()
+
+    def eventFilter(self, obj, event) -> bool:
+        if event.type() in _ACTIVITY_EVENTS:
+            self.touch()
+        return False
+
+    def _restart(self):
+        timeout = self.hidden_timeout_ms if self._hidden else self.idle_timeout_ms
+        if timeout > 0 and not self._busy and not self.asleep:
+            self._timer.start(timeout)
+        else:
+            self._timer.stop()
+
+    def _on_timeout(self):
+        if self._busy or self.asleep:
+            return
+        self.asleep = True
+        self.timed_out.emit()
+
+
+def process_rss_bytes() -> Optional[int]:
+    """目前行程的常駐記憶體（RSS）；無法取得時回傳 None"""
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return None
+
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        try:
+            ok = ctypes.windll.psapi.GetProcessMemoryInfo(
+                ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb
+            )
+        except (AttributeError, OSError):
+            return None
+        return counters.WorkingSetSize if ok else None
+
+    return None
+
+
+def gpu_free_memory_kb() -> Optional[int]:
+    """
+    顯示卡目前可用記憶體（KB），需在 GL context 為 current 時呼叫。
+    僅 NVIDIA（GL_NVX_gpu_memory_info）與 AMD（GL_ATI_meminfo）驅動支援，其餘回傳 None。
+    """
+    try:
+        from OpenGL import GL
+    except ImportError:
+        return None
+    for query in (_GL_GPU_MEMORY_INFO_CURRENT_AVAILABLE_VIDMEM_NVX, _GL_TEXTURE_FREE_MEMORY_ATI):
+        try:
+            value = GL.glGetIntegerv(query)
+        except Exception:
+            continue
+        try:
+            return int(value[0]) if hasattr(value, "__len__") else int(value)
+        except (TypeError, ValueError, IndexError):
+            continue
+    return None
+
+
+def memory_report(before: Dict[str, Optional[int]], after: Dict[str, Optional[int]]) -> str:
+    """將前後量測結果格式化為一行文字"""
+    parts = []
+    if before.get("rss") is not None and after.get("rss") is not None:
+        parts.append(f"RSS {before['rss'] / 2**20:.1f} → {after['rss'] / 2**20:.1f} MB")
+    if before.get("vram_free_kb") is not None and after.get("vram_free_kb") is not None:
+        freed = (after["vram_free_kb"] - before["vram_free_kb"]) / 1024
+        parts.append(f"VRAM 釋放 {freed:+.1f} MB")
+    return "，".join(parts) or "（此平台無法量測記憶體）"
@@ -0,0 +1,133 @@
+"""
+閒置行為模組 - 角色閒置時隨機播放動作、切換表情
+排程交給集中排程器（src.scheduler），間隔加上隨機抖動，並容許延後以便與其他計時合併喚醒。
+只在模型已載入、視窗可見、動作佇列沒有播放中 / 排隊的動作且不在預渲染待機 / 串流期間時觸發。
+
+設定（環境變數）：
+    IDLE_BEHAVIORS=0          設為 1 啟用
+    IDLE_MOTION_SEC=45        隨機動作的平均間隔（秒）
+    IDLE_EXPRESSION_SEC=90    隨機表情的平均間隔（秒），表情維持 IDLE_EXPRESSION_HOLD_SEC 秒後還原
+    IDLE_EXPRESSION_HOLD_SEC=8
+"""
+from __future__ import annotations
+
+import os
+import random
+from typing import List, Optional
+
+from src.app_log import get_logger
+from src.character_loader import CharacterLoader
+from src.motion_queue import MotionPriority
+from src.scheduler import Scheduler, scheduler as default_scheduler
+
+_log = get_logger("idle")
+
+# 不作為閒置隨機動作的群組（待機循環本身）
+_EXCLUDED_GROUPS = {"Idle"}
+
+
+class IdleBehaviors:
+    """依抖動的排程在閒置時觸發隨機動作 / 表情"""
+
+    JITTER = 0.5   # 間隔 ±50%
+    SLACK = 0.2    # 容許延後 20%，與其他計時合併喚醒
+
+    def __init__(
+        self,
+        widget,
+        motion_sec: float = 45.0,
+        expression_sec: float = 90.0,
+        expression_hold_sec: float = 8.0,
+        scheduler: Optional[Scheduler] = None,
+    ):
+        self.widget = widget
+        self.expression_hold_sec = expression_hold_sec
+        self._motion_groups: List[str] = []
+        self.motions_played = 0
+        self.expressions_set = 0
+        sched = scheduler or default_scheduler
+        self._motion_timer = sched.timer(self._on_motion, single_shot=False, slack=self.SLACK, jitter=self.JITTER, owner=widget)
+        self._motion_timer.setInterval(int(motion_sec * 1000))
+        self._expression_timer = sched.timer(self._on_expression, single_shot=False, slack=self.SLACK, jitter=self.JITTER, owner=widget)
+        self._expression_timer.setInterval(int(expression_sec * 1000))
+        self._reset_timer = sched.timer(self._reset_expression, slack=self.SLACK, owner=widget)
+
+    @classmethod
+    def from_env(cls, widget) -> Optional["IdleBehaviors"]:
+        if os.getenv("IDLE_BEHAVIORS", "0") != "1":
+            return None
+        return cls(
+            widget,
+            motion_sec=float(os.getenv("IDLE_MOTION_SEC", "45")),
+            expression_sec=float(os.getenv("IDLE_EXPRESSION_SEC", "90")),
+            expression_hold_sec=float(os.getenv("IDLE_EXPRESSION_HOLD_SEC", "8")),
+        )
+
+    def start(self):
+        """模型載入後呼叫：讀取可用的動作群組並開始排程"""
+        try:
+            groups = CharacterLoader(self.widget.model_path).get_motion_meta()
+        except (OSError, ValueError) as e:
+            _log.warning("讀取動作群組失敗: %s", e)
+            groups = {}
+        self._motion_groups = [g for g, metas in groups.items() if g not in _EXCLUDED_GROUPS and metas]
+        if self._motion_groups and self._motion_timer.interval() > 0:
+            self._motion_timer.start()
+        if self._expression_timer.interval() > 0:
+            self._expression_timer.start()
+
+    def stop(self):
+        self._motion_timer.stop()
+        self._expression_timer.stop()
+        self._reset_timer.stop()
+
+    def _idle_model(self):
+        """目前可以插入閒置行為時回傳模型，否則 None"""
+        widget = self.widget
+        model = widget.model
+        if model is None or not widget.isVisible() or widget.idle_playback_active or widget.live_required:
+            return None
+        # 待機動作會自行循環，IsMotionFinished() 幾乎不會為 True；以動作佇列判斷是否有其他動作在播放
+        if widget.motion_queue.busy() or widget.motion_queue.pending:
+            return None
+        return model
+
+    def _on_motion(self):
+        if self._idle_model() is None or not self._motion_groups:
+            return
+        group = random.choice(self._motion_groups)
+        # 閒置優先度：使用者點擊觸發的動作可隨時打斷；佇列中有其他動作時直接略過
+        if self.widget.request_motion(group, None, MotionPriority.IDLE) == "started":
+            self.motions_played += 1
+
+    def _on_expression(self):
+        model = self._idle_model()
+        if model is None:
+            return
+        try:
+            model.SetRandomExpression()
+        except Exception as e:
+            # 沒有表情檔或 API 不支援：不再嘗試
+            _log.info("停用閒置表情: %s", e)
+            self._expression_timer.stop()
+            return
+        self.expressions_set += 1
+        if self.expression_hold_sec > 0:
+            self._reset_timer.start(int(self.expression_hold_sec * 1000))
+
+    def _reset_expression(self):
+        model = self.widget.model
+        if model is None:
+            return
+        try:
+            model.ResetExpression()
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "motions": self.motions_played,
+            "expressions": self.expressions_set,
+            "next_motion_ms": self._motion_timer.remainingTime(),
+            "next_expression_ms": self._expression_timer.remainingTime(),
+        }
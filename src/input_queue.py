@@ -0,0 +1,118 @@
+"""
+輸入佇列模組 - 回覆串流期間暫存使用者新輸入的訊息
+- 串流期間送出的訊息先排隊，目前的回覆結束後把所有排隊訊息合併為一次請求送出
+- 短時間內重複送出完全相同的訊息（與排隊中或剛送出的訊息相同）只保留一則，節省請求與額度
+
+設定（環境變數）：
+    INPUT_QUEUE=1            設為 0 停用（串流期間按 Enter 改為停止生成）
+    INPUT_QUEUE_MAX=5        最多排隊的訊息數
+    INPUT_DEDUPE_SEC=10      此時間內的相同訊息視為重複
+"""
+from __future__ import annotations
+
+import os
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+
+
+class PendingInputQueue:
+    """串流期間的待送訊息（GUI 執行緒使用）"""
+
+    def __init__(
+        self,
+        max_messages: int = 5,
+        max_chars: int = 4000,
+        dedupe_sec: float = 10.0,
+        time_fn: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            max_messages: 最多排隊的訊息數
+            max_chars: 合併後的訊息長度上限（超過時拒絕新的訊息）
+            dedupe_sec: 與此時間內排隊 / 送出的訊息完全相同時視為重複
+        """
+        self.max_messages = max_messages
+        self.max_chars = max_chars
+        self.dedupe_sec = dedupe_sec
+        self._time_fn = time_fn
+        self._pending: List[str] = []
+        # 最近送出 / 排隊的訊息：(時間, 內容)
+        self._recent: Deque[Tuple[float, str]] = deque()
+        self.queued = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.merged = 0  # 合併進同一次請求而省下的請求數
+
+    @classmethod
+    def from_env(cls) -> Optional["PendingInputQueue"]:
+        if os.getenv("INPUT_QUEUE", "1") == "0":
+            return None
+        return cls(
+            max_messages=int(os.getenv("INPUT_QUEUE_MAX", "5")),
+            dedupe_sec=float(os.getenv("INPUT_DEDUPE_SEC", "10")),
+        )
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _is_recent(self, message: str, now: float) -> bool:
+        recent = self._recent
+        while recent and now - recent[0][0] > self.dedupe_sec:
+            recent.popleft()
+        return any(text == message for _, text in recent)
+
+    def note_sent(self, message: str):
+        """記錄已送出的訊息（之後短時間內的相同輸入視為重複）"""
+        self._recent.append((self._time_fn(), message.strip()))
+
+    def add(self, message: str) -> str:
+        """
+        排入一則訊息。
+
+        Returns:
+            "queued" / "duplicate" / "full"
+        """
+        message = message.strip()
+        now = self._time_fn()
+        if message in self._pending or self._is_recent(message, now):
+            self.deduplicated += 1
+            return "duplicate"
+        total = sum(len(m) + 1 for m in self._pending) + len(message)
+        if len(self._pending) >= self.max_messages or total > self.max_chars:
+            self.rejected += 1
+            return "full"
+        self._pending.append(message)
+        self._recent.append((now, message))
+        self.queued += 1
+        return "queued"
+
+    @property
+    def text(self) -> str:
+        """排隊訊息合併後的內容（不取出）"""
+        return "\n".join(self._pending)
+
+    def take(self) -> Optional[str]:
+        """取出並清空所有排隊訊息，以換行合併為一則；沒有排隊訊息時回傳 None"""
+        if not self._pending:
+            return None
+        text = self.text
+        self.flushed += 1
+        self.merged += len(self._pending) - 1
+        self._pending = []
+        return text
+
+    def clear(self):
+        self._pending.clear()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "queued": self.queued,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "flushed": self.flushed,
+            "merged": self.merged,
+        }
@@ -0,0 +1,163 @@
+"""
+本地 IPC 客戶端模組 - 連線到執行中的 Desktop Helper 實例並送出指令
+
+可作為指令列工具使用（不需啟動 GUI、Live2D 或 LLM 客戶端）：
+    python -m src.ipc_client ping
+    python -m src.ipc_client send "今天天氣如何？"
+    python -m src.ipc_client stream "講個笑話"
+    python -m src.ipc_client chat --session work "幫我整理待辦"
+    python -m src.ipc_client switch hiyori_pro_zh
+    python -m src.ipc_client motion Tap 0
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import sys
+from typing import Any, Dict, Iterator, Optional
+
+from PyQt6.QtCore import QCoreApplication
+from PyQt6.QtNetwork import QLocalSocket
+
+from src.ipc_server import default_server_name
+
+
+class IPCError(RuntimeError):
+    """IPC 連線或指令執行失敗"""
+
+
+class IPCClient:
+    """阻塞式 IPC 客戶端（不需要事件迴圈）"""
+
+    def __init__(self, server_name: Optional[str] = None, timeout_ms: int = 30000):
+        # QLocalSocket 需要 QCoreApplication 實例；若呼叫端尚未建立（純指令列），建立一個輕量的
+        if QCoreApplication.instance() is None:
+            self._app = QCoreApplication(sys.argv[:1])
+        self.server_name = server_name or default_server_name()
+        self.timeout_ms = timeout_ms
+        self._socket = QLocalSocket()
+        self._buffer = b""
+        self._ids = itertools.count(1)
+
+    def connect(self, timeout_ms: int = 500) -> bool:
+        """連線到執行中的實例；沒有實例時回傳 False"""
+        self._socket.connectToServer(self.server_name)
+        return self._socket.waitForConnected(timeout_ms)
+
+    def close(self):
+        self._socket.disconnectFromServer()
+
+    def __enter__(self) -> "IPCClient":
+        if not self.connect():
+            raise IPCError("找不到執行中的 Desktop Helper 實例")
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _send(self, cmd: str, args: Dict) -> int:
+        request_id = next(self._ids)
+        payload = {"id": request_id, "cmd": cmd, "args": args}
+        self._socket.write(json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n")
+        if not self._socket.waitForBytesWritten(self.timeout_ms):
+            raise IPCError("送出指令逾時")
+        return request_id
+
+    def _read_message(self) -> Dict:
+        while b"\n" not in self._buffer:
+            if not self._socket.waitForReadyRead(self.timeout_ms):
+                raise IPCError("等待回應逾時或連線中斷")
+            self._buffer += bytes(self._socket.readAll())
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line.decode("utf-8"))
+
+    def events(self, cmd: str, **args) -> Iterator[Dict]:
+        """送出指令並逐一產生串流事件；最終回應會以 {"event": "result", ...} 產生"""
+        request_id = self._send(cmd, args)
+        while True:
+            message = self._read_message()
+            if message.get("id") not in (request_id, None):
+                continue
+            if "event" in message:
+                yield message
+                continue
+            if not message.get("ok"):
+                raise IPCError(message.get("error", "未知錯誤"))
+            yield {"event": "result", "data": message.get("result")}
+            return
+
+    def request(self, cmd: str, **args) -> Any:
+        """送出指令並等待最終結果（忽略串流事件）"""
+        result = None
+        for message in self.events(cmd, **args):
+            if message["event"] == "result":
+                result = message["data"]
+        return result
+
+    def stream(self, text: str) -> Iterator[str]:
+        """送出提示詞並逐步產生回覆片段"""
+        for message in self.events("stream", text=text):
+            if message["event"] == "chunk":
+                yield message["data"].get("text", "")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="控制執行中的 Desktop Helper 實例")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("ping")
+    sub.add_parser("status")
+    sub.add_parser("show")
+    p = sub.add_parser("send")
+    p.add_argument("text")
+    p = sub.add_parser("stream")
+    p.add_argument("text")
+    p = sub.add_parser("chat")
+    p.add_argument("text")
+    p.add_argument("--session", default=None, help="工作階段 ID（各自保有獨立上下文）")
+    p = sub.add_parser("switch")
+    p.add_argument("character_id")
+    p = sub.add_parser("motion")
+    p.add_argument("group")
+    p.add_argument("index", type=int, nargs="?", default=0)
+    p = sub.add_parser("companion")
+    p.add_argument("character_id")
+    p.add_argument("--close", action="store_true", help="關閉該同伴角色")
+    args = parser.parse_args(argv)
+
+    try:
+        with IPCClient() as client:
+            if args.cmd == "stream":
+                for delta in client.stream(args.text):
+                    sys.stdout.write(delta)
+                    sys.stdout.flush()
+                sys.stdout.write("\n")
+                return 0
+            if args.cmd == "chat":
+                for message in client.events("chat", text=args.text, session=args.session):
+                    if message["event"] == "chunk":
+                        sys.stdout.write(message["data"].get("text", ""))
+                        sys.stdout.flush()
+                sys.stdout.write("\n")
+                return 0
+            if args.cmd == "send":
+                result = client.request("send", text=args.text)
+            elif args.cmd == "switch":
+                result = client.request("switch_character", id=args.character_id)
+            elif args.cmd == "motion":
+                result = client.request("play_motion", group=args.group, index=args.index)
+            elif args.cmd == "companion":
+                action = "close" if args.close else "open"
+                result = client.request("companion", id=args.character_id, action=action)
+            else:
+                result = client.request(args.cmd)
+    except IPCError as e:
+        print(f"錯誤: {e}", file=sys.stderr)
+        return 1
+
+    print(result if isinstance(result, str) else json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+本地 IPC 服務模組 - 以 QLocalServer 提供單一實例控制介面
+協定：每行一個 JSON 物件（UTF-8，以換行分隔）
+
+請求：{"id": 1, "cmd": "send", "args": {"text": "你好"}}
+回應：{"id": 1, "ok": true, "result": ...}
+      {"id": 1, "ok": false, "error": "..."}
+串流事件（在最終回應之前）：{"id": 1, "event": "chunk", "data": {"text": "..."}}
+"""
+from __future__ import annotations
+
+import getpass
+import json
+import sys
+from typing import Any, Callable, Dict, Optional
+
+from PyQt6.QtCore import QObject
+from PyQt6.QtNetwork import QAbstractSocket, QLocalServer, QLocalSocket
+
+
+def default_server_name() -> str:
+    """每位使用者一個服務名稱（Windows 為 named pipe，Linux/macOS 為 Unix socket）"""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = "user"
+    return f"DesktopHelperLLM-{user}"
+
+
+# 處理器回傳此值表示稍後才會呼叫 request.reply() / request.error()（例如串流回覆）
+DEFERRED = object()
+
+
+class IPCRequest:
+    """單一 IPC 請求，提供回覆與串流事件的發送方法"""
+
+    def __init__(self, socket: QLocalSocket, request_id: Any, command: str, args: Dict):
+        self._socket = socket
+        self.id = request_id
+        self.command = command
+        self.args = args
+        self.done = False
+        # 請求結束（回覆、錯誤或連線中斷）時呼叫，用於解除 signal 連結
+        self.on_close: Optional[Callable[[], None]] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._socket.state() == QLocalSocket.LocalSocketState.ConnectedState
+
+    def _write(self, payload: Dict):
+        if not self.connected:
+            return
+        self._socket.write(json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._socket.flush()
+
+    def event(self, name: str, **data):
+        """發送串流事件（不結束請求）"""
+        if not self.done:
+            self._write({"id": self.id, "event": name, "data": data})
+
+    def reply(self, result: Any = None):
+        """回覆成功結果並結束請求"""
+        if self.done:
+            return
+        self._write({"id": self.id, "ok": True, "result": result})
+        self._close()
+
+    def error(self, message: str):
+        """回覆錯誤並結束請求"""
+        if self.done:
+            return
+        self._write({"id": self.id, "ok": False, "error": message})
+        self._close()
+
+    def _close(self):
+        self.done = True
+        if self.on_close:
+            callback, self.on_close = self.on_close, None
+            callback()
+
+
+class IPCServer(QObject):
+    """
+    單一實例的本地控制服務。
+    指令由 handlers 字典對應到處理函式 handler(request) -> result | DEFERRED。
+    處理函式在 GUI 執行緒中執行，可直接操作視窗與元件。
+    """
+
+    def __init__(
+        self,
+        handlers: Dict[str, Callable[[IPCRequest], Any]],
+        server_name: Optional[str] = None,
+        parent: Optional[QObject] = None,
+    ):
+        super().__init__(parent)
+        self.server_name = server_name or default_server_name()
+        self.handlers = dict(handlers)
+        self.handlers.setdefault("ping", lambda request: "pong")
+        self._server = QLocalServer(self)
+        if sys.platform == "win32":
+            # 限制 named pipe 只允許目前使用者。Unix 上不設定：Qt 會先在暫存路徑建立 socket 再 rename，
+            # 直接覆蓋執行中實例的 socket 檔，使 listen() 無法作為單一實例鎖（socket 檔預設權限已排除其他使用者連線）
+            self._server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self._server.newConnection.connect(self._on_new_connection)
+        self._buffers: Dict[QLocalSocket, bytes] = {}
+        self._pending: Dict[QLocalSocket, list] = {}
+        self.already_running = False
+
+    def listen(self) -> bool:
+        """
+        開始監聽（同時作為單一實例鎖）。名稱被佔用時先試著連線：
+        連得上表示另一個實例正在執行，回傳 False 並設定 already_running；
+        連不上才是殘留的 socket 檔（前一次程式異常結束），移除後重試。
+        """
+        # Windows 允許多個 server 使用同一個 pipe 名稱，因此先確認沒有實例在執行
+        self.already_running = self._server_alive()
+        if self.already_running:
+            return False
+        if self._server.listen(self.server_name):
+            return True
+        if self._server.serverError() == QAbstractSocket.SocketError.AddressInUseError:
+            self.already_running = self._server_alive()
+            if self.already_running:
+                return False
+            QLocalServer.removeServer(self.server_name)
+            if self._server.listen(self.server_name):
+                return True
+        print(f"IPC 服務啟動失敗: {self._server.errorString()}")
+        return False
+
+    def _server_alive(self) -> bool:
+        probe = QLocalSocket()
+        probe.connectToServer(self.server_name)
+        if probe.waitForConnected(500):
+            probe.disconnectFromServer()
+            return True
+        return False
+
+    def close(self):
+        """關閉服務與所有連線"""
+        for socket in list(self._buffers):
+            socket.disconnectFromServer()
+        self._server.close()
+
+    def _on_new_connection(self):
+        while self._server.hasPendingConnections():
+            socket = self._server.nextPendingConnection()
+            self._buffers[socket] = b""
+            self._pending[socket] = []
+            socket.readyRead.connect(lambda s=socket: self._on_ready_read(s))
+            socket.disconnected.connect(lambda s=socket: self._on_disconnected(s))
+
+    def _on_disconnected(self, socket: QLocalSocket):
+        # 客戶端中途離線：結束其未完成的請求，讓處理器解除 signal 連結
+        for request in self._pending.pop(socket, []):
+            if not request.done:
+                request._close()
+        self._buffers.pop(socket, None)
+        socket.deleteLater()
+
+    def _on_ready_read(self, socket: QLocalSocket):
+        buffer = self._buffers.get(socket, b"") + bytes(socket.readAll())
+        *lines, rest = buffer.split(b"\n")
+        self._buffers[socket] = rest
+        for line in lines:
+            if line.strip():
+                self._dispatch(socket, line)
+
+    def _dispatch(self, socket: QLocalSocket, line: bytes):
+        try:
+            payload = json.loads(line.decode("utf-8"))
+            command = payload["cmd"]
+            args = payload.get("args") or {}
+        except (ValueError, KeyError, TypeError) as e:
+            IPCRequest(socket, None, "", {}).error(f"無效的請求: {e}")
+            return
+
+        request = IPCRequest(socket, payload.get("id"), command, args)
+        handler = self.handlers.get(command)
+        if handler is None:
+            request.error(f"未知指令: {command}")
+            return
+
+        pending = self._pending.setdefault(socket, [])
+        pending[:] = [r for r in pending if not r.done]
+        pending.append(request)
+        try:
+            result = handler(request)
+        except Exception as e:
+            request.error(str(e))
+            return
+        if result is not DEFERRED:
+            request.reply(result)
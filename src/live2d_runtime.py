@@ -0,0 +1,115 @@
+"""
+Live2D 共用執行環境模組 - 多個角色視窗共用一份 Live2D Core 初始化與 GL 資源
+- live2d.init() / glInit() / dispose() 以引用計數管理，最後一個 widget 釋放時才 dispose
+- 應用程式啟動前開啟 Qt 的 AA_ShareOpenGLContexts，所有 QOpenGLWidget 的 context 互相共享，
+  貼圖等 GL 物件可在任一角色視窗使用
+- 同一模型出現多次時，共用可由本程式管理的資源（例如預渲染的待機循環）
+"""
+from __future__ import annotations
+
+import threading
+import weakref
+from collections import Counter
+from typing import Callable, Dict, Optional
+
+from PyQt6.QtCore import QCoreApplication, Qt
+
+
+def enable_shared_gl_contexts():
+    """讓所有 QOpenGLWidget 共享 GL context；必須在建立 QApplication 之前呼叫"""
+    QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+
+
+class Live2DRuntime:
+    """
+    行程內共用的 Live2D 執行環境。
+
+    每個 Live2DWidget 初始化時 acquire()、清理時 release()；
+    Core 只在第一個 acquire 時初始化、最後一個 release 時釋放。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refs = 0
+        self._gl_ready = False
+        self._module = None
+        # widget -> 目前載入的模型路徑（widget 被回收時自動移除）
+        self._models: "weakref.WeakKeyDictionary[object, str]" = weakref.WeakKeyDictionary()
+        # 共用資源（預渲染待機循環等）：最後一個使用者釋放後自動回收
+        self._shared: "weakref.WeakValueDictionary[str, object]" = weakref.WeakValueDictionary()
+
+    @property
+    def refs(self) -> int:
+        return self._refs
+
+    def acquire(self, module):
+        """取得 Live2D Core（第一次呼叫時初始化）"""
+        with self._lock:
+            if self._refs == 0:
+                module.init()
+                self._module = module
+            self._refs += 1
+
+    def ensure_gl(self, module):
+        """
+        初始化 Live2D 的 GL 函式（需在 GL context 為 current 時呼叫）。
+        各 widget 的 context 互相共享，整個行程只需初始化一次。
+        """
+        with self._lock:
+            if not self._gl_ready and hasattr(module, "glInit"):
+                module.glInit()
+            self._gl_ready = True
+
+    def release(self):
+        """釋放引用；最後一個使用者釋放時 dispose"""
+        with self._lock:
+            if self._refs == 0:
+                return
+            self._refs -= 1
+            if self._refs == 0 and self._module is not None:
+                try:
+                    self._module.dispose()
+                except Exception as e:
+                    print(f"清理 Live2D 失敗: {e}")
+                self._module = None
+                self._gl_ready = False
+
+    # ---- 模型與共用資源 ----
+
+    def set_model(self, owner, model_path: Optional[str]):
+        """記錄 owner（widget）目前顯示的模型；None 表示已卸載"""
+        with self._lock:
+            if model_path is None:
+                self._models.pop(owner, None)
+            else:
+                self._models[owner] = str(model_path)
+
+    def shared(self, key: str, load: Callable[[], Optional[object]]) -> Optional[object]:
+        """
+        取得共用資源：已有其他 widget 持有時直接共用，否則呼叫 load() 建立。
+        資源以弱參照保存，沒有 widget 持有時自動釋放。
+        """
+        with self._lock:
+            value = self._shared.get(key)
+        if value is not None:
+            return value
+        value = load()
+        if value is not None:
+            self.put_shared(key, value)
+        return value
+
+    def put_shared(self, key: str, value: object):
+        with self._lock:
+            self._shared[key] = value
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "refs": self._refs,
+                "models": dict(Counter(self._models.values())),
+                "shared_resources": len(self._shared),
+            }
+
+
+# 全域共用執行環境
+live2d_runtime = Live2DRuntime()
@@ -3,13 +3,33 @@ Live2D 渲染 Widget - 使用 OpenGL 渲染 Live2D 角色
 """
 from __future__ import annotations
 
+import gc
+import logging
+import os
 import sys
+import threading
+import time
 from pathlib import Path
 from typing import Optional
 
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QPoint
+from PyQt6.QtGui import QImage, QPainter
 from PyQt6.QtOpenGLWidgets import QOpenGLWidget
 
+from src.app_log import get_logger, log_enabled
+from src.asset_pack import collect_runtime_files
+from src.character_loader import CharacterLoader
+from src.gaze import GazeTracker
+from src.idle_behaviors import IdleBehaviors
+from src.hibernation import gpu_free_memory_kb, process_rss_bytes
+from src.live2d_runtime import live2d_runtime
+from src.low_power import FrameCostMeter, IdleFrameCache, IdleLoop
+from src.mask_buffer import LEGACY_MASK_BUFFER_COUNT, MaskBufferPlan
+from src.motion_queue import MotionPriority, MotionQueue, MotionRequest
+from src.scheduler import scheduler
+from src.sim_clock import SimulationClock, lerp_values
+from src.startup_snapshot import startup_timer
+
 try:
     import live2d.v3 as live2d
     LIVE2D_AVAILABLE = True
@@ -23,6 +43,9 @@ except ImportError:
         print("請執行: pip install live2d-py")
 
 
+_log = get_logger("live2d")
+
+
 class Live2DWidget(QOpenGLWidget):
     """使用 OpenGL 渲染 Live2D 角色的 Widget"""
     
@@ -30,15 +53,32 @@ class Live2DWidget(QOpenGLWidget):
     model_loaded = pyqtSignal(bool)
     # 信號：點擊檢測到部位
     part_clicked = pyqtSignal(str)  # 發送 Hit Area ID
+    # 內部信號：喚醒前的素材預讀完成（由背景執行緒發出）
+    _files_warmed = pyqtSignal()
+
+    # 靜態畫面淡出到即時模型的時間（毫秒）
+    SNAPSHOT_FADE_MS = 300.0
+    # 預渲染待機循環的影格率
+    IDLE_LOOP_FPS = 24.0
+    # 預渲染使用的待機動作（group, index）
+    IDLE_LOOP_MOTION = ("Idle", 0)
     
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, sim_clock: Optional[SimulationClock] = None):
         super().__init__(parent)
         self.model = None
         self.model_path: Optional[Path] = None
         
-        # 動畫計時器
+        # 動畫計時器（只負責要求重繪；模擬進度由 sim_clock 以固定步長決定）
         self.animation_timer = QTimer(self)
         self.animation_timer.timeout.connect(self.update)
+
+        # 固定步長模擬時鐘：動作 / 物理的速度與實際繪製頻率無關
+        self.sim_clock = sim_clock or SimulationClock.from_env()
+        # 是否為可指定步長的模型（live2d.Model）；舊版 LAppModel.Update() 使用內部時鐘
+        self._fixed_step_model = False
+        self._param_count = 0
+        self._prev_params: Optional[list] = None
+        self._curr_params: Optional[list] = None
         
         # 視圖參數
         # 以「基準視窗尺寸」為參考，視窗變大/變小時，角色也跟著縮放
@@ -52,19 +92,65 @@ class Live2DWidget(QOpenGLWidget):
         
         # 初始化標記
         self._initialized = False
+        self._runtime_acquired = False  # 是否持有 live2d_runtime 的引用
+        self.mask_plan: Optional[MaskBufferPlan] = None  # 目前模型的遮罩緩衝配置
+        # 點擊紀錄為 DEBUG：停用時只檢查這個布林值，不建立任何日誌紀錄
+        self._log_clicks = log_enabled(_log, logging.DEBUG)
+
+        # 疊加層（例如 BubbleOverlay）：於模型繪製後在同一個 GL 畫面中繪製
+        self.overlay = None
+
+        # 靜態畫面：休眠時的最後一幀，或啟動時上次保存的快照；模型載入後淡出
+        self.snapshot: Optional[QImage] = None
+        self._snapshot_fade_start: Optional[float] = None
+        self._deferred_init = False
+        self.hibernated = False
+        self._waking = False
+        self._files_warmed.connect(self._on_files_warmed)
+
+        # 低耗電待機：閒置一段時間後改播預渲染的待機循環，不再每幀運算 / 繪製模型
+        self.low_power_idle = os.getenv("LOW_POWER_IDLE", "0") == "1"
+        self._idle_playback_timer = scheduler.timer(self._enter_idle_playback, slack=0.1, owner=self)
+        self._idle_playback_timer.setInterval(int(float(os.getenv("LOW_POWER_IDLE_DELAY_SEC", "20")) * 1000))
+        self._idle_cache = IdleFrameCache() if self.low_power_idle else None
+        self._idle_loop: Optional[IdleLoop] = None
+        self._idle_loop_key: Optional[str] = None
+        self._idle_playback_start: Optional[float] = None
+        self._live_required = False
+        # 每幀成本量測（FRAME_STATS=1 或由 benchmark 設定）
+        self.frame_meter: Optional[FrameCostMeter] = (
+            FrameCostMeter() if os.getenv("FRAME_STATS", "0") == "1" else None
+        )
+        # 視線追蹤：頭 / 眼跟隨游標（GAZE_TRACKING=0 停用）；只在既有的繪製中寫入參數
+        self.gaze: Optional[GazeTracker] = GazeTracker.from_env(self)
+        # 動作佇列：依優先度排程、合併重複點擊；每幀繪製時播放下一個
+        self.motion_queue = MotionQueue(self._start_request)
+        # 閒置行為：隨機動作 / 表情（IDLE_BEHAVIORS=1 啟用）
+        self.idle_behaviors: Optional[IdleBehaviors] = IdleBehaviors.from_env(self)
         
     def initializeGL(self):
         """初始化 OpenGL"""
         if not LIVE2D_AVAILABLE:
             return
-        
+
+        if self.snapshot is not None:
+            # 有啟動快照：先讓第一幀顯示快照，Live2D 初始化與模型載入延到第一次繪製之後
+            self._deferred_init = True
+            return
+        self._initialize_live2d()
+
+    def _initialize_live2d(self):
+        """初始化 Live2D 並載入待載入的模型"""
         try:
-            # 初始化 Live2D
-            live2d.init()
+            self.makeCurrent()
+
+            # 初始化 Live2D（多個角色視窗共用一份 Core，以引用計數管理）
+            if not self._runtime_acquired:
+                live2d_runtime.acquire(live2d)
+                self._runtime_acquired = True
             
-            # 對於 v3，需要初始化 OpenGL
-            if hasattr(live2d, 'glInit'):
-                live2d.glInit()
+            # 對於 v3，需要初始化 OpenGL（context 互相共享，整個行程只需一次）
+            live2d_runtime.ensure_gl(live2d)
             
             self._initialized = True
             print("Live2D 初始化成功")
@@ -79,21 +165,46 @@ class Live2DWidget(QOpenGLWidget):
     
     def resizeGL(self, w: int, h: int):
         """處理視窗大小變化"""
+        # 預渲染影格與尺寸綁定：尺寸改變時回到即時繪製
+        self.poke()
         if self.model and w > 0 and h > 0:
             self.model.Resize(w, h)
             self._update_scale_by_widget()
     
     def paintGL(self):
         """繪製 Live2D 角色"""
+        meter = self.frame_meter
+        if meter is None:
+            self._paint_frame()
+            return
+        meter.begin("playback" if self.idle_playback_active else "live")
+        self._paint_frame()
+        meter.end()
+
+    def _paint_frame(self):
+        if self.idle_playback_active:
+            self._paint_idle_frame()
+            self._paint_overlay()
+            return
+
         if not LIVE2D_AVAILABLE or not self.model or not self._initialized:
+            self._paint_snapshot()
+            self._paint_overlay()
+            if self._deferred_init:
+                self._deferred_init = False
+                QTimer.singleShot(0, self._initialize_live2d)
             return
         
         try:
             # 清除背景（透明）
             live2d.clearBuffer(0.0, 0.0, 0.0, 0.0)
             
-            # 更新模型（動畫、物理等）
-            self.model.Update()
+            # 以固定步長推進模擬（動畫、物理等），並插值出本次繪製的姿勢
+            if self.motion_queue.pending:
+                self.motion_queue.pump()
+            params_reset = self._advance_simulation()
+            if params_reset and self.gaze:
+                self.gaze.apply(self.model)
             
             # 設置偏移和縮放
             if self.offset_x != 0.0 or self.offset_y != 0.0:
@@ -104,9 +215,90 @@ class Live2DWidget(QOpenGLWidget):
             # 繪製模型
             self.model.Draw()
         except Exception as e:
-            print(f"渲染錯誤: {e}")
-            import traceback
-            traceback.print_exc()
+            # 每幀都可能失敗：交給背景日誌執行緒（同一錯誤限速），不在 GUI 執行緒印 traceback
+            _log.error("渲染錯誤: %s", e, exc_info=True)
+
+        startup_timer.mark("first_pixel")
+        if startup_timer.mark("model_ready"):
+            print(f"啟動時間：{startup_timer.summary()}")
+        self._paint_snapshot_fade()
+        self._paint_overlay()
+
+    def _advance_simulation(self) -> bool:
+        """
+        依模擬時鐘執行 0~N 個固定步長，繪製前在最後兩個狀態間插值（只用於 live2d.Model）。
+
+        Returns:
+            本幀參數是否已重新寫入（有模擬步或插值）；否則模型仍保留上一幀的參數
+        """
+        if not self._fixed_step_model:
+            # 舊版 API：Update() 以自身時鐘計算 dt 且無法插值，不使用固定步長；
+            # 每幀都呼叫，否則沒有模擬步的幀會重畫上一步的參數而抖動
+            self.model.Update()
+            return True
+
+        # 動作佇列沒有播放中 / 排隊的動作（只剩自動循環的待機動作）時視為閒置，降低模擬頻率
+        # （呼吸 / 眨眼仍由插值維持平滑）；待機動作會自行循環，IsMotionFinished() 無法判斷
+        queue = self.motion_queue
+        self.sim_clock.set_idle(not self._live_required and not queue.pending and not queue.busy())
+
+        steps = self.sim_clock.advance()
+        dt = self.sim_clock.step_dt
+        for _ in range(steps):
+            self.model.Update(dt)
+            self._prev_params = self._curr_params
+            self._curr_params = self._read_params()
+
+        # 插值：參數寫入只影響本次繪製，下一步 Update() 會先還原已儲存的參數
+        alpha = self.sim_clock.alpha
+        if self._prev_params is not None and self._curr_params is not None and alpha > 0.0:
+            values = lerp_values(self._prev_params, self._curr_params, alpha)
+            for i, v in enumerate(values):
+                self.model.SetParameterValue(i, v)
+            return True
+        return steps > 0
+
+    def _read_params(self) -> list:
+        get = self.model.GetParameterValue
+        return [get(i) for i in range(self._param_count)]
+
+    def _paint_snapshot(self):
+        """模型未載入（啟動 / 休眠 / 喚醒中）時顯示靜態畫面"""
+        if self.snapshot is None:
+            return
+        painter = QPainter(self)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+        painter.drawImage(self.rect(), self.snapshot)
+        painter.end()
+        startup_timer.mark("first_pixel")
+
+    def _begin_snapshot_fade(self):
+        """模型已載入：靜態畫面在 SNAPSHOT_FADE_MS 內淡出到即時模型"""
+        if self.snapshot is not None:
+            self._snapshot_fade_start = time.monotonic()
+
+    def _paint_snapshot_fade(self):
+        """在模型之上疊加逐漸透明的靜態畫面（交叉淡化）"""
+        if self.snapshot is None or self._snapshot_fade_start is None:
+            return
+        t = (time.monotonic() - self._snapshot_fade_start) * 1000.0 / self.SNAPSHOT_FADE_MS
+        if t >= 1.0:
+            self.snapshot = None
+            self._snapshot_fade_start = None
+            return
+        painter = QPainter(self)
+        painter.setOpacity(1.0 - t)
+        painter.drawImage(self.rect(), self.snapshot)
+        painter.end()
+
+    def _paint_overlay(self):
+        """在模型之上繪製疊加層（QPainter 於 QOpenGLWidget 上使用 GL 引擎，與模型同一個畫面）"""
+        if self.overlay is None or not self.overlay.isVisible():
+            return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        self.overlay.paint(painter)
+        painter.end()
     
     def load_model(self, model_path: Path):
         """
@@ -120,6 +312,8 @@ class Live2DWidget(QOpenGLWidget):
             return
         
         self.model_path = Path(model_path)
+        # 休眠中切換角色：直接載入新模型即視為喚醒
+        self.hibernated = False
         
         if not self.model_path.exists():
             print(f"錯誤: 模型文件不存在: {self.model_path}")
@@ -140,13 +334,27 @@ class Live2DWidget(QOpenGLWidget):
             self.makeCurrent()
             
             # 創建模型實例
-            self.model = live2d.LAppModel()
-            
-            # 載入模型文件
+            # 新版 live2d-py 提供可指定 dt 的 live2d.Model，用於固定步長模擬；否則使用 LAppModel
             model_path_str = str(self.model_path)
-            if live2d.LIVE2D_VERSION == 3:
+            mask_buffers = self._plan_mask_buffers()
+            self._fixed_step_model = hasattr(live2d, "Model")
+            if self._fixed_step_model:
+                self.model = live2d.Model()
+                self.model.LoadModelJson(model_path_str)
+                self.model.CreateRenderer(mask_buffers)
+                self._param_count = len(self.model.GetParameterIds())
+            else:
+                self.model = live2d.LAppModel()
+            self._prev_params = None
+            self._curr_params = None
+            self.sim_clock.reset()
+
+            # 載入模型文件
+            if self._fixed_step_model:
+                pass
+            elif live2d.LIVE2D_VERSION == 3:
                 # v3 版本需要指定 maskBufferCount（可選）
-                self.model.LoadModelJson(model_path_str, maskBufferCount=100)
+                self.model.LoadModelJson(model_path_str, maskBufferCount=mask_buffers)
             else:
                 # v2 版本
                 self.model.LoadModelJson(model_path_str)
@@ -177,6 +385,21 @@ class Live2DWidget(QOpenGLWidget):
                     pass  # 沒有動畫也沒關係
             
             print(f"成功載入 Live2D 模型: {self.model_path}")
+            try:
+                self.motion_queue.set_motions(CharacterLoader(self.model_path).get_motion_meta())
+            except (OSError, ValueError) as e:
+                print(f"讀取動作資訊失敗: {e}")
+                self.motion_queue.set_motions({})
+            if self.gaze:
+                self.gaze.bind(self.model, self._fixed_step_model)
+                self.gaze.start()
+            if self.idle_behaviors:
+                self.idle_behaviors.start()
+            live2d_runtime.set_model(self, model_path_str)
+            self._begin_snapshot_fade()
+            self._idle_loop = None
+            self._idle_loop_key = None
+            self.poke()
             self.model_loaded.emit(True)
             
         except Exception as e:
@@ -185,6 +408,26 @@ class Live2DWidget(QOpenGLWidget):
             traceback.print_exc()
             self.model_loaded.emit(False)
     
+    def _plan_mask_buffers(self) -> int:
+        """
+        依模型實際使用的剪裁遮罩數決定 mask buffer 數量（MASK_BUFFER_AUTO=0 時沿用固定的 100 個）。
+        """
+        self.mask_plan = None
+        if os.getenv("MASK_BUFFER_AUTO", "1") == "0":
+            return LEGACY_MASK_BUFFER_COUNT
+        try:
+            self.mask_plan = CharacterLoader(self.model_path).get_mask_buffer_plan()
+        except (OSError, ValueError) as e:
+            print(f"讀取遮罩資訊失敗: {e}")
+        if self.mask_plan is None:
+            return LEGACY_MASK_BUFFER_COUNT
+        plan = self.mask_plan
+        print(
+            f"遮罩緩衝: {plan.contexts} 個剪裁區域 → {plan.count} × {plan.size}px"
+            f"（{plan.memory_bytes / 2**20:.2f} MB）"
+        )
+        return plan.count
+
     def start_idle_motion(self):
         """開始播放待機動畫"""
         if self.model:
@@ -209,15 +452,18 @@ class Live2DWidget(QOpenGLWidget):
         # 留一點邊距，避免裁切
         self.scale = max(0.1, self._base_scale * k * 0.98)
 
-    def play_motion(self, motion_name: str, group: str = "") -> bool:
+    def play_motion(
+        self,
+        motion_name: str,
+        group: str = "",
+        priority: MotionPriority = MotionPriority.TAP,
+        key: Optional[str] = None,
+    ) -> bool:
         """
         播放指定動作（目前使用 model3.json 的空名稱 motion group）。
 
         motion_name: "mtn_02" / "mtn_03" / "mtn_04" / "special_01" ...
         """
-        if not LIVE2D_AVAILABLE or not self.model:
-            return False
-
         motion_index_map = {
             "mtn_02": 0,
             "mtn_03": 1,
@@ -226,56 +472,89 @@ class Live2DWidget(QOpenGLWidget):
             "special_02": 4,
             "special_03": 5,
         }
-        idx = motion_index_map.get(motion_name, 0)
+        return self.play_motion_group(group, motion_index_map.get(motion_name, 0), priority, key)
 
-        # live2d-py 的 StartMotion 第三參數通常是 MotionPriority enum
-        priority = getattr(live2d, "MotionPriority", None)
-        force = getattr(priority, "FORCE", None) if priority else None
-        normal = getattr(priority, "NORMAL", None) if priority else None
+    def play_motion_group(
+        self,
+        group: str,
+        index: Optional[int] = 0,
+        priority: MotionPriority = MotionPriority.TAP,
+        key: Optional[str] = None,
+    ) -> bool:
+        """
+        以 motion group + index 送出動作請求（經由動作佇列）。
+        例如：group="Tap", index=0 / group="Tap@Body", index=0；index=None 表示群組內隨機。
+
+        Returns:
+            動作已播放、排隊或合併進同一區域的請求時為 True；被丟棄或播放失敗時為 False
+        """
+        return self.request_motion(group, index, priority, key) not in ("dropped", "failed")
 
-        return self._start_motion_with_index(group, idx)
+    def request_motion(
+        self,
+        group: str,
+        index: Optional[int] = None,
+        priority: MotionPriority = MotionPriority.TAP,
+        key: Optional[str] = None,
+    ) -> str:
+        """送出動作請求，回傳 MotionQueue.submit() 的結果"""
+        if not LIVE2D_AVAILABLE or not self.model:
+            return "failed"
+        if priority > MotionPriority.IDLE:
+            self.poke()
+        return self.motion_queue.submit(group, index, priority, key)
 
-    def _start_motion_with_index(self, group: str, idx: int) -> bool:
+    def _start_request(self, request: MotionRequest) -> bool:
         """
-        以指定的 group + index 播放動作。
-        用於不同角色共用的內部邏輯，會自動處理優先權與 fallback。
+        動作佇列的播放函式。
+        是否打斷目前動作已由佇列決定；閒置動作使用 NORMAL（只蓋過待機循環），
+        點擊與 LLM 動作使用 FORCE。
         """
         if not LIVE2D_AVAILABLE or not self.model:
             return False
-
-        priority = getattr(live2d, "MotionPriority", None)
-        force = getattr(priority, "FORCE", None) if priority else None
-        normal = getattr(priority, "NORMAL", None) if priority else None
-
+        levels = getattr(live2d, "MotionPriority", None)
+        name = "NORMAL" if request.priority == MotionPriority.IDLE else "FORCE"
+        priority = getattr(levels, name, None) if levels else None
+        if priority is None:
+            # 後備：某些版本只接受 int
+            priority = 2 if name == "NORMAL" else 3
         try:
-            if force is not None:
-                self.model.StartMotion(group, idx, force)
-            elif normal is not None:
-                self.model.StartMotion(group, idx, normal)
+            if request.index is None:
+                self.model.StartRandomMotion(request.group, priority)
             else:
-                # 後備：某些版本可能接受 int
-                self.model.StartMotion(group, idx, 3)
-            return True
-        except Exception:
-            # 後備：嘗試隨機動作（不同版本參數型態不同）
-            try:
-                if force is not None:
-                    self.model.StartRandomMotion(group, force)
-                else:
-                    self.model.StartRandomMotion(group, 3)
-                return True
-            except Exception:
-                return False
+                self.model.StartMotion(request.group, request.index, priority)
+        except Exception as e:
+            print(f"播放動作失敗 ({request.group}[{request.index}]): {e}")
+            return False
+        return True
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # 隱藏時視線取樣會自行停止，重新顯示時恢復
+        if self.gaze and self.model is not None:
+            self.gaze.start()
+
+    def wheelEvent(self, event):
+        """滑鼠滾輪在疊加層上時捲動泡泡內容"""
+        if self.overlay is not None and self.overlay.contains(event.position()):
+            self.overlay.scroll_by(event.angleDelta().y() / 120.0 * 40.0)
+            event.accept()
+            return
+        super().wheelEvent(event)
 
-    def play_motion_group(self, group: str, index: int = 0) -> bool:
-        """
-        直接以 motion group + index 播放動作。
-        例如：group="Tap", index=0 / group="Tap@Body", index=0。
-        """
-        return self._start_motion_with_index(group, index)
-    
     def mousePressEvent(self, event):
         """處理滑鼠點擊事件，檢測點擊的部位"""
+        self.poke()
+        # 點擊疊加層泡泡：關閉泡泡，不觸發部位互動
+        if (
+            self.overlay is not None
+            and event.button() == Qt.MouseButton.LeftButton
+            and self.overlay.contains(event.position())
+        ):
+            self.overlay.fade_out()
+            event.accept()
+            return
+
         if not LIVE2D_AVAILABLE or not self.model:
             super().mousePressEvent(event)
             return
@@ -297,7 +576,8 @@ class Live2DWidget(QOpenGLWidget):
                         if pid and pid != "PartCore":
                             hit_part_id = pid
                             break
-                    print(f"點擊部位: {hit_part_id}")
+                    if self._log_clicks:
+                        _log.debug("點擊部位: %s", hit_part_id, extra={"part": hit_part_id, "x": x, "y": y})
                     
                     # 發送信號
                     self.part_clicked.emit(hit_part_id)
@@ -307,22 +587,264 @@ class Live2DWidget(QOpenGLWidget):
                     pass
                     
             except Exception as e:
-                print(f"點擊檢測失敗: {e}")
+                _log.warning("點擊檢測失敗: %s", e)
         
         super().mousePressEvent(event)
     
+    def current_frame(self) -> Optional[QImage]:
+        """目前畫面（模型已載入時重新渲染一幀，否則回傳靜態畫面）"""
+        if self.model is not None and self._initialized:
+            self._snapshot_fade_start = None
+            self.snapshot = None
+            return self.grabFramebuffer()
+        return self.snapshot
+
+    # ---- 低耗電待機 ----
+
+    @property
+    def idle_playback_active(self) -> bool:
+        return self._idle_playback_start is not None and self._idle_loop is not None
+
+    @property
+    def live_required(self) -> bool:
+        return self._live_required
+
+    def set_live_required(self, required: bool):
+        """串流回覆等需要即時表情的期間，強制使用即時繪製"""
+        self._live_required = required
+        self.poke()
+
+    def poke(self):
+        """有互動：離開預渲染播放，並重新計算閒置時間"""
+        self._exit_idle_playback()
+        if self.low_power_idle and not self._live_required and self.model is not None:
+            self._idle_playback_timer.start()
+        else:
+            self._idle_playback_timer.stop()
+
+    def _enter_idle_playback(self):
+        if (
+            not self.low_power_idle
+            or self._live_required
+            or self.model is None
+            or self.idle_playback_active
+            or self.motion_queue.pending
+            or self.motion_queue.busy()
+        ):
+            return
+        if self.overlay is not None and self.overlay.isVisible():
+            # 疊加層泡泡顯示中仍有動畫，稍後再試
+            self._idle_playback_timer.start()
+            return
+
+        loop = self._prepare_idle_loop()
+        if loop is None:
+            return
+        self._idle_playback_start = time.monotonic()
+        self.animation_timer.start(max(1, int(1000.0 / loop.fps)))
+        self.update()
+
+    def _exit_idle_playback(self):
+        if self._idle_playback_start is None:
+            return
+        self._idle_playback_start = None
+        # 播放期間模型沒有前進：重設時鐘，避免一次補上整段閒置時間
+        self.sim_clock.reset()
+        if self.model is not None:
+            self.animation_timer.start(16)
+        self.update()
+
+    def _paint_idle_frame(self):
+        loop = self._idle_loop
+        index = int((time.monotonic() - self._idle_playback_start) * loop.fps)
+        painter = QPainter(self)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Source)
+        painter.drawImage(self.rect(), loop.frame(index))
+        painter.end()
+
+    def _prepare_idle_loop(self) -> Optional[IdleLoop]:
+        """取得目前尺寸的待機循環：先查快取，沒有時離屏錄製一次並寫入快取"""
+        dpr = self.devicePixelRatioF()
+        width, height = int(self.width() * dpr), int(self.height() * dpr)
+        group, index = self.IDLE_LOOP_MOTION
+        key = IdleFrameCache.make_key(self.model_path, width, height, self.scale, f"{group}/{index}")
+        if key == self._idle_loop_key and self._idle_loop is not None:
+            return self._idle_loop
+
+        # 同一模型、同一尺寸的其他角色視窗已錄好時直接共用
+        loop = live2d_runtime.shared(key, lambda: self._idle_cache.load(key))
+        if loop is None:
+            started = time.perf_counter()
+            loop = self._record_idle_loop(width, height, dpr)
+            if loop is None:
+                return None
+            print(
+                f"已預渲染待機循環: {len(loop)} 格，{loop.compressed_bytes / 2**20:.1f} MB，"
+                f"{(time.perf_counter() - started) * 1000:.0f} ms"
+            )
+            self._idle_cache.save(key, loop)
+            live2d_runtime.put_shared(key, loop)
+        self._idle_loop = loop
+        self._idle_loop_key = key
+        return loop
+
+    def _idle_motion_duration(self) -> float:
+        group, index = self.IDLE_LOOP_MOTION
+        try:
+            metas = CharacterLoader(self.model_path).get_motion_meta().get(group, [])
+            return float(metas[index].get("Duration", 0.0))
+        except (IndexError, TypeError, ValueError):
+            return 0.0
+
+    def _record_idle_loop(self, width: int, height: int, dpr: float) -> Optional[IdleLoop]:
+        """
+        以固定 dt 將一個完整的待機動作繪製到離屏 framebuffer。
+        需要可指定步長的 live2d.Model；舊版 LAppModel 以實際時間推進，無法離屏錄製。
+        """
+        if not self._fixed_step_model:
+            print("低耗電待機需要新版 live2d-py（live2d.Model），維持即時繪製")
+            self.low_power_idle = False
+            return None
+        duration = self._idle_motion_duration()
+        if duration <= 0.0:
+            print("找不到待機動作長度，維持即時繪製")
+            self.low_power_idle = False
+            return None
+
+        from PyQt6.QtOpenGL import QOpenGLFramebufferObject, QOpenGLFramebufferObjectFormat
+
+        fps = self.IDLE_LOOP_FPS
+        frame_count = max(1, round(duration * fps))
+        group, index = self.IDLE_LOOP_MOTION
+        images = []
+        self.makeCurrent()
+        try:
+            fbo_format = QOpenGLFramebufferObjectFormat()
+            fbo_format.setAttachment(QOpenGLFramebufferObject.Attachment.CombinedDepthStencil)
+            # 與 widget 的 framebuffer 同尺寸，沿用目前的 viewport 與投影
+            fbo = QOpenGLFramebufferObject(width, height, fbo_format)
+            # 錄製不經由佇列：直接以 FORCE 從頭播放待機動作
+            self._start_request(MotionRequest(group, index, MotionPriority.TAP))
+            dt = 1.0 / fps
+            for _ in range(frame_count):
+                self.model.Update(dt)
+                fbo.bind()
+                live2d.clearBuffer(0.0, 0.0, 0.0, 0.0)
+                if self.offset_x != 0.0 or self.offset_y != 0.0:
+                    self.model.SetOffset(self.offset_x, self.offset_y)
+                if self.scale != 1.0:
+                    self.model.SetScale(self.scale)
+                self.model.Draw()
+                fbo.release()
+                image = fbo.toImage()
+                image.setDevicePixelRatio(dpr)
+                images.append(image)
+        except Exception as e:
+            print(f"預渲染待機循環失敗: {e}")
+            images = []
+        finally:
+            self.doneCurrent()
+        self._prev_params = None
+        self._curr_params = None
+        if not images:
+            return None
+        return IdleLoop.from_images(images, fps)
+
+    # ---- 休眠 ----
+
+    def memory_stats(self):
+        """目前的 RSS 與顯示卡可用記憶體（KB；驅動不支援時為 None）"""
+        vram = None
+        if self._initialized:
+            self.makeCurrent()
+            vram = gpu_free_memory_kb()
+            self.doneCurrent()
+        return {"rss": process_rss_bytes(), "vram_free_kb": vram}
+
+    def hibernate(self) -> bool:
+        """
+        釋放模型與 GPU 貼圖，保留最後一幀作為靜態畫面。
+
+        Returns:
+            是否實際進入休眠（沒有模型或已在休眠時回傳 False）
+        """
+        if not LIVE2D_AVAILABLE or self.model is None or self.hibernated:
+            return False
+
+        self.snapshot = self.grabFramebuffer()
+        self._snapshot_fade_start = None
+        self._idle_playback_start = None
+        self._idle_playback_timer.stop()
+        self.animation_timer.stop()
+        self._release_model()
+        gc.collect()
+
+        self.hibernated = True
+        self.update()
+        return True
+
+    def _release_model(self):
+        """在 context 為 current 時釋放模型，讓貼圖 / 緩衝區隨之刪除"""
+        self.makeCurrent()
+        try:
+            if self._fixed_step_model:
+                self.model.DestroyRenderer()
+        except Exception as e:
+            print(f"釋放模型貼圖失敗: {e}")
+        if self.gaze:
+            self.gaze.unbind()
+        if self.idle_behaviors:
+            self.idle_behaviors.stop()
+        self.motion_queue.clear()
+        self.model = None
+        self._prev_params = None
+        self._curr_params = None
+        self.doneCurrent()
+        live2d_runtime.set_model(self, None)
+
+    def wake(self):
+        """
+        從休眠恢復：先在背景執行緒預讀素材檔案（暖機作業系統快取），
+        完成後於 GUI 執行緒重新載入模型；期間持續顯示靜態畫面。
+        """
+        if not self.hibernated or self._waking or not self.model_path:
+            return
+        self._waking = True
+        threading.Thread(target=self._warm_files, name="Live2DWarmup", daemon=True).start()
+
+    def _warm_files(self):
+        try:
+            runtime = self.model_path.parent
+            for name in collect_runtime_files(self.model_path, warn=False):
+                with open(runtime / name, "rb") as f:
+                    while f.read(1 << 20):
+                        pass
+        except OSError as e:
+            print(f"預讀角色素材失敗: {e}")
+        self._files_warmed.emit()
+
+    def _on_files_warmed(self):
+        self._waking = False
+        if not self.hibernated:
+            return  # 期間已因切換角色而重新載入
+        self.hibernated = False
+        self._load_model_internal()
+
     def cleanup(self):
         """清理資源"""
         # 停止計時器
+        self._idle_playback_timer.stop()
+        if self.gaze:
+            self.gaze.stop()
         if self.animation_timer.isActive():
             self.animation_timer.stop()
         
-        # 清理模型
-        self.model = None
+        # 清理模型（其他角色視窗仍在使用 Core，只釋放本視窗的貼圖）
+        if self.model is not None:
+            self._release_model()
+        self._idle_loop = None
         
-        # 清理 Live2D
-        if LIVE2D_AVAILABLE and self._initialized:
-            try:
-                live2d.dispose()
-            except Exception as e:
-                print(f"清理 Live2D 失敗: {e}")
+        # 釋放 Live2D 引用（最後一個視窗釋放時才 dispose）
+        if self._runtime_acquired:
+            self._runtime_acquired = False
+            live2d_runtime.release()
@@ -4,9 +4,13 @@ LLM 客戶端模組 - 整合 Gemini API 進行對話處理
 from __future__ import annotations
 
 import os
-from typing import Optional, Iterable
+from typing import Callable, Optional, Iterable, Iterator
 from dotenv import load_dotenv
 
+from src.app_log import get_logger
+from src.chat_telemetry import ErrorChunk, ToolStatusChunk
+from src.tool_calling import ToolCall, ToolExecutor, ToolRegistry, plain_args
+
 try:
     import google.generativeai as genai
     GEMINI_AVAILABLE = True
@@ -15,16 +19,28 @@ except ImportError:
     print("警告: google-generativeai 未安裝")
     print("請執行: pip install google-generativeai")
 
+_log = get_logger("llm")
+
 
 class LLMClient:
     """Gemini API 客戶端"""
+
+    # 單則訊息中最多幾輪工具呼叫（避免模型反覆呼叫工具）
+    MAX_TOOL_ROUNDS = 4
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        memory=None,
+        tools: Optional[ToolRegistry] = None,
+    ):
         """
         初始化 LLM 客戶端
         
         Args:
             api_key: Gemini API Key，如果為 None 則從環境變數讀取
+            memory: 長期記憶（ConversationMemory）；None 時依 LONG_TERM_MEMORY 決定是否啟用
+            tools: 本機工具登錄表；提供時一般對話改用 function calling
         """
         if not GEMINI_AVAILABLE:
             raise ImportError("google-generativeai 未安裝")
@@ -52,53 +68,166 @@ class LLMClient:
         
         # 對話歷史
         self.chat_history = []
+
+        # 本機工具：另建一個帶 tools 宣告的模型，預取等內部請求仍使用一般模型
+        self.tool_model = None
+        self.tool_executor: Optional[ToolExecutor] = None
+        if tools is not None and len(tools):
+            self.set_tools(tools)
+
+        # 長期記憶：完成的問答寫入向量索引，送出訊息前檢索相關內容加入提示詞
+        if memory is None:
+            try:
+                from src.memory_index import ConversationMemory
+
+                memory = ConversationMemory.from_env()
+            except ImportError as e:
+                print(f"長期記憶無法啟用: {e}")
+        self.memory = memory
     
-    def send_message(self, message: str) -> str:
+    def send_message(self, message: str, record_history: bool = True) -> str:
         """
         發送訊息並獲取回應
         
         Args:
             message: 使用者輸入的訊息
+            record_history: 是否寫入對話歷史（背景預取等內部請求應設為 False）
             
         Returns:
             LLM 的回應文字
         """
         # 非串流模式：在內部透過 stream_message 聚合所有片段
         chunks = []
-        for delta in self.stream_message(message):
+        for delta in self.stream_message(message, record_history=record_history):
             chunks.append(delta)
         return "".join(chunks)
     
+    def set_tools(self, tools: ToolRegistry):
+        """啟用本機工具呼叫（TOOL_MAX_WORKERS 設定並行執行的工具數，預設 4）"""
+        try:
+            self.tool_model = genai.GenerativeModel(
+                'gemini-2.5-flash-lite',
+                generation_config={
+                    "max_output_tokens": 2048,
+                },
+                tools=tools.declarations(),
+            )
+        except TypeError as e:
+            # 舊版 google-generativeai 不支援 tools 參數
+            print(f"此版本的 google-generativeai 不支援工具呼叫: {e}")
+            return
+        if self.tool_executor:
+            self.tool_executor.shutdown()
+        self.tool_executor = ToolExecutor(tools, max_workers=int(os.getenv("TOOL_MAX_WORKERS", "4")))
+
     def clear_history(self):
         """清除對話歷史"""
         self.chat_history = []
 
-    def stream_message(self, message: str) -> Iterable[str]:
+    def stream_message(
+        self,
+        message: str,
+        on_request: Optional[Callable[[], None]] = None,
+        record_history: bool = True,
+        raise_errors: bool = False,
+    ) -> Iterable[str]:
         """
         以串流方式發送訊息並逐步取得回應片段。
         呼叫端可以一邊迭代、一邊更新 UI。
+
+        Args:
+            message: 使用者輸入的訊息
+            on_request: 實際送出 API 請求前呼叫（供遙測記錄 request_sent）
+            record_history: 是否將本次問答寫入對話歷史
+            raise_errors: 為 True 時直接拋出 API 例外，而非以錯誤片段（ErrorChunk）回傳
         """
         if not GEMINI_AVAILABLE:
             error_msg = "錯誤: Gemini API 未正確配置"
-            print(error_msg)
-            yield error_msg
+            if raise_errors:
+                raise RuntimeError(error_msg)
+            _log.warning(error_msg)
+            yield ErrorChunk(error_msg)
             return
 
         full_text = ""
         try:
-            response = self.model.generate_content(message, stream=True)
-            for chunk in response:
-                text = getattr(chunk, "text", None)
-                if not text:
-                    continue
-                full_text += text
+            # 只有一般對話（寫入歷史者）使用長期記憶；預取等內部請求維持原提示詞
+            prompt = message
+            if self.memory is not None and record_history:
+                prompt = self.memory.augment_prompt(message)
+            if on_request:
+                on_request()
+            if self.tool_model is not None and record_history:
+                stream = self._stream_with_tools(prompt)
+            else:
+                stream = self._stream_text(prompt)
+            for text in stream:
+                # 工具狀態行只供顯示，不寫入歷史與記憶
+                if not isinstance(text, ToolStatusChunk):
+                    full_text += text
                 yield text
         except Exception as e:
+            if raise_errors:
+                raise
             error_msg = f"API 請求失敗: {str(e)}"
-            print(error_msg)
-            # 對呼叫端輸出錯誤片段，方便 UI 顯示
-            yield error_msg
+            # 串流執行緒中發生：交給背景日誌執行緒，同一錯誤限速
+            _log.error("API 請求失敗: %s", e, exc_info=True, extra={"record_history": record_history})
+            # 對呼叫端輸出錯誤片段（標記為 ErrorChunk），方便 UI 顯示
+            yield ErrorChunk(error_msg)
         finally:
-            if full_text:
+            if full_text and record_history:
                 self.chat_history.append({"role": "user", "content": message})
                 self.chat_history.append({"role": "assistant", "content": full_text})
+                if self.memory is not None:
+                    self.memory.add_turn(message, full_text)
+
+    def _stream_text(self, prompt) -> Iterator[str]:
+        response = self.model.generate_content(prompt, stream=True)
+        for chunk in response:
+            text = getattr(chunk, "text", None)
+            if text:
+                yield text
+
+    def _stream_with_tools(self, prompt: str) -> Iterator[str]:
+        """
+        帶工具的串流：模型要求呼叫工具時，於執行緒池並行執行同一輪的所有呼叫，
+        每完成一個就輸出一行狀態（ToolStatusChunk），再把結果送回模型繼續生成。
+        """
+        contents = [{"role": "user", "parts": [{"text": prompt}]}]
+        for _ in range(self.MAX_TOOL_ROUNDS):
+            response = self.tool_model.generate_content(contents, stream=True)
+            calls = []
+            round_text = ""
+            for chunk in response:
+                # 含 function_call 的片段讀取 chunk.text 會拋例外，因此逐一檢查 parts
+                parts = chunk.candidates[0].content.parts if chunk.candidates else []
+                for part in parts:
+                    if part.function_call and part.function_call.name:
+                        calls.append(part.function_call)
+                    elif part.text:
+                        round_text += part.text
+                        yield part.text
+            if not calls:
+                return
+
+            model_parts = [{"text": round_text}] if round_text else []
+            model_parts.extend({"function_call": fc} for fc in calls)
+            contents.append({"role": "model", "parts": model_parts})
+
+            tool_calls = [ToolCall(fc.name, plain_args(fc.args)) for fc in calls]
+            results = {}
+            # 狀態行與模型先前輸出的文字分段顯示
+            prefix = "\n\n" if round_text and not round_text.endswith("\n") else ""
+            for result in self.tool_executor.run_iter(tool_calls):
+                results[id(result.call)] = result
+                status = "完成" if result.error is None else f"失敗：{result.error}"
+                yield ToolStatusChunk(f"{prefix}🔧 {result.call.name} {status}（{result.elapsed_ms:.0f} ms）\n\n")
+                prefix = ""
+            contents.append({
+                "role": "user",
+                "parts": [
+                    {"function_response": {"name": c.name, "response": results[id(c)].response()}}
+                    for c in tool_calls
+                ],
+            })
+        yield ToolStatusChunk("（已達工具呼叫次數上限）")
@@ -0,0 +1,215 @@
+"""
+低耗電待機模組 - 預先渲染一個循環的待機動作，閒置時以影格序列播放取代即時 Live2D 運算
+影格以 zlib 壓縮的 ARGB32 儲存在快取目錄，依角色、尺寸與縮放區分。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PyQt6.QtGui import QImage
+
+from src.app_paths import cache_subdir
+
+_MAGIC = b"L2DIDLE1"
+_HEADER_LEN = struct.Struct("<I")
+_FORMAT = QImage.Format.Format_ARGB32_Premultiplied
+
+
+class IdleLoop:
+    """一個循環的壓縮影格；frame() 只解壓目前需要的那一格"""
+
+    def __init__(self, width: int, height: int, fps: float, frames: List[bytes], dpr: float = 1.0):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.dpr = dpr
+        self._frames = frames
+        self._decoded_index = -1
+        self._decoded_buffer: Optional[bytes] = None
+        self._decoded_image: Optional[QImage] = None
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def compressed_bytes(self) -> int:
+        return sum(len(f) for f in self._frames)
+
+    @classmethod
+    def from_images(cls, images: List[QImage], fps: float, level: int = 6) -> "IdleLoop":
+        """壓縮錄製好的影格"""
+        first = images[0]
+        frames = []
+        for image in images:
+            image = image.convertToFormat(_FORMAT)
+            bits = image.constBits()
+            bits.setsize(image.sizeInBytes())
+            frames.append(zlib.compress(bytes(bits), level))
+        return cls(first.width(), first.height(), fps, frames, first.devicePixelRatio())
+
+    def frame(self, index: int) -> QImage:
+        """取得第 index 格（循環）；QImage 直接引用解壓後的緩衝區，不再複製"""
+        index %= len(self._frames)
+        if index != self._decoded_index:
+            self._decoded_buffer = zlib.decompress(self._frames[index])
+            image = QImage(self._decoded_buffer, self.width, self.height, self.width * 4, _FORMAT)
+            image.setDevicePixelRatio(self.dpr)
+            self._decoded_image = image
+            self._decoded_index = index
+        return self._decoded_image
+
+    def save(self, path: Path):
+        header = json.dumps({
+            "width": self.width,
+            "height": self.height,
+            "fps": self.fps,
+            "dpr": self.dpr,
+            "frames": [len(f) for f in self._frames],
+        }).encode("utf-8")
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC)
+            f.write(_HEADER_LEN.pack(len(header)))
+            f.write(header)
+            for frame in self._frames:
+                f.write(frame)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["IdleLoop"]:
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        if not data.startswith(_MAGIC):
+            return None
+        try:
+            (header_len,) = _HEADER_LEN.unpack_from(data, len(_MAGIC))
+            offset = len(_MAGIC) + _HEADER_LEN.size
+            header = json.loads(data[offset:offset + header_len])
+            offset += header_len
+            frames = []
+            for length in header["frames"]:
+                frames.append(data[offset:offset + length])
+                offset += length
+            return cls(header["width"], header["height"], header["fps"], frames, header.get("dpr", 1.0))
+        except (ValueError, KeyError, struct.error):
+            return None
+
+
+class IdleFrameCache:
+    """依 (模型, 像素尺寸, 縮放, 動作) 存放預渲染的待機循環"""
+
+    def __init__(self, directory: Optional[Path] = None):
+        self.directory = Path(directory) if directory else cache_subdir("idle_frames")
+
+    @staticmethod
+    def make_key(model_path: Path, width: int, height: int, scale: float, motion: str) -> str:
+        """快取鍵；模型檔修改後自動失效"""
+        model_path = Path(model_path)
+        try:
+            mtime = model_path.stat().st_mtime_ns
+        except OSError:
+            mtime = 0
+        raw = f"{model_path.resolve()}|{mtime}|{width}x{height}|{scale:.4f}|{motion}"
+        return f"{model_path.stem.split('.')[0]}-{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]}"
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.idle"
+
+    def load(self, key: str) -> Optional[IdleLoop]:
+        return IdleLoop.load(self._path(key))
+
+    def save(self, key: str, loop: IdleLoop):
+        try:
+            loop.save(self._path(key))
+        except OSError as e:
+            print(f"保存待機影格快取失敗: {e}")
+
+
+class FrameCostMeter:
+    """
+    每幀成本量測（GUI 執行緒 CPU 時間；有 PyOpenGL 時加上 GPU 時間）。
+    GPU 時間以 GL_TIME_ELAPSED 查詢取得，讀取前一幀的結果，不會阻塞管線。
+    """
+
+    _GL_TIME_ELAPSED = 0x88BF
+
+    def __init__(self):
+        self._stats: Dict[str, List[float]] = {}
+        self._cpu_start = 0.0
+        self._mode = "live"
+        self._queries: Optional[Tuple[int, int]] = None
+        self._query_index = 0
+        self._query_pending: List[Optional[str]] = [None, None]
+        self._gl = None
+
+    def begin(self, mode: str):
+        self._mode = mode
+        self._cpu_start = time.thread_time()
+        gl = self._gl_api()
+        if gl is not None:
+            try:
+                gl.glBeginQuery(self._GL_TIME_ELAPSED, self._queries[self._query_index])
+            except Exception:
+                self._gl = False
+
+    def end(self):
+        cpu_ms = (time.thread_time() - self._cpu_start) * 1000.0
+        stats = self._stats.setdefault(self._mode, [0, 0.0, 0.0, 0])  # 幀數, CPU ms, GPU ms, GPU 樣本數
+        stats[0] += 1
+        stats[1] += cpu_ms
+        gl = self._gl_api()
+        if gl is None:
+            return
+        try:
+            gl.glEndQuery(self._GL_TIME_ELAPSED)
+            self._query_pending[self._query_index] = self._mode
+            # 讀取另一個查詢（前一幀）的結果
+            self._query_index ^= 1
+            other_mode = self._query_pending[self._query_index]
+            if other_mode is not None:
+                query = self._queries[self._query_index]
+                if gl.glGetQueryObjectiv(query, gl.GL_QUERY_RESULT_AVAILABLE):
+                    ns = gl.glGetQueryObjectuiv(query, gl.GL_QUERY_RESULT)
+                    other = self._stats.setdefault(other_mode, [0, 0.0, 0.0, 0])
+                    other[2] += ns / 1e6
+                    other[3] += 1
+                self._query_pending[self._query_index] = None
+        except Exception:
+            # 驅動不支援計時查詢：只保留 CPU 量測
+            self._gl = False
+
+    def _gl_api(self):
+        if self._gl is False:
+            return None
+        if self._gl is None:
+            try:
+                from OpenGL import GL
+
+                self._queries = tuple(int(q) for q in GL.glGenQueries(2))
+                self._gl = GL
+            except Exception:
+                self._gl = False
+                return None
+        return self._gl
+
+    def reset(self):
+        self._stats.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """各模式的平均每幀 CPU / GPU 毫秒"""
+        result = {}
+        for mode, (frames, cpu, gpu, gpu_samples) in self._stats.items():
+            result[mode] = {
+                "frames": frames,
+                "cpu_ms": cpu / frames if frames else 0.0,
+                "gpu_ms": gpu / gpu_samples if gpu_samples else None,
+            }
+        return result
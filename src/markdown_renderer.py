@@ -0,0 +1,396 @@
+"""
+增量 Markdown 渲染模組 - 將串流中的 Markdown 回覆逐步轉為 HTML
+只重新解析「最後一個尚未結束的區塊」，已完成區塊的 HTML（含語法高亮）會快取且不再重算。
+"""
+from __future__ import annotations
+
+import html
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Pattern, Tuple
+
+
+CODE_BG = "#f4f4f4"
+CODE_FONT = "Consolas, 'Courier New', monospace"
+
+# ---- 語法高亮 ----
+
+_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "python": (
+        "False", "None", "True", "and", "as", "assert", "async", "await", "break",
+        "class", "continue", "def", "del", "elif", "else", "except", "finally", "for",
+        "from", "global", "if", "import", "in", "is", "lambda", "nonlocal", "not",
+        "or", "pass", "raise", "return", "try", "while", "with", "yield", "self",
+    ),
+    "js": (
+        "async", "await", "break", "case", "catch", "class", "const", "continue",
+        "default", "delete", "else", "export", "extends", "false", "finally", "for",
+        "function", "if", "import", "in", "instanceof", "interface", "let", "new",
+        "null", "return", "switch", "this", "throw", "true", "try", "type", "typeof",
+        "undefined", "var", "void", "while", "yield",
+    ),
+    "c": (
+        "auto", "bool", "break", "case", "char", "class", "const", "continue",
+        "default", "do", "double", "else", "enum", "false", "float", "for", "if",
+        "int", "long", "namespace", "new", "nullptr", "public", "private", "return",
+        "short", "sizeof", "static", "struct", "switch", "template", "true", "typedef",
+        "unsigned", "using", "void", "while", "fn", "let", "mut", "impl", "pub", "use",
+        "func", "package", "var", "string",
+    ),
+    "shell": (
+        "if", "then", "else", "fi", "for", "do", "done", "while", "case", "esac",
+        "function", "in", "echo", "export", "cd", "set", "pip", "python", "git",
+    ),
+    "json": ("true", "false", "null"),
+}
+
+_LANG_ALIASES = {
+    "py": "python", "python3": "python",
+    "javascript": "js", "typescript": "js", "ts": "js", "jsx": "js", "tsx": "js",
+    "cpp": "c", "c++": "c", "java": "c", "cs": "c", "csharp": "c", "go": "c",
+    "rust": "c", "rs": "c", "kotlin": "c", "swift": "c",
+    "bash": "shell", "sh": "shell", "zsh": "shell", "powershell": "shell",
+    "ps1": "shell", "bat": "shell", "cmd": "shell", "console": "shell",
+}
+
+_COLORS = {
+    "keyword": "#0033b3",
+    "string": "#067d17",
+    "comment": "#8c8c8c",
+    "number": "#1750eb",
+}
+
+
+class CodeHighlighter:
+    """
+    以正規表示式進行的逐行語法高亮（不依賴 Pygments）。
+    每種語言只編譯一次 pattern；高亮結果以行為單位，供程式碼區塊逐行快取。
+    """
+
+    _patterns: Dict[str, Pattern] = {}
+
+    @classmethod
+    def normalize_lang(cls, lang: str) -> str:
+        lang = (lang or "").strip().lower()
+        return _LANG_ALIASES.get(lang, lang)
+
+    @classmethod
+    def _pattern(cls, lang: str) -> Optional[Pattern]:
+        if lang in cls._patterns:
+            return cls._patterns[lang]
+        keywords = _KEYWORDS.get(lang)
+        if keywords is None:
+            cls._patterns[lang] = None
+            return None
+        comment = r"#.*$" if lang in ("python", "shell") else r"//.*$"
+        if lang == "json":
+            comment = r"(?!x)x"  # JSON 沒有註解
+        pattern = re.compile(
+            rf"(?P<comment>{comment})"
+            r"|(?P<string>\"(?:[^\"\\]|\\.)*\"?|'(?:[^'\\]|\\.)*'?|`[^`]*`?)"
+            r"|(?P<number>\b\d+(?:\.\d+)?\b)"
+            rf"|(?P<keyword>\b(?:{'|'.join(map(re.escape, keywords))})\b)"
+        )
+        cls._patterns[lang] = pattern
+        return pattern
+
+    @classmethod
+    def highlight_line(cls, line: str, lang: str) -> str:
+        """高亮單行程式碼，回傳 HTML（已跳脫）"""
+        pattern = cls._pattern(lang)
+        if pattern is None:
+            return html.escape(line)
+        out: List[str] = []
+        pos = 0
+        for m in pattern.finditer(line):
+            out.append(html.escape(line[pos:m.start()]))
+            color = _COLORS[m.lastgroup]
+            out.append(f'<span style="color:{color};">{html.escape(m.group())}</span>')
+            pos = m.end()
+        out.append(html.escape(line[pos:]))
+        return "".join(out)
+
+
+# ---- 行內格式 ----
+
+_INLINE_CODE = re.compile(r"`([^`]+)`")
+_BOLD = re.compile(r"\*\*(.+?)\*\*|__(.+?)__")
+_ITALIC = re.compile(r"(?<![\*\w])\*(?!\s)(.+?)(?<!\s)\*(?!\*)")
+_LINK = re.compile(r"\[([^\]]+)\]\((https?://[^)\s]+)\)")
+
+
+def render_inline(text: str) -> str:
+    """行內 Markdown（`code`、**粗體**、*斜體*、[連結](url)）轉 HTML"""
+    parts: List[str] = []
+    pos = 0
+    # 先切出行內程式碼，避免其中的符號被當成格式
+    for m in _INLINE_CODE.finditer(text):
+        parts.append(_render_emphasis(text[pos:m.start()]))
+        parts.append(
+            f'<code style="font-family:{CODE_FONT}; background-color:{CODE_BG};">'
+            f"{html.escape(m.group(1))}</code>"
+        )
+        pos = m.end()
+    parts.append(_render_emphasis(text[pos:]))
+    return "".join(parts)
+
+
+def _render_link(m: "re.Match") -> str:
+    # 文字已經過 html.escape(quote=False)：網址先還原再連同引號一起跳脫，避免 " 跳出 href 屬性
+    url = html.escape(html.unescape(m.group(2)), quote=True)
+    return f'<a href="{url}">{m.group(1)}</a>'
+
+
+def _render_emphasis(text: str) -> str:
+    text = html.escape(text, quote=False)
+    text = _LINK.sub(_render_link, text)
+    text = _BOLD.sub(lambda m: f"<b>{m.group(1) or m.group(2)}</b>", text)
+    text = _ITALIC.sub(r"<i>\1</i>", text)
+    return text
+
+
+# ---- 區塊 ----
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+_FENCE = re.compile(r"^\s*(```|~~~)\s*([\w+#.-]*)")
+_HR = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_ULIST = re.compile(r"^(\s*)[-*+]\s+(.*)$")
+_OLIST = re.compile(r"^(\s*)\d+[.)]\s+(.*)$")
+_QUOTE = re.compile(r"^\s*>\s?(.*)$")
+
+_HEADING_SIZES = {1: "15pt", 2: "13pt", 3: "12pt", 4: "11pt", 5: "10pt", 6: "10pt"}
+
+
+@dataclass
+class MarkdownBlock:
+    """一個 Markdown 區塊（段落、標題、清單、程式碼…）"""
+
+    kind: str                    # paragraph / heading / ulist / olist / quote / code / hr
+    lines: List[str] = field(default_factory=list)
+    level: int = 0               # 標題層級
+    lang: str = ""               # 程式碼語言
+    fence: str = ""              # 程式碼圍欄字元（``` 或 ~~~）
+    closed: bool = False
+    html: Optional[str] = None   # 區塊結束後的 HTML 快取
+    highlighted: List[str] = field(default_factory=list)  # 程式碼區塊已高亮的完整行
+
+
+class IncrementalMarkdownRenderer:
+    """
+    串流 Markdown 渲染器。
+
+    以行為單位的狀態機處理輸入：完整的行只處理一次；尚未換行的最後一段文字
+    只在渲染「目前開啟的區塊」時暫時併入。區塊結束時產生並快取 HTML，之後不再重算；
+    程式碼區塊則逐行快取高亮結果，所以即使在長程式碼中串流，也只會高亮最後一行。
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """清除所有狀態（開始新的回覆）"""
+        self.blocks: List[MarkdownBlock] = []  # 已結束的區塊
+        self.open_block: Optional[MarkdownBlock] = None
+        self.pending = ""                      # 尚未換行的文字
+        self.text = ""
+        self._emitted = 0                      # 已交給呼叫端的已結束區塊數
+
+    # ---- 輸入 ----
+
+    def feed(self, delta: str):
+        """加入一段串流文字"""
+        if not delta:
+            return
+        self.text += delta
+        data = self.pending + delta
+        *lines, self.pending = data.split("\n")
+        for line in lines:
+            self._process_line(line)
+
+    def finish(self):
+        """回覆結束：處理最後一行並關閉所有區塊"""
+        if self.pending:
+            line, self.pending = self.pending, ""
+            self._process_line(line)
+        self._close_open_block()
+
+    # ---- 輸出 ----
+
+    def take_closed_html(self) -> List[str]:
+        """取出自上次呼叫後新結束區塊的 HTML（每個區塊一段）"""
+        new = self.blocks[self._emitted:]
+        self._emitted = len(self.blocks)
+        return [b.html for b in new]
+
+    def open_html(self) -> str:
+        """目前開啟中區塊（含尚未換行文字）的 HTML；每次串流更新都會重新產生"""
+        block = self.open_block
+        pending = self.pending
+        if block is None:
+            preview = self._start_block_for(pending) if pending.strip() else None
+            return self._render(preview) if preview else ""
+        if block.kind == "code":
+            return self._render_code(block, pending)
+        if pending:
+            preview = MarkdownBlock(kind=block.kind, lines=block.lines.copy(), level=block.level)
+            if not self._append_to(preview, pending):
+                return self._render(block) + self._render_line_preview(pending)
+            return self._render(preview)
+        return self._render(block)
+
+    def render_all(self) -> str:
+        """渲染完整文件（非串流用途）"""
+        html_parts = [b.html for b in self.blocks]
+        tail = self.open_html()
+        if tail:
+            html_parts.append(tail)
+        return "".join(html_parts)
+
+    # ---- 狀態機 ----
+
+    def _process_line(self, line: str):
+        block = self.open_block
+        if block is not None and block.kind == "code":
+            stripped = line.strip()
+            if stripped.startswith(block.fence) and stripped.strip(block.fence[0]) == "":
+                self._close_open_block()
+            else:
+                block.lines.append(line)
+                block.highlighted.append(CodeHighlighter.highlight_line(line, block.lang))
+            return
+
+        if not line.strip():
+            self._close_open_block()
+            return
+
+        if block is not None and self._append_to(block, line):
+            return
+
+        self._close_open_block()
+        new_block = self._start_block_for(line)
+        if new_block is None:
+            return
+        if new_block.kind in ("heading", "hr"):
+            self.open_block = new_block
+            self._close_open_block()
+        else:
+            self.open_block = new_block
+
+    def _start_block_for(self, line: str) -> Optional[MarkdownBlock]:
+        m = _FENCE.match(line)
+        if m:
+            return MarkdownBlock(
+                kind="code",
+                fence=m.group(1),
+                lang=CodeHighlighter.normalize_lang(m.group(2)),
+            )
+        m = _HEADING.match(line)
+        if m:
+            return MarkdownBlock(kind="heading", lines=[m.group(2)], level=len(m.group(1)))
+        if _HR.match(line):
+            return MarkdownBlock(kind="hr")
+        m = _ULIST.match(line)
+        if m:
+            return MarkdownBlock(kind="ulist", lines=[m.group(2)])
+        m = _OLIST.match(line)
+        if m:
+            return MarkdownBlock(kind="olist", lines=[m.group(2)])
+        m = _QUOTE.match(line)
+        if m:
+            return MarkdownBlock(kind="quote", lines=[m.group(1)])
+        if not line.strip():
+            return None
+        return MarkdownBlock(kind="paragraph", lines=[line.strip()])
+
+    def _append_to(self, block: MarkdownBlock, line: str) -> bool:
+        """嘗試把一行併入開啟中的區塊；不屬於該區塊時回傳 False"""
+        if _FENCE.match(line) or _HEADING.match(line) or _HR.match(line):
+            return False
+        if block.kind == "ulist":
+            m = _ULIST.match(line)
+            if m:
+                block.lines.append(m.group(2))
+                return True
+            if line.startswith((" ", "\t")) and block.lines:
+                block.lines[-1] += " " + line.strip()
+                return True
+            return False
+        if block.kind == "olist":
+            m = _OLIST.match(line)
+            if m:
+                block.lines.append(m.group(2))
+                return True
+            if line.startswith((" ", "\t")) and block.lines:
+                block.lines[-1] += " " + line.strip()
+                return True
+            return False
+        if block.kind == "quote":
+            m = _QUOTE.match(line)
+            if m:
+                block.lines.append(m.group(1))
+                return True
+            return False
+        if block.kind == "paragraph":
+            if _ULIST.match(line) or _OLIST.match(line) or _QUOTE.match(line):
+                return False
+            block.lines.append(line.strip())
+            return True
+        return False
+
+    def _close_open_block(self):
+        block = self.open_block
+        if block is None:
+            return
+        block.closed = True
+        block.html = self._render(block)
+        block.highlighted = []  # 已有完整 HTML 快取，不再需要逐行結果
+        self.blocks.append(block)
+        self.open_block = None
+
+    # ---- 區塊渲染 ----
+
+    def _render(self, block: MarkdownBlock) -> str:
+        if block.kind == "code":
+            return self._render_code(block, None)
+        if block.kind == "heading":
+            size = _HEADING_SIZES.get(block.level, "10pt")
+            return (
+                f'<p style="margin-top:6px; margin-bottom:4px; font-size:{size};">'
+                f"<b>{render_inline(block.lines[0])}</b></p>"
+            )
+        if block.kind == "hr":
+            return "<hr/>"
+        if block.kind in ("ulist", "olist"):
+            tag = "ul" if block.kind == "ulist" else "ol"
+            items = "".join(f"<li>{render_inline(item)}</li>" for item in block.lines)
+            return f'<{tag} style="margin-top:2px; margin-bottom:4px;">{items}</{tag}>'
+        if block.kind == "quote":
+            body = "<br/>".join(render_inline(line) for line in block.lines)
+            return f'<p style="margin-left:12px; color:#555555;"><i>{body}</i></p>'
+        body = "<br/>".join(render_inline(line) for line in block.lines)
+        return f'<p style="margin-top:2px; margin-bottom:4px;">{body}</p>'
+
+    def _render_code(self, block: MarkdownBlock, pending: Optional[str]) -> str:
+        # 開啟中的程式碼區塊已逐行快取高亮結果，只需高亮尚未換行的最後一行
+        lines = list(block.highlighted)
+        if pending:
+            lines.append(CodeHighlighter.highlight_line(pending, block.lang))
+        body = "\n".join(lines)
+        return (
+            f'<table width="100%" cellpadding="6" style="background-color:{CODE_BG}; '
+            f'margin-top:2px; margin-bottom:4px;"><tr><td>'
+            f'<pre style="font-family:{CODE_FONT}; font-size:9pt; white-space:pre-wrap; margin:0;">'
+            f"{body}</pre></td></tr></table>"
+        )
+
+    def _render_line_preview(self, line: str) -> str:
+        block = self._start_block_for(line)
+        return self._render(block) if block else ""
+
+
+def render_markdown(text: str) -> str:
+    """一次性將完整 Markdown 文字轉為 HTML"""
+    renderer = IncrementalMarkdownRenderer()
+    renderer.feed(text)
+    renderer.finish()
+    return renderer.render_all()
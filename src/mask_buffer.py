@@ -0,0 +1,206 @@
+"""
+遮罩緩衝規劃模組 - 依模型實際使用的剪裁遮罩數決定 mask buffer 數量與解析度
+直接讀取 .moc3 的 ArtMesh 遮罩表，不需建立 GL context；結果快取於角色索引（封裝檔或快取目錄）。
+
+查看各角色的遮罩使用量與記憶體：
+    python -m src.mask_buffer
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import struct
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.app_paths import cache_subdir
+
+# .moc3 結構：64 位元組檔頭，之後是 section 位移表（u32）；第 0 項指向數量表
+_MOC_MAGIC = b"MOC3"
+_SECTION_TABLE_OFFSET = 64
+_COUNT_ART_MESHES = 4
+_COUNT_DRAWABLE_MASKS = 17
+_SECTION_MASK_BEGINS = 47  # ArtMesh.drawableMaskSourcesBeginIndices
+_SECTION_MASK_COUNTS = 48  # ArtMesh.drawableMaskSourcesCounts
+_SECTION_DRAWABLE_MASKS = 80  # DrawableMasks.artMeshSourcesIndices
+
+# Cubism 渲染器：單一緩衝最多 36 個剪裁區域，多個緩衝時每個最多 32 個；每個緩衝 RGBA 四個通道，
+# 每個通道最多切成 3 × 3 區
+_CONTEXTS_SINGLE_BUFFER = 36
+_CONTEXTS_PER_BUFFER = 32
+_CHANNELS = 4
+
+# 舊版固定設定（maskBufferCount=100、Cubism 預設 256px）
+LEGACY_MASK_BUFFER_COUNT = 100
+DEFAULT_MASK_BUFFER_SIZE = 256
+MAX_MASK_BUFFER_SIZE = 2048
+
+
+@dataclass(frozen=True)
+class MocMaskInfo:
+    """模型的遮罩使用量"""
+
+    art_meshes: int
+    mask_refs: int  # 所有 ArtMesh 的遮罩參照總數
+    clip_contexts: int  # 不重複的遮罩組合數（渲染器實際需要的剪裁區域數）
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "MocMaskInfo":
+        return cls(int(data["art_meshes"]), int(data["mask_refs"]), int(data["clip_contexts"]))
+
+
+@dataclass(frozen=True)
+class MaskBufferPlan:
+    """遮罩緩衝配置：count 傳給 CreateRenderer / maskBufferCount，size 為每個緩衝的邊長"""
+
+    count: int
+    size: int
+    contexts: int
+
+    @property
+    def memory_bytes(self) -> int:
+        """遮罩緩衝佔用的顯示卡記憶體（RGBA8；沒有遮罩時渲染器不建立緩衝）"""
+        if self.contexts == 0:
+            return 0
+        return self.count * self.size * self.size * 4
+
+    def to_dict(self) -> Dict:
+        return {**asdict(self), "memory_bytes": self.memory_bytes}
+
+
+def parse_moc_masks(data: bytes) -> Optional[MocMaskInfo]:
+    """
+    從 .moc3 內容讀出遮罩使用量。
+    格式不符（檔頭錯誤、數量表與 section 不一致）時回傳 None，呼叫端改用舊版固定設定。
+    """
+    if len(data) < 1024 or data[:4] != _MOC_MAGIC or data[5] != 0:  # 只支援 little-endian
+        return None
+    try:
+        sections = struct.unpack_from("<160I", data, _SECTION_TABLE_OFFSET)
+        counts = struct.unpack_from("<18I", data, sections[0])
+        art_meshes = counts[_COUNT_ART_MESHES]
+        mask_refs = counts[_COUNT_DRAWABLE_MASKS]
+        begins = struct.unpack_from(f"<{art_meshes}i", data, sections[_SECTION_MASK_BEGINS])
+        lengths = struct.unpack_from(f"<{art_meshes}i", data, sections[_SECTION_MASK_COUNTS])
+        masks = struct.unpack_from(f"<{mask_refs}i", data, sections[_SECTION_DRAWABLE_MASKS])
+    except struct.error:
+        return None
+    if sum(lengths) != mask_refs or any(not 0 <= m < art_meshes for m in masks):
+        return None
+
+    contexts = set()
+    for begin, length in zip(begins, lengths):
+        if length > 0:
+            contexts.add(frozenset(masks[begin:begin + length]))
+    return MocMaskInfo(art_meshes, mask_refs, len(contexts))
+
+
+def plan_mask_buffers(info: MocMaskInfo, region_px: int = 128) -> MaskBufferPlan:
+    """
+    依剪裁區域數決定最少的緩衝數與解析度。
+    region_px 為每個剪裁區域至少要有的邊長；區域越多、切得越細，緩衝邊長就越大。
+    """
+    contexts = info.clip_contexts
+    if contexts == 0:
+        return MaskBufferPlan(1, DEFAULT_MASK_BUFFER_SIZE, 0)
+    count = 1 if contexts <= _CONTEXTS_SINGLE_BUFFER else math.ceil(contexts / _CONTEXTS_PER_BUFFER)
+    per_channel = math.ceil(math.ceil(contexts / count) / _CHANNELS)
+    division = 1 if per_channel <= 1 else 2 if per_channel <= 4 else 3
+    size = DEFAULT_MASK_BUFFER_SIZE
+    while size < region_px * division and size < MAX_MASK_BUFFER_SIZE:
+        size *= 2
+    return MaskBufferPlan(count, size, contexts)
+
+
+def legacy_plan(info: MocMaskInfo) -> MaskBufferPlan:
+    """舊版固定配置（maskBufferCount=100），用於比較"""
+    return MaskBufferPlan(LEGACY_MASK_BUFFER_COUNT, DEFAULT_MASK_BUFFER_SIZE, info.clip_contexts)
+
+
+class MaskInfoIndex:
+    """
+    沒有封裝檔時的遮罩資訊快取（快取目錄的 mask_buffers/index.json）。
+    以 .moc3 路徑為鍵，記錄檔案大小與修改時間，檔案變更後自動重新讀取。
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self._path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict]] = None
+
+    @property
+    def path(self) -> Path:
+        if self._path is None:
+            self._path = cache_subdir("mask_buffers") / "index.json"
+        return self._path
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            try:
+                self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, moc_path: Path) -> Optional[MocMaskInfo]:
+        moc_path = Path(moc_path).resolve()
+        try:
+            st = os.stat(moc_path)
+        except OSError:
+            return None
+        signature = [st.st_size, st.st_mtime_ns]
+        key = str(moc_path)
+        with self._lock:
+            entry = self._load().get(key)
+            if entry and entry.get("source") == signature:
+                return MocMaskInfo.from_dict(entry["masks"])
+
+        info = parse_moc_masks(moc_path.read_bytes())
+        if info is None:
+            return None
+        with self._lock:
+            entries = self._load()
+            entries[key] = {"source": signature, "masks": info.to_dict()}
+            try:
+                tmp = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(entries, ensure_ascii=False, indent=1), encoding="utf-8")
+                os.replace(tmp, self.path)
+            except OSError as e:
+                print(f"寫入遮罩資訊快取失敗: {e}")
+        return info
+
+
+mask_info_index = MaskInfoIndex()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="各角色的遮罩緩衝配置與顯示卡記憶體")
+    parser.add_argument("--region", type=int, default=128, help="每個剪裁區域至少的邊長（px）")
+    args = parser.parse_args()
+
+    from src.character_library import get_available_characters
+    from src.character_loader import CharacterLoader
+
+    print(f"{'character':<16} {'meshes':>6} {'masks':>6} {'clips':>6} {'buffers':>8} {'size':>5} {'MB':>7} {'legacy_MB':>10}")
+    for character in get_available_characters():
+        info = CharacterLoader(character.model_path).get_mask_info()
+        if info is None:
+            print(f"{character.id:<16} 無法讀取 .moc3")
+            continue
+        plan = plan_mask_buffers(info, args.region)
+        legacy = legacy_plan(info)
+        print(
+            f"{character.id:<16} {info.art_meshes:>6} {info.mask_refs:>6} {info.clip_contexts:>6} "
+            f"{plan.count:>8} {plan.size:>5} {plan.memory_bytes / 2**20:>7.2f} {legacy.memory_bytes / 2**20:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
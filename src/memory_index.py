@@ -0,0 +1,340 @@
+"""
+長期記憶模組 - 將完成的問答嵌入成向量，對話時檢索相關的過去內容加入提示詞
+嵌入使用純 CPU 的字元 n-gram 特徵雜湊（不需模型檔、適用中文），
+向量以 NumPy float32 矩陣保存，已寫入磁碟的部分以 memmap 開啟，檢索為批次 cosine（內積）。
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import queue
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.app_paths import data_subdir
+
+_VECTORS_FILE = "vectors.f32"
+_TURNS_FILE = "turns.jsonl"
+
+
+class HashingEmbedder:
+    """
+    字元 n-gram 特徵雜湊嵌入。
+
+    每段文字取 1~2 字元的 n-gram（中文約等於字與詞），以 crc32 雜湊到 dim 維（正負號由另一個位元決定，
+    減少碰撞偏差），權重為 1 + log(tf)，最後做 L2 正規化，內積即為 cosine 相似度。
+    """
+
+    def __init__(self, dim: int = 256, ngrams: Sequence[int] = (1, 2), max_chars: int = 2000):
+        self.dim = dim
+        self.ngrams = tuple(ngrams)
+        self.max_chars = max_chars
+
+    def _features(self, text: str) -> dict:
+        text = "".join(text.lower().split())[: self.max_chars]
+        counts: dict = {}
+        for n in self.ngrams:
+            for i in range(len(text) - n + 1):
+                gram = text[i:i + n]
+                counts[gram] = counts.get(gram, 0) + 1
+        return counts
+
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        """回傳 (len(texts), dim) 的 float32 矩陣，每列已正規化（空字串為零向量）"""
+        texts = list(texts)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            vec = out[row]
+            for gram, tf in self._features(text).items():
+                h = zlib.crc32(gram.encode("utf-8"))
+                sign = 1.0 if h & 0x80000000 else -1.0
+                vec[h % self.dim] += sign * (1.0 + math.log(tf))
+            norm = float(np.linalg.norm(vec))
+            if norm > 0.0:
+                vec /= norm
+        return out
+
+
+class VectorIndex:
+    """
+    只增不減的向量索引。
+
+    - 啟動時已寫入磁碟的向量以 np.memmap 唯讀開啟（不整份讀入記憶體）
+    - 之後新增的向量放在記憶體中的尾段（容量倍增），同時附加寫入檔案
+    - search() 以矩陣乘法一次計算多個查詢，argpartition 取 top-k
+    """
+
+    def __init__(self, dim: int, path: Optional[Path] = None):
+        self.dim = dim
+        self.path = Path(path) if path else None
+        self._base = np.zeros((0, dim), dtype=np.float32)
+        self._tail = np.zeros((64, dim), dtype=np.float32)
+        self._tail_len = 0
+        if self.path is not None and self.path.exists():
+            rows = self.path.stat().st_size // (4 * dim)
+            if rows:
+                self._base = np.memmap(self.path, dtype=np.float32, mode="r", shape=(rows, dim))
+
+    def __len__(self) -> int:
+        return len(self._base) + self._tail_len
+
+    def add(self, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        needed = self._tail_len + len(vectors)
+        if needed > len(self._tail):
+            grown = np.zeros((max(needed, len(self._tail) * 2), self.dim), dtype=np.float32)
+            grown[: self._tail_len] = self._tail[: self._tail_len]
+            self._tail = grown
+        self._tail[self._tail_len:needed] = vectors
+        self._tail_len = needed
+        if self.path is not None:
+            with open(self.path, "ab") as f:
+                f.write(vectors.tobytes())
+
+    def search(self, queries: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+        """
+        Args:
+            queries: (q, dim) 已正規化的查詢向量
+            k: 每個查詢回傳的筆數
+
+        Returns:
+            每個查詢的 [(索引, 分數), ...]，分數由高到低
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        total = len(self)
+        if total == 0 or k <= 0:
+            return [[] for _ in range(len(queries))]
+        parts = []
+        if len(self._base):
+            parts.append(queries @ self._base.T)
+        if self._tail_len:
+            parts.append(queries @ self._tail[: self._tail_len].T)
+        scores = parts[0] if len(parts) == 1 else np.concatenate(parts, axis=1)
+
+        k = min(k, total)
+        if k < total:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(total), (len(queries), total))
+        results = []
+        for row, idx in enumerate(top):
+            row_scores = scores[row, idx]
+            order = np.argsort(-row_scores)
+            results.append([(int(idx[i]), float(row_scores[i])) for i in order])
+        return results
+
+
+@dataclass
+class MemoryHit:
+    """一筆檢索到的過去問答"""
+
+    user: str
+    assistant: str
+    score: float
+    timestamp: float
+
+
+class ConversationMemory:
+    """
+    對話長期記憶。
+
+    add_turn() 只把問答放入佇列，由背景執行緒批次嵌入並寫入索引，
+    不會阻塞串流執行緒；recall() / augment_prompt() 在送出請求前檢索。
+    """
+
+    # 寫入提示詞時每則記憶的最大字元數
+    SNIPPET_CHARS = 160
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        embedder: Optional[HashingEmbedder] = None,
+        top_k: int = 3,
+        min_score: float = 0.2,
+        persist: bool = True,
+    ):
+        """
+        Args:
+            directory: 保存位置（預設為使用者資料目錄下的 memory/）
+            embedder: 嵌入函式（預設 HashingEmbedder）
+            top_k: 每次加入提示詞的記憶數
+            min_score: 低於此相似度的記憶不使用
+            persist: False 時只保存在記憶體（benchmark 用）
+        """
+        self.embedder = embedder or HashingEmbedder()
+        self.top_k = top_k
+        self.min_score = min_score
+        self.directory = (Path(directory) if directory else data_subdir("memory")) if persist else None
+
+        self._turns: List[dict] = []
+        vectors_path = None
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            vectors_path = self.directory / _VECTORS_FILE
+            self._turns, rebuild = self._load_turns(self.directory / _TURNS_FILE)
+            self._repair(vectors_path, rebuild)
+        self.index = VectorIndex(self.embedder.dim, vectors_path)
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[Tuple[str, str, float]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="MemoryIngest", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls) -> Optional["ConversationMemory"]:
+        """LONG_TERM_MEMORY=1 時啟用；LONG_TERM_MEMORY_TOP_K 設定每次加入的記憶數"""
+        if os.getenv("LONG_TERM_MEMORY", "0") != "1":
+            return None
+        return cls(top_k=int(os.getenv("LONG_TERM_MEMORY_TOP_K", "3")))
+
+    @staticmethod
+    def _load_turns(path: Path) -> Tuple[List[dict], bool]:
+        """
+        讀取問答紀錄；寫入中斷留下的不完整行會從檔案中移除，之後的附加寫入才不會接在壞行後面。
+
+        Returns:
+            (問答列表, 是否需要重建全部向量)。只有最後一行不完整時，多出的向量由 _repair 截斷即可；
+            壞行出現在中間時無法確定向量與問答的對應，需全部重新嵌入。
+        """
+        turns: List[dict] = []
+        lines: List[bytes] = []
+        bad: List[int] = []
+        try:
+            with open(path, "rb") as f:
+                for number, line in enumerate(f):
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("不完整的行")
+                        record = json.loads(line)
+                    except ValueError:
+                        bad.append(number)
+                        continue
+                    turns.append(record)
+                    lines.append(line)
+        except OSError:
+            return turns, False
+        if not bad:
+            return turns, False
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.writelines(lines)
+        os.replace(tmp, path)
+        print(f"長期記憶：移除 {len(bad)} 行不完整的紀錄")
+        tail_only = bad == [len(turns)]
+        return turns, not tail_only
+
+    def _repair(self, vectors_path: Path, rebuild: bool = False):
+        """
+        上次寫入中斷時兩個檔案筆數可能不同：多出的向量截斷，
+        缺少向量的問答重新嵌入補上，確保索引與問答一一對應。
+        rebuild=True 時捨棄全部向量重新嵌入。
+        """
+        row_bytes = 4 * self.embedder.dim
+        size = vectors_path.stat().st_size if vectors_path.exists() else 0
+        rows = 0 if rebuild else size // row_bytes
+        if rebuild or rows > len(self._turns) or size != rows * row_bytes:
+            rows = min(rows, len(self._turns))
+            if vectors_path.exists():
+                os.truncate(vectors_path, rows * row_bytes)
+        if rows < len(self._turns):
+            missing = self._turns[rows:]
+            vectors = self.embedder.embed(f"{t['user']}\n{t['assistant']}" for t in missing)
+            with open(vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            print(f"長期記憶：補上 {len(missing)} 筆缺少的向量")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._turns)
+
+    # ---- 寫入 ----
+
+    def add_turn(self, user: str, assistant: str):
+        """加入一輪完成的問答（非同步）"""
+        if user.strip() and assistant.strip():
+            self._queue.put((user, assistant, time.time()))
+
+    def add_turns_sync(self, turns: Sequence[Tuple[str, str]]):
+        """直接批次寫入（benchmark / 匯入用）"""
+        now = time.time()
+        self._ingest([(u, a, now) for u, a in turns])
+
+    def flush(self):
+        """等待佇列中的問答寫入完成"""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=2.0)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # 一次取出佇列中所有項目，批次嵌入
+            while len(batch) < 64:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            turns = [b for b in batch if b is not None]
+            try:
+                if turns:
+                    self._ingest(turns)
+            except Exception as e:
+                print(f"寫入長期記憶失敗: {e}")
+            for _ in batch:
+                self._queue.task_done()
+            if len(turns) != len(batch):
+                return
+
+    def _ingest(self, turns: List[Tuple[str, str, float]]):
+        vectors = self.embedder.embed(f"{u}\n{a}" for u, a, _ in turns)
+        records = [{"t": t, "user": u, "assistant": a} for u, a, t in turns]
+        with self._lock:
+            self.index.add(vectors)
+            self._turns.extend(records)
+            if self.directory is not None:
+                with open(self.directory / _TURNS_FILE, "a", encoding="utf-8") as f:
+                    for record in records:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    # ---- 檢索 ----
+
+    def recall_many(self, queries: Sequence[str], k: Optional[int] = None) -> List[List[MemoryHit]]:
+        """批次檢索；每個查詢回傳相似度不低於 min_score 的前 k 筆"""
+        k = self.top_k if k is None else k
+        vectors = self.embedder.embed(queries)
+        with self._lock:
+            results = self.index.search(vectors, k)
+            hits = []
+            for matches in results:
+                row = []
+                for idx, score in matches:
+                    if score < self.min_score:
+                        continue
+                    turn = self._turns[idx]
+                    row.append(MemoryHit(turn["user"], turn["assistant"], score, turn.get("t", 0.0)))
+                hits.append(row)
+        return hits
+
+    def recall(self, query: str, k: Optional[int] = None) -> List[MemoryHit]:
+        return self.recall_many([query], k)[0]
+
+    def augment_prompt(self, message: str) -> str:
+        """在訊息前加入相關的過去問答；沒有相關記憶時原樣回傳"""
+        hits = self.recall(message)
+        if not hits:
+            return message
+        n = self.SNIPPET_CHARS
+        lines = [f"- 使用者：{h.user[:n]}／你：{h.assistant[:n]}" for h in hits]
+        return (
+            "以下是與使用者過去對話中可能相關的片段（僅供參考，不需要逐一提及）：\n"
+            + "\n".join(lines)
+            + f"\n\n使用者目前的訊息：\n{message}"
+        )
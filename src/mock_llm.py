@@ -0,0 +1,104 @@
+"""
+模擬 LLM 客戶端模組 - 不連網、可重現的 LLMClient 替身
+用於無頭模式、壓力測試與回放，介面與 LLMClient 相同。
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+from typing import Callable, Iterable, List, Optional
+
+from src.chat_telemetry import ErrorChunk
+
+
+class MockLLMClient:
+    """
+    模擬 Gemini 串流回應。
+
+    回覆內容由訊息內容決定（相同輸入產生相同輸出），並以設定的首字延遲與
+    片段間隔模擬網路與生成速度。
+    """
+
+    def __init__(
+        self,
+        first_token_delay: float = 0.3,
+        chunk_interval: float = 0.03,
+        chunk_chars: int = 12,
+        reply_chars: int = 240,
+        reply_fn: Optional[Callable[[str], str]] = None,
+        fail_rate: float = 0.0,
+    ):
+        """
+        Args:
+            first_token_delay: 送出請求到第一個片段的延遲（秒）
+            chunk_interval: 片段之間的間隔（秒）
+            chunk_chars: 每個片段的字元數
+            reply_chars: 預設回覆長度（字元）
+            reply_fn: 自訂回覆產生函式（message -> reply）
+            fail_rate: 模擬 API 失敗的機率（0~1，依訊息內容決定，可重現）
+        """
+        self.first_token_delay = first_token_delay
+        self.chunk_interval = chunk_interval
+        self.chunk_chars = max(1, chunk_chars)
+        self.reply_chars = reply_chars
+        self.reply_fn = reply_fn
+        self.fail_rate = fail_rate
+        self.chat_history: List[dict] = []
+        self.request_count = 0
+
+    def _reply_for(self, message: str) -> str:
+        if self.reply_fn:
+            return self.reply_fn(message)
+        seed = hashlib.sha1(message.encode("utf-8")).hexdigest()
+        base = f"收到「{message[:20]}」。這是模擬回覆 {seed[:8]}，"
+        filler = "內容會依照設定的速度逐步串流輸出。"
+        text = base
+        while len(text) < self.reply_chars:
+            text += filler
+        return text[: self.reply_chars]
+
+    def _should_fail(self, message: str) -> bool:
+        if self.fail_rate <= 0:
+            return False
+        digest = hashlib.sha1(("fail:" + message).encode("utf-8")).digest()
+        return digest[0] / 255.0 < self.fail_rate
+
+    def send_message(self, message: str, record_history: bool = True) -> str:
+        """非串流模式：聚合所有片段"""
+        return "".join(self.stream_message(message, record_history=record_history))
+
+    def clear_history(self):
+        """清除對話歷史"""
+        self.chat_history = []
+
+    def stream_message(
+        self,
+        message: str,
+        on_request: Optional[Callable[[], None]] = None,
+        record_history: bool = True,
+        raise_errors: bool = False,
+    ) -> Iterable[str]:
+        """與 LLMClient.stream_message 相同的串流介面"""
+        full_text = ""
+        try:
+            if on_request:
+                on_request()
+            self.request_count += 1
+            time.sleep(self.first_token_delay)
+            if self._should_fail(message):
+                raise RuntimeError("模擬的 API 錯誤（429 Resource exhausted）")
+            reply = self._reply_for(message)
+            for i in range(0, len(reply), self.chunk_chars):
+                if i:
+                    time.sleep(self.chunk_interval)
+                chunk = reply[i:i + self.chunk_chars]
+                full_text += chunk
+                yield chunk
+        except Exception as e:
+            if raise_errors:
+                raise
+            yield ErrorChunk(f"API 請求失敗: {str(e)}")
+        finally:
+            if full_text and record_history:
+                self.chat_history.append({"role": "user", "content": message})
+                self.chat_history.append({"role": "assistant", "content": full_text})
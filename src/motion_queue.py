@@ -0,0 +1,236 @@
+"""
+動作佇列模組 - 依優先度排程 Live2D 動作，合併快速重複的點擊
+- 優先度：閒置（IDLE）< 點擊（TAP）< LLM / 程式驅動（LLM）
+- 較高優先度立即打斷目前動作；相同或較低優先度的請求排隊，等目前動作播完再播放
+- 同一互動區域（key）在 coalesce_sec 內重複點擊只算一次（合併進播放中或排隊中的請求）
+- 排隊過久的請求直接過期，不會在使用者早已不在意時才播放
+
+動作長度取自各動作檔的 Meta.Duration（CharacterLoader.get_motion_meta，有封裝檔時不需開檔）；
+待機動作播完後框架會自動接上 Idle，因此不能只依 IsMotionFinished() 判斷目前動作是否結束。
+"""
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Callable, Dict, List, Optional
+
+
+class MotionPriority(IntEnum):
+    """佇列中的動作優先度（呼叫 StartMotion 時由 Live2DWidget 轉換成 Cubism 的優先度）"""
+
+    IDLE = 1
+    TAP = 2
+    LLM = 3
+
+
+@dataclass
+class MotionRequest:
+    group: str
+    index: Optional[int] = None  # None 表示群組內隨機
+    priority: MotionPriority = MotionPriority.TAP
+    key: Optional[str] = None    # 合併用的鍵（例如互動區域 ID）
+    created: float = 0.0
+    started: float = 0.0
+    duration: float = 0.0
+    merged: int = 0              # 合併進來的重複請求數
+
+
+@dataclass
+class MotionQueueStats:
+    submitted: int = 0
+    started: int = 0
+    interrupted: int = 0   # 較高優先度打斷播放中的動作
+    queued: int = 0
+    coalesced: int = 0
+    expired: int = 0
+    dropped: int = 0       # 忙碌時略過的閒置動作、佇列已滿時丟棄的請求
+    failed: int = 0
+    max_depth: int = 0
+    wait_ms: List[float] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        waits = sorted(self.wait_ms)
+        return {
+            "submitted": self.submitted,
+            "started": self.started,
+            "interrupted": self.interrupted,
+            "queued": self.queued,
+            "coalesced": self.coalesced,
+            "expired": self.expired,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "max_depth": self.max_depth,
+            "wait_ms_avg": round(sum(waits) / len(waits), 1) if waits else None,
+            "wait_ms_max": round(waits[-1], 1) if waits else None,
+        }
+
+
+class MotionQueue:
+    """
+    動作請求佇列（GUI 執行緒使用）。
+
+    由擁有者提供實際播放的函式；pump() 在每幀繪製時呼叫，目前動作結束後播放下一個。
+    """
+
+    DEFAULT_DURATION = 3.0
+
+    def __init__(
+        self,
+        start_fn: Callable[[MotionRequest], bool],
+        coalesce_sec: float = 1.5,
+        max_wait_sec: float = 8.0,
+        max_pending: int = 8,
+        time_fn: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            start_fn: 實際播放動作，成功時回傳 True
+            coalesce_sec: 同一 key 在此時間內的重複請求合併為一個
+            max_wait_sec: 排隊超過此時間的請求過期
+            max_pending: 佇列上限，滿了之後丟棄最舊的最低優先度請求
+        """
+        self._start_fn = start_fn
+        self.coalesce_sec = coalesce_sec
+        self.max_wait_sec = max_wait_sec
+        self.max_pending = max_pending
+        self._time_fn = time_fn
+        self._pending: List[MotionRequest] = []
+        self._current: Optional[MotionRequest] = None
+        # 群組 -> 每個動作的長度（秒）
+        self._durations: Dict[str, List[float]] = {}
+        self.stats = MotionQueueStats()
+
+    def set_motions(self, motion_meta: Dict[str, List[Dict]]):
+        """模型載入後設定各群組的動作長度；同時清空上一個模型的佇列"""
+        self._durations = {
+            group: [float(meta.get("Duration") or self.DEFAULT_DURATION) for meta in metas]
+            for group, metas in motion_meta.items()
+        }
+        self.clear()
+
+    def clear(self):
+        self._pending.clear()
+        self._current = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def busy(self, now: Optional[float] = None) -> bool:
+        """目前是否有非待機的動作仍在播放"""
+        current = self._current
+        if current is None:
+            return False
+        now = self._time_fn() if now is None else now
+        if now - current.started >= current.duration:
+            self._current = None
+            return False
+        return True
+
+    def submit(
+        self,
+        group: str,
+        index: Optional[int] = None,
+        priority: MotionPriority = MotionPriority.TAP,
+        key: Optional[str] = None,
+    ) -> str:
+        """
+        送出動作請求。
+
+        Returns:
+            "started" / "queued" / "coalesced" / "dropped" / "failed"
+        """
+        now = self._time_fn()
+        self.stats.submitted += 1
+        self._expire(now)
+
+        if key is not None:
+            current = self._current
+            if current is not None and current.key == key and now - current.started < self.coalesce_sec and self.busy(now):
+                current.merged += 1
+                self.stats.coalesced += 1
+                return "coalesced"
+            for pending in self._pending:
+                if pending.key == key:
+                    pending.merged += 1
+                    pending.priority = max(pending.priority, priority)
+                    self.stats.coalesced += 1
+                    return "coalesced"
+
+        request = MotionRequest(group, index, MotionPriority(priority), key, created=now)
+        current = self._current
+        if not self.busy(now):
+            return "started" if self._start(request, now) else "failed"
+        if request.priority > current.priority:
+            self.stats.interrupted += 1
+            return "started" if self._start(request, now) else "failed"
+        if request.priority == MotionPriority.IDLE:
+            # 閒置動作不排隊：有其他動作在播放時直接略過
+            self.stats.dropped += 1
+            return "dropped"
+
+        if len(self._pending) >= self.max_pending:
+            victim = min(self._pending, key=lambda r: (r.priority, r.created))
+            if victim.priority > request.priority:
+                self.stats.dropped += 1
+                return "dropped"
+            self._pending.remove(victim)
+            self.stats.dropped += 1
+        self._pending.append(request)
+        self.stats.queued += 1
+        self.stats.max_depth = max(self.stats.max_depth, len(self._pending))
+        return "queued"
+
+    def pump(self) -> bool:
+        """目前動作結束時播放佇列中優先度最高（同優先度先到先播）的請求；回傳是否播放"""
+        if not self._pending:
+            return False
+        now = self._time_fn()
+        self._expire(now)
+        if not self._pending or self.busy(now):
+            return False
+        request = max(self._pending, key=lambda r: (r.priority, -r.created))
+        self._pending.remove(request)
+        self.stats.wait_ms.append((now - request.created) * 1000.0)
+        if len(self.stats.wait_ms) > 256:
+            del self.stats.wait_ms[:128]
+        return self._start(request, now)
+
+    def _expire(self, now: float):
+        if self._pending and self.max_wait_sec > 0:
+            alive = [r for r in self._pending if now - r.created < self.max_wait_sec]
+            self.stats.expired += len(self._pending) - len(alive)
+            self._pending = alive
+
+    def _start(self, request: MotionRequest, now: float) -> bool:
+        durations = self._durations.get(request.group)
+        if request.index is None and durations:
+            request.index = random.randrange(len(durations))
+        if durations and request.index is not None and request.index >= len(durations):
+            # 索引超出群組範圍：改為群組內隨機，而不是任意換成其他群組
+            request.index = random.randrange(len(durations))
+        if not self._start_fn(request):
+            self.stats.failed += 1
+            return False
+        request.started = now
+        if durations and request.index is not None:
+            request.duration = durations[request.index]
+        else:
+            request.duration = self.DEFAULT_DURATION
+        self._current = request
+        self.stats.started += 1
+        return True
+
+    def to_dict(self) -> Dict:
+        current = self._current if self.busy() else None
+        return {
+            **self.stats.to_dict(),
+            "pending": len(self._pending),
+            "current": (
+                {"group": current.group, "index": current.index, "priority": current.priority.name, "merged": current.merged}
+                if current
+                else None
+            ),
+        }
@@ -0,0 +1,88 @@
+"""
+速率限制模組 - 以 token bucket 控管 API 請求頻率與額度
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    執行緒安全的 token bucket。
+    每次請求消耗 1 個（或指定數量）token，token 以固定速率回補，上限為 capacity。
+    用於在 Gemini 免費額度下限制背景請求（預取、分段摘要等）。
+    """
+
+    def __init__(self, capacity: float, refill_per_sec: float):
+        """
+        Args:
+            capacity: 最多可累積的 token 數（允許的突發請求數）
+            refill_per_sec: 每秒回補的 token 數
+        """
+        if capacity <= 0:
+            raise ValueError("capacity 必須大於 0")
+        self.capacity = float(capacity)
+        self.refill_per_sec = max(0.0, float(refill_per_sec))
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._cond = threading.Condition()
+
+    @classmethod
+    def per_minute(cls, requests: float, burst: Optional[float] = None) -> "TokenBucket":
+        """以「每分鐘請求數」建立"""
+        return cls(burst or max(1.0, requests), requests / 60.0)
+
+    @classmethod
+    def per_hour(cls, requests: float, burst: Optional[float] = None) -> "TokenBucket":
+        """以「每小時請求數」建立"""
+        return cls(burst or max(1.0, requests), requests / 3600.0)
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last
+        self._last = now
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_sec)
+
+    @property
+    def available(self) -> float:
+        """目前可用的 token 數"""
+        with self._cond:
+            self._refill()
+            return self._tokens
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """嘗試立即取得 token；不足時回傳 False（不等待）"""
+        with self._cond:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        取得 token，不足時阻塞等待回補。
+
+        Returns:
+            是否成功取得（逾時回傳 False）
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                if self.refill_per_sec <= 0:
+                    wait = None
+                else:
+                    wait = (tokens - self._tokens) / self.refill_per_sec
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(wait)
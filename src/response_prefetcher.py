@@ -0,0 +1,205 @@
+"""
+互動回應預取模組 - 在閒置時預先以 LLM 生成角色風格的點擊回應
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from src.rate_limiter import TokenBucket
+
+
+# 各互動區域的情境描述（用於組成預取提示詞）
+AREA_DESCRIPTIONS: Dict[str, str] = {
+    "HitAreaHead": "輕輕摸了你的頭",
+    "HitAreaBody": "戳了戳你的身體",
+    "HitAreaHand": "牽起了你的手",
+    "HitAreaFoot": "碰了你的腳",
+    "HitAreaBelly": "戳了你的肚子",
+    "HitAreaChest": "碰了你的胸口",
+}
+
+
+class ResponsePrefetcher:
+    """
+    點擊回應預取器。
+
+    為「角色 × 互動區域」各維護一個小型回應池。背景執行緒只在被要求補充時
+    （呼叫 request_refill，通常由閒置計時器觸發）才發出請求，且每次請求都需先
+    取得額度（TokenBucket），避免耗盡免費 API 額度。
+    點擊時若池中沒有回應，呼叫端應退回 CharacterInteraction 的靜態回覆。
+    請求失敗或回覆沒有可用的句子時結束本次補充，並以指數退避延後之後的喚醒。
+    """
+
+    BACKOFF_BASE_SEC = 30.0
+    BACKOFF_MAX_SEC = 900.0
+
+    def __init__(
+        self,
+        llm_client,
+        pool_size: int = 3,
+        quota: Optional[TokenBucket] = None,
+        areas: Optional[Iterable[str]] = None,
+    ):
+        """
+        Args:
+            llm_client: 具備 stream_message 的 LLM 客戶端
+            pool_size: 每個互動區域保留的預取回應數
+            quota: 預取請求的額度限制（預設每小時 30 次）
+            areas: 需要預取的互動區域（預設為全部已知區域）
+        """
+        self.llm_client = llm_client
+        self.pool_size = max(1, pool_size)
+        self.quota = quota or TokenBucket.per_hour(30, burst=6)
+        self.areas: List[str] = list(areas or AREA_DESCRIPTIONS.keys())
+
+        self._pools: Dict[Tuple[str, str], Deque[str]] = {}
+        self._characters: Dict[str, str] = {}  # character_id -> 顯示名稱
+        self._active_character: Optional[str] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self._consecutive_failures = 0
+        self._backoff_until = 0.0
+
+        # 統計
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+        self.failures = 0
+
+    # ---- 生命週期 ----
+
+    def start(self):
+        """啟動背景補充執行緒"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped = False
+        self._thread = threading.Thread(
+            target=self._run, name="ResponsePrefetcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """停止背景執行緒（不等待進行中的請求）"""
+        self._stopped = True
+        self._wakeup.set()
+
+    # ---- 前景 API ----
+
+    def set_active_character(self, character_id: str, name: str):
+        """設定目前顯示的角色；只為目前角色預取以節省額度"""
+        with self._lock:
+            self._characters[character_id] = name
+            self._active_character = character_id
+
+    def take(self, character_id: str, area_id: str) -> Optional[str]:
+        """取出一則預取回應；池為空時回傳 None"""
+        with self._lock:
+            pool = self._pools.get((character_id, area_id))
+            if pool:
+                self.hits += 1
+                return pool.popleft()
+            self.misses += 1
+            return None
+
+    def request_refill(self):
+        """要求背景執行緒補充回應池（應只在閒置時呼叫）"""
+        self._wakeup.set()
+
+    def stats(self) -> Dict[str, int]:
+        """取得預取統計"""
+        with self._lock:
+            pooled = sum(len(p) for p in self._pools.values())
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "requests": self.requests,
+            "failures": self.failures,
+            "pooled": pooled,
+        }
+
+    # ---- 背景執行緒 ----
+
+    def _next_missing(self) -> Optional[Tuple[str, str, int]]:
+        """找出目前角色中最缺回應的區域，回傳 (角色, 區域, 缺少數量)"""
+        with self._lock:
+            character_id = self._active_character
+            if not character_id:
+                return None
+            best: Optional[Tuple[str, str, int]] = None
+            for area in self.areas:
+                pool = self._pools.get((character_id, area))
+                missing = self.pool_size - (len(pool) if pool else 0)
+                if missing > 0 and (best is None or missing > best[2]):
+                    best = (character_id, area, missing)
+            return best
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if time.monotonic() < self._backoff_until:
+                continue
+            # 每次喚醒盡量補滿，直到額度不足、池已滿或請求沒有產生可用的回應
+            while not self._stopped:
+                target = self._next_missing()
+                if target is None or not self.quota.try_acquire():
+                    break
+                if self._fill(*target):
+                    self._consecutive_failures = 0
+                    continue
+                # 失敗或空回覆：同一區域會再被選中，不要在同一次喚醒中連續重試而耗盡額度
+                self._consecutive_failures += 1
+                delay = min(self.BACKOFF_MAX_SEC, self.BACKOFF_BASE_SEC * 2 ** (self._consecutive_failures - 1))
+                self._backoff_until = time.monotonic() + delay
+                break
+
+    def _build_prompt(self, character_name: str, area_id: str, count: int) -> str:
+        action = AREA_DESCRIPTIONS.get(area_id, "點了你一下")
+        return (
+            f"你是桌面上的動漫角色「{character_name}」。主人剛剛{action}。\n"
+            f"請用角色的語氣寫出 {count} 句不同的簡短反應（繁體中文，每句 20 字以內，"
+            f"可以帶一點表情符號或顏文字）。每行一句，不要編號、不要引號、不要其他說明。"
+        )
+
+    def _fill(self, character_id: str, area_id: str, count: int) -> int:
+        """請求並加入回應池；回傳加入的句數（失敗時為 0）"""
+        with self._lock:
+            name = self._characters.get(character_id, character_id)
+        prompt = self._build_prompt(name, area_id, count)
+        self.requests += 1
+        try:
+            text = "".join(
+                self.llm_client.stream_message(
+                    prompt, record_history=False, raise_errors=True
+                )
+            )
+        except Exception as e:
+            self.failures += 1
+            print(f"預取互動回應失敗: {e}")
+            return 0
+
+        lines = [self._clean_line(line) for line in text.splitlines()]
+        lines = [line for line in lines if line][:count]
+        if not lines:
+            self.failures += 1
+            print("預取互動回應失敗: 回覆中沒有可用的句子")
+            return 0
+        with self._lock:
+            pool = self._pools.setdefault(
+                (character_id, area_id), deque(maxlen=self.pool_size)
+            )
+            pool.extend(lines)
+        return len(lines)
+
+    @staticmethod
+    def _clean_line(line: str) -> str:
+        """去除模型常加的編號、項目符號與引號"""
+        line = line.strip().lstrip("-*•・").strip()
+        if len(line) > 2 and line[0].isdigit() and line[1] in ".、)":
+            line = line[2:].strip()
+        return line.strip("「」\"'“”")
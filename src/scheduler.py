@@ -0,0 +1,254 @@
+"""
+集中排程模組 - 以單一計時器驅動延遲動作、UI 逾時與閒置行為
+- 所有工作放在同一個 heap（依最晚執行時間排序），GUI 執行緒只保留一個 QTimer，
+  對準最早的期限；醒來時把所有已到期的工作一起執行
+- 每個工作可容許延後一段時間（slack），期限相近的工作合併在同一次喚醒，
+  閒置時行程只在真正需要時醒來
+- ScheduledTimer 提供與 QTimer 相同的常用介面（start / stop / isActive / remainingTime），
+  既有的單次 / 週期計時器可直接替換
+
+繪製節拍（Live2DWidget.animation_timer）與 QPropertyAnimation 仍由 Qt 驅動。
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+import random
+import time
+from typing import Callable, List, Optional
+
+from PyQt6 import sip
+from PyQt6.QtCore import QCoreApplication, QObject, Qt, QTimer
+
+from src.app_log import get_logger
+
+_log = get_logger("scheduler")
+
+
+class ScheduledTask:
+    """一個排定的工作；due 之後即可執行，最晚在 deadline 執行"""
+
+    __slots__ = ("due", "deadline", "callback", "active")
+
+    def __init__(self, due: float, deadline: float, callback: Callable[[], None]):
+        self.due = due
+        self.deadline = deadline
+        self.callback = callback
+        self.active = True
+
+
+class TaskQueue:
+    """
+    不依賴 Qt 的工作佇列（heap，取消時延遲刪除）。
+    由 Scheduler 驅動；基準測試以模擬時鐘直接呼叫 run_due()。
+    """
+
+    def __init__(self, time_fn: Callable[[], float] = time.monotonic):
+        self.time_fn = time_fn
+        self._heap: List[tuple] = []  # (deadline, 序號, 工作)
+        self._seq = itertools.count()
+        self._active = 0
+        self.fired = 0
+        self.coalesced = 0  # 與同一次喚醒的其他工作一起執行的次數
+
+    def __len__(self) -> int:
+        return self._active
+
+    def call_at(self, due: float, callback: Callable[[], None], slack: float = 0.0) -> ScheduledTask:
+        task = ScheduledTask(due, due + max(0.0, slack), callback)
+        heapq.heappush(self._heap, (task.deadline, next(self._seq), task))
+        self._active += 1
+        return task
+
+    def cancel(self, task: ScheduledTask):
+        if task.active:
+            task.active = False
+            self._active -= 1
+            # 已取消的項目過多時重建，避免 heap 無限成長
+            if len(self._heap) > 64 and self._active < len(self._heap) // 2:
+                self._heap = [entry for entry in self._heap if entry[2].active]
+                heapq.heapify(self._heap)
+
+    def next_deadline(self) -> Optional[float]:
+        heap = self._heap
+        while heap and not heap[0][2].active:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def run_due(self, now: Optional[float] = None) -> int:
+        """執行所有已到期（due <= now）的工作，依 due 順序；回傳執行數"""
+        if now is None:
+            now = self.time_fn()
+        ready = sorted((t for _, _, t in self._heap if t.active and t.due <= now), key=lambda t: t.due)
+        for task in ready:
+            task.active = False
+            self._active -= 1
+        for task in ready:
+            try:
+                task.callback()
+            except Exception as e:
+                _log.error("排程工作失敗: %s", e, exc_info=True)
+        self.fired += len(ready)
+        self.coalesced += max(0, len(ready) - 1)
+        self.next_deadline()
+        return len(ready)
+
+
+class Scheduler(QObject):
+    """以單一 QTimer 驅動 TaskQueue（GUI 執行緒使用）"""
+
+    def __init__(self, parent: Optional[QObject] = None, time_fn: Callable[[], float] = time.monotonic):
+        super().__init__(parent)
+        self.queue = TaskQueue(time_fn)
+        self._timer: Optional[QTimer] = None  # 第一次排程時才建立（需要 QApplication）
+        self._armed_deadline: Optional[float] = None
+        self._closed = False
+        self.wakeups = 0
+
+    def now(self) -> float:
+        return self.queue.time_fn()
+
+    def call_later(self, delay: float, callback: Callable[[], None], slack: float = 0.0) -> ScheduledTask:
+        """
+        delay 秒後執行 callback。
+
+        Args:
+            slack: 容許延後的比例（相對於 delay），用於與其他工作合併喚醒
+        """
+        delay = max(0.0, delay)
+        task = self.queue.call_at(self.now() + delay, callback, delay * slack)
+        self._rearm()
+        return task
+
+    def cancel(self, task: ScheduledTask):
+        self.queue.cancel(task)
+        self._rearm()
+
+    def timer(self, callback: Callable[[], None], single_shot: bool = True, slack: float = 0.0,
+              jitter: float = 0.0, owner: Optional[QObject] = None) -> "ScheduledTimer":
+        """建立以本排程器實作的計時器；owner 被刪除時自動停止"""
+        timer = ScheduledTimer(self, callback, single_shot=single_shot, slack=slack, jitter=jitter)
+        if owner is not None:
+            owner.destroyed.connect(timer.stop)
+        return timer
+
+    def shutdown(self):
+        """應用程式結束：停止計時器；之後擁有者被刪除時的 stop() / cancel() 不再碰觸 Qt 物件"""
+        self._closed = True
+        if self._timer is not None and not sip.isdeleted(self._timer):
+            self._timer.stop()
+        self._timer = None
+        self._armed_deadline = None
+
+    def _rearm(self):
+        if self._closed:
+            return
+        if self._timer is not None and sip.isdeleted(self._timer):
+            # QApplication 已銷毀（未經過 aboutToQuit 的結束路徑）
+            self.shutdown()
+            return
+        deadline = self.queue.next_deadline()
+        if deadline == self._armed_deadline:
+            return
+        if self._timer is None:
+            self._timer = QTimer(self)
+            self._timer.setSingleShot(True)
+            self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+            self._timer.timeout.connect(self._on_wake)
+            app = QCoreApplication.instance()
+            if app is not None:
+                app.aboutToQuit.connect(self.shutdown)
+        self._armed_deadline = deadline
+        if deadline is None:
+            self._timer.stop()
+        else:
+            self._timer.start(max(0, math.ceil((deadline - self.now()) * 1000)))
+
+    def _on_wake(self):
+        self._armed_deadline = None
+        self.wakeups += 1
+        self.queue.run_due()
+        self._rearm()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.queue),
+            "wakeups": self.wakeups,
+            "fired": self.queue.fired,
+            "coalesced": self.queue.coalesced,
+            "next_in_ms": (
+                round((self._armed_deadline - self.now()) * 1000) if self._armed_deadline is not None else None
+            ),
+        }
+
+
+class ScheduledTimer:
+    """
+    以 Scheduler 實作的計時器（QTimer 常用介面的子集）。
+
+    - slack：容許延後的比例，例如 0.1 表示 10 秒的逾時最晚 11 秒觸發
+    - jitter：每次啟動時間隔隨機增減的比例（閒置行為避免規律感）
+    """
+
+    def __init__(self, scheduler: Scheduler, callback: Callable[[], None], single_shot: bool = True,
+                 slack: float = 0.0, jitter: float = 0.0):
+        self._scheduler = scheduler
+        self._callback = callback
+        self._single_shot = single_shot
+        self.slack = slack
+        self.jitter = jitter
+        self._interval = 0
+        self._task: Optional[ScheduledTask] = None
+        self._running = False
+
+    def setSingleShot(self, single_shot: bool):
+        self._single_shot = single_shot
+
+    def setInterval(self, ms: int):
+        self._interval = int(ms)
+        if self._task is not None:
+            self.start()
+
+    def interval(self) -> int:
+        return self._interval
+
+    def start(self, ms: Optional[int] = None):
+        if ms is not None:
+            self._interval = int(ms)
+        self.stop()
+        delay = self._interval / 1000.0
+        if self.jitter:
+            delay *= 1.0 + random.uniform(-self.jitter, self.jitter)
+        self._running = True
+        self._task = self._scheduler.call_later(delay, self._fire, self.slack)
+
+    def stop(self):
+        self._running = False
+        if self._task is not None:
+            self._scheduler.cancel(self._task)
+            self._task = None
+
+    def isActive(self) -> bool:
+        return self._running
+
+    def remainingTime(self) -> int:
+        """剩餘毫秒數；未啟動時回傳 -1（與 QTimer 相同）"""
+        if self._task is None:
+            return -1
+        return max(0, int((self._task.due - self._scheduler.now()) * 1000))
+
+    def _fire(self):
+        self._task = None
+        if self._single_shot:
+            self._running = False
+        try:
+            self._callback()
+        finally:
+            # 週期計時器：回呼中沒有 stop() / 重新 start() 時以（可能已更新的）間隔排下一次；
+            # 回呼拋出例外時也照常排程，否則 isActive() 仍為 True 但永遠不再觸發
+            if self._running and self._task is None:
+                self.start()
+
+
+scheduler = Scheduler()
@@ -0,0 +1,273 @@
+"""
+多對話工作階段模組 - 以 asyncio 同時處理多個獨立對話
+每個工作階段（依角色或 IPC 客戶端區分）有自己的有限上下文，
+所有工作階段共用同一個後端（同一組 HTTP/gRPC 連線）與全域併發上限。
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional
+
+
+@dataclass
+class ChatSession:
+    """單一對話工作階段"""
+
+    session_id: str
+    character_id: Optional[str] = None
+    max_turns: int = 10             # 保留的最近問答輪數
+    max_context_chars: int = 8000   # 上下文字元上限（超過時丟棄最舊的輪次）
+    history: Deque[dict] = field(default_factory=deque)  # {"role": "user"/"assistant", "content": str}
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)  # 同一工作階段一次只處理一則訊息
+    last_active: float = field(default_factory=time.monotonic)
+    message_count: int = 0
+
+    def build_contents(self, message: str) -> List[dict]:
+        """組成送給 Gemini 的多輪 contents（歷史 + 本次訊息）"""
+        contents = [
+            {"role": "user" if turn["role"] == "user" else "model", "parts": [turn["content"]]}
+            for turn in self.history
+        ]
+        contents.append({"role": "user", "parts": [message]})
+        return contents
+
+    def append_turn(self, message: str, reply: str):
+        """記錄一輪問答，並依輪數與字元上限裁切最舊的內容"""
+        self.history.append({"role": "user", "content": message})
+        self.history.append({"role": "assistant", "content": reply})
+        while len(self.history) > self.max_turns * 2:
+            self.history.popleft()
+            self.history.popleft()
+        total = sum(len(t["content"]) for t in self.history)
+        while len(self.history) > 2 and total > self.max_context_chars:
+            total -= len(self.history.popleft()["content"])
+            total -= len(self.history.popleft()["content"])
+        self.message_count += 1
+        self.last_active = time.monotonic()
+
+
+class GeminiAsyncBackend:
+    """
+    共用的 Gemini 非同步後端。
+    所有工作階段共用同一個 GenerativeModel（同一組底層連線），上下文由呼叫端以 contents 傳入。
+    """
+
+    def __init__(self, model):
+        """
+        Args:
+            model: genai.GenerativeModel（通常取自 LLMClient.model）
+        """
+        self.model = model
+
+    async def astream(self, contents: List[dict]) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(contents, stream=True)
+        async for chunk in response:
+            text = getattr(chunk, "text", None)
+            if text:
+                yield text
+
+
+class MockAsyncBackend:
+    """
+    本地模擬後端（不連網）。
+    以 asyncio.sleep 模擬首字延遲與生成速度，可選擇模擬後端自身的連線數上限。
+    """
+
+    def __init__(
+        self,
+        first_token_delay: float = 0.3,
+        chunk_interval: float = 0.02,
+        chunk_chars: int = 12,
+        reply_chars: int = 240,
+        connection_limit: Optional[int] = None,
+    ):
+        self.first_token_delay = first_token_delay
+        self.chunk_interval = chunk_interval
+        self.chunk_chars = max(1, chunk_chars)
+        self.reply_chars = reply_chars
+        self.connection_limit = connection_limit
+        self._connections: Optional[asyncio.Semaphore] = None
+        self.request_count = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+
+    async def astream(self, contents: List[dict]) -> AsyncIterator[str]:
+        if self.connection_limit and self._connections is None:
+            self._connections = asyncio.Semaphore(self.connection_limit)
+        if self._connections:
+            await self._connections.acquire()
+        self.request_count += 1
+        self._in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            message = contents[-1]["parts"][0]
+            seed = hashlib.sha1(message.encode("utf-8")).hexdigest()[:8]
+            reply = f"（第 {len(contents) // 2 + 1} 輪）收到「{message[:20]}」{seed}。"
+            while len(reply) < self.reply_chars:
+                reply += "模擬串流回覆內容。"
+            reply = reply[: self.reply_chars]
+            await asyncio.sleep(self.first_token_delay)
+            for i in range(0, len(reply), self.chunk_chars):
+                if i:
+                    await asyncio.sleep(self.chunk_interval)
+                yield reply[i:i + self.chunk_chars]
+        finally:
+            self._in_flight -= 1
+            if self._connections:
+                self._connections.release()
+
+
+class SessionManager:
+    """
+    多對話工作階段管理器（asyncio）。
+
+    - 每個工作階段有獨立、有限的上下文
+    - 同一工作階段內的訊息依序處理；不同工作階段可同時進行
+    - 全域 Semaphore 限制同時送往後端的請求數（配合 API 額度）
+    """
+
+    def __init__(
+        self,
+        backend,
+        max_concurrency: int = 8,
+        max_turns: int = 10,
+        max_context_chars: int = 8000,
+        max_sessions: int = 256,
+    ):
+        """
+        Args:
+            backend: 具備 async astream(contents) 的後端
+            max_concurrency: 全域同時請求上限
+            max_turns: 每個工作階段保留的問答輪數
+            max_context_chars: 每個工作階段的上下文字元上限
+            max_sessions: 工作階段數上限（超過時移除最久未使用者）
+        """
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.max_turns = max_turns
+        self.max_context_chars = max_context_chars
+        self.max_sessions = max_sessions
+        self._sessions: Dict[str, ChatSession] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphore 需在事件迴圈內建立
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def get_session(self, session_id: str, character_id: Optional[str] = None) -> ChatSession:
+        """取得或建立工作階段"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            if len(self._sessions) >= self.max_sessions:
+                oldest = min(self._sessions.values(), key=lambda s: s.last_active)
+                del self._sessions[oldest.session_id]
+            session = ChatSession(
+                session_id=session_id,
+                character_id=character_id,
+                max_turns=self.max_turns,
+                max_context_chars=self.max_context_chars,
+            )
+            self._sessions[session_id] = session
+        return session
+
+    def close_session(self, session_id: str):
+        """移除工作階段與其上下文"""
+        self._sessions.pop(session_id, None)
+
+    @property
+    def session_count(self) -> int:
+        return len(self._sessions)
+
+    async def stream(
+        self, session_id: str, message: str, character_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """在指定工作階段中送出訊息，逐步產生回覆片段"""
+        session = self.get_session(session_id, character_id)
+        async with session.lock:
+            contents = session.build_contents(message)
+            reply = ""
+            async with self._get_semaphore():
+                self.in_flight += 1
+                try:
+                    async for delta in self.backend.astream(contents):
+                        reply += delta
+                        yield delta
+                except Exception:
+                    self.failed += 1
+                    raise
+                finally:
+                    self.in_flight -= 1
+            if reply:
+                session.append_turn(message, reply)
+                self.completed += 1
+
+    async def send(self, session_id: str, message: str, character_id: Optional[str] = None) -> str:
+        """送出訊息並回傳完整回覆"""
+        return "".join([d async for d in self.stream(session_id, message, character_id)])
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": self.session_count,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+class SessionManagerThread:
+    """
+    在背景執行緒執行 asyncio 事件迴圈，讓 Qt GUI 執行緒可提交對話而不阻塞。
+    回呼在事件迴圈執行緒中呼叫；GUI 端應以 Qt signal（queued connection）轉回主執行緒。
+    """
+
+    def __init__(self, manager: SessionManager):
+        self.manager = manager
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="SessionManager", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def submit(
+        self,
+        session_id: str,
+        message: str,
+        on_chunk: Optional[Callable[[str], None]] = None,
+        on_done: Optional[Callable[[str], None]] = None,
+        on_error: Optional[Callable[[str], None]] = None,
+        character_id: Optional[str] = None,
+    ) -> Future:
+        """提交訊息（執行緒安全），回傳 concurrent.futures.Future（結果為完整回覆）"""
+
+        async def run() -> str:
+            text = ""
+            try:
+                async for delta in self.manager.stream(session_id, message, character_id):
+                    text += delta
+                    if on_chunk:
+                        on_chunk(delta)
+            except Exception as e:
+                if on_error:
+                    on_error(f"API 請求失敗: {e}")
+                raise
+            if on_done:
+                on_done(text)
+            return text
+
+        return asyncio.run_coroutine_threadsafe(run(), self._loop)
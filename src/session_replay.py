@@ -0,0 +1,464 @@
+"""
+互動錄製 / 回放模組 - 重現點擊、切換角色與串流回覆交錯時的卡頓
+錄製時只在記憶體中附加事件（GUI 執行緒不做 I/O），關閉視窗時一次寫出；
+回放時依錄下的時間點重新觸發同一組處理函式，LLM 改為依錄下的片段與間隔輸出，
+並以離屏繪製收集幀時間與 GUI 執行緒延遲。
+
+錄製（正常使用程式，關閉視窗時寫出）：
+    SESSION_RECORD_FILE=session.jsonl.gz python main.py
+回放：
+    python -m src.session_replay session.jsonl.gz
+    python -m src.session_replay session.jsonl.gz --speed 2 --json replay.json
+
+紀錄格式（JSON Lines，副檔名 .gz 時以 gzip 壓縮）：
+    第一行為檔頭 {"version": 1, "character": 起始角色 ID, ...}
+    之後每行 [毫秒, 種類, 資料]，種類為 click / switch / send / stop / chunk / end
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from src.mock_llm import MockLLMClient
+
+SESSION_FORMAT_VERSION = 1
+
+# 回放時由 GUI 觸發的事件；chunk / end 由回放用 LLM 依錄下的時間重現
+INPUT_EVENTS = ("click", "switch", "send", "stop")
+
+
+def _open(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class SessionRecorder:
+    """
+    記錄使用者互動與串流片段的時間點。
+
+    chunk 只記錄由 send 開始的串流（文件摘要等其他串流不列入）；
+    redact=True 時訊息與片段以等長的佔位字取代，只保留長度與時間。
+    """
+
+    def __init__(self, path: Path, redact: bool = False, time_fn: Callable[[], float] = time.perf_counter):
+        self.path = Path(path)
+        self.redact = redact
+        self._time_fn = time_fn
+        self._start = time_fn()
+        self._header: Dict = {"version": SESSION_FORMAT_VERSION}
+        self._events: List[list] = []
+        self._streaming = False
+
+    @classmethod
+    def from_env(cls) -> Optional["SessionRecorder"]:
+        """由 SESSION_RECORD_FILE / SESSION_RECORD_REDACT 建立；未設定輸出檔時回傳 None"""
+        path = os.getenv("SESSION_RECORD_FILE")
+        if not path:
+            return None
+        return cls(Path(path), redact=os.getenv("SESSION_RECORD_REDACT", "0") == "1")
+
+    def start(self, character_id: Optional[str]):
+        """開始錄製（時間從此刻起算）"""
+        self._header.update(character=character_id, created=round(time.time(), 3))
+        self._events.clear()
+        self._streaming = False
+        self._start = self._time_fn()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def _add(self, kind: str, data=None):
+        self._events.append([round((self._time_fn() - self._start) * 1000.0, 2), kind, data])
+
+    def _text(self, text: str) -> str:
+        return "〇" * len(text) if self.redact else text
+
+    def click(self, hit_area_id: str):
+        self._add("click", hit_area_id)
+
+    def switch(self, character_id: str):
+        self._add("switch", character_id)
+
+    def send(self, message: str):
+        self._streaming = True
+        self._add("send", self._text(message))
+
+    def stop(self):
+        if self._streaming:
+            self._add("stop")
+
+    def chunk(self, delta: str):
+        if self._streaming:
+            self._add("chunk", self._text(delta))
+
+    def end(self):
+        if self._streaming:
+            self._streaming = False
+            self._add("end")
+
+    def save(self) -> Path:
+        """寫出紀錄檔"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with _open(self.path, "w") as f:
+            f.write(json.dumps(self._header, ensure_ascii=False) + "\n")
+            for event in self._events:
+                f.write(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n")
+        return self.path
+
+
+@dataclass
+class RecordedStream:
+    """一則訊息的串流：每個片段與前一個時間點（送出或上一個片段）的間隔（秒）"""
+
+    chunks: List[Tuple[float, str]] = field(default_factory=list)
+
+
+@dataclass
+class Session:
+    """讀入的錄製內容"""
+
+    header: Dict
+    events: List[Tuple[float, str, object]]
+
+    @property
+    def duration_ms(self) -> float:
+        return self.events[-1][0] if self.events else 0.0
+
+    def input_events(self) -> List[Tuple[float, str, object]]:
+        return [e for e in self.events if e[1] in INPUT_EVENTS]
+
+    def streams(self) -> List[RecordedStream]:
+        """依 send 的順序整理出每則訊息的片段與間隔"""
+        streams: List[RecordedStream] = []
+        current: Optional[RecordedStream] = None
+        last_ms = 0.0
+        for t_ms, kind, data in self.events:
+            if kind == "send":
+                current = RecordedStream()
+                streams.append(current)
+                last_ms = t_ms
+            elif kind == "chunk" and current is not None:
+                current.chunks.append((max(0.0, t_ms - last_ms) / 1000.0, data))
+                last_ms = t_ms
+            elif kind == "end":
+                current = None
+        return streams
+
+
+def load_session(path: Path) -> Session:
+    """讀取紀錄檔；版本不符時拋出 ValueError"""
+    with _open(Path(path), "r") as f:
+        header = json.loads(f.readline())
+        if header.get("version") != SESSION_FORMAT_VERSION:
+            raise ValueError(f"不支援的紀錄版本: {header.get('version')}")
+        events = [tuple(json.loads(line)) for line in f if line.strip()]
+    return Session(header, events)
+
+
+class ReplayLLMClient(MockLLMClient):
+    """
+    依錄下的片段與間隔輸出的 LLM 替身。
+    回放端在送出訊息前以 queue() 指定這次要重現的串流；沒有排入時退回一般的模擬回覆。
+    """
+
+    memory = None  # 與 LLMClient 相同的屬性（關閉視窗時檢查）
+
+    def __init__(self, speed: float = 1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.speed = max(0.01, speed)
+        self._pending: Deque[RecordedStream] = deque()
+
+    def queue(self, stream: RecordedStream):
+        self._pending.append(stream)
+
+    def discard_pending(self):
+        self._pending.clear()
+
+    def stream_message(
+        self,
+        message: str,
+        on_request: Optional[Callable[[], None]] = None,
+        record_history: bool = True,
+        raise_errors: bool = False,
+    ):
+        """與 LLMClient.stream_message 相同的串流介面"""
+        if not self._pending:
+            yield from super().stream_message(message, on_request, record_history, raise_errors)
+            return
+        stream = self._pending.popleft()
+        full_text = ""
+        try:
+            if on_request:
+                on_request()
+            self.request_count += 1
+            for gap, chunk in stream.chunks:
+                time.sleep(gap / self.speed)
+                full_text += chunk
+                yield chunk
+        finally:
+            if full_text and record_history:
+                self.chat_history.append({"role": "user", "content": message})
+                self.chat_history.append({"role": "assistant", "content": full_text})
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(values[min(len(values) - 1, int(q * len(values)))], 3)
+
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(values[-1], 3),
+    }
+
+
+class SessionReplayer:
+    """
+    在 DesktopCharacterWindow 上依錄下的時間點重新觸發互動，並收集：
+    - GUI 執行緒延遲：固定間隔心跳計時器的遲到時間
+    - 幀時間：Live2D widget 相鄰兩次 frameSwapped 的間隔，以及每幀 CPU / GPU 時間
+    - 各事件處理函式在 GUI 執行緒的耗時、每個片段的 GUI 處理耗時
+    """
+
+    def __init__(self, window, session: Session, speed: float = 1.0, heartbeat_ms: int = 5, tail_sec: float = 2.0):
+        from PyQt6.QtCore import Qt, QTimer
+
+        from src.low_power import FrameCostMeter
+
+        self.window = window
+        self.session = session
+        self.speed = max(0.01, speed)
+        self.heartbeat_ms = heartbeat_ms
+        self.tail_sec = tail_sec
+        self.finished_callback: Optional[Callable[[], None]] = None
+
+        self.llm = ReplayLLMClient(speed=self.speed)
+        window.llm_client = self.llm
+        # 回放結果需要每個片段的 GUI 耗時：不論 CHAT_TELEMETRY 設定都啟用（不印出摘要）
+        window.telemetry.enabled = True
+        window.telemetry.verbose = False
+
+        self._events = session.input_events()
+        self._streams = deque(session.streams())
+        self._index = 0
+        self._start = 0.0
+        self.heartbeat_late_ms: List[float] = []
+        self.frame_intervals_ms: List[float] = []
+        self.dispatch_lag_ms: List[float] = []
+        self.handler_ms: Dict[str, List[float]] = {}
+        self.skipped_sends = 0
+        self._last_beat = 0.0
+        self._last_frame: Optional[float] = None
+        self._drain_started = 0.0
+
+        self._event_timer = QTimer(window)
+        self._event_timer.setSingleShot(True)
+        self._event_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._event_timer.timeout.connect(self._dispatch_next)
+        self._heartbeat = QTimer(window)
+        self._heartbeat.setTimerType(Qt.TimerType.PreciseTimer)
+        self._heartbeat.timeout.connect(self._on_heartbeat)
+        self._drain_timer = QTimer(window)
+        self._drain_timer.timeout.connect(self._check_done)
+
+        widget = window.live2d_widget
+        if widget is not None:
+            if widget.frame_meter is None:
+                widget.frame_meter = FrameCostMeter()
+            widget.frameSwapped.connect(self._on_frame)
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._last_beat = self._start
+        self._heartbeat.start(self.heartbeat_ms)
+        self._schedule_next()
+
+    def _elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000.0
+
+    def _schedule_next(self):
+        if self._index >= len(self._events):
+            self._drain_started = time.perf_counter()
+            self._drain_timer.start(100)
+            return
+        due_ms = self._events[self._index][0] / self.speed
+        self._event_timer.start(max(0, int(due_ms - self._elapsed_ms())))
+
+    def _dispatch_next(self):
+        t_ms, kind, data = self._events[self._index]
+        self._index += 1
+        self.dispatch_lag_ms.append(max(0.0, self._elapsed_ms() - t_ms / self.speed))
+        start = time.perf_counter()
+        getattr(self, f"_replay_{kind}")(data)
+        self.handler_ms.setdefault(kind, []).append((time.perf_counter() - start) * 1000.0)
+        self._schedule_next()
+
+    def _replay_click(self, hit_area_id: str):
+        self.window._on_part_clicked(hit_area_id)
+
+    def _replay_switch(self, character_id: str):
+        window = self.window
+        ids = [c.id for c in window.characters]
+        if character_id in ids and ids[(window._current_character_index + 1) % len(ids)] != character_id:
+            window.switch_character(character_id)
+        else:
+            window._on_switch_character()
+
+    def _replay_send(self, message: str):
+        window = self.window
+        stream = self._streams.popleft() if self._streams else RecordedStream()
+        if window._is_streaming:
+            # 回放落後、上一則還在串流：直接略過（送出會被排入輸入佇列，之後的串流錯位）
+            self.skipped_sends += 1
+            return
+        previous = window._llm_worker
+        self.llm.queue(stream)
+        window.text_input.setText(message)
+        window._on_send_message()
+        if window._llm_worker is None or window._llm_worker is previous:
+            # 回放落後、上一則還在串流：這則沒有送出，避免之後的串流錯位
+            self.llm.discard_pending()
+            window.text_input.clear()
+            self.skipped_sends += 1
+
+    def _replay_stop(self, _data):
+        if self.window._is_streaming:
+            self.window._on_send_message()
+
+    def _on_heartbeat(self):
+        now = time.perf_counter()
+        self.heartbeat_late_ms.append(max(0.0, (now - self._last_beat) * 1000.0 - self.heartbeat_ms))
+        self._last_beat = now
+
+    def _on_frame(self):
+        now = time.perf_counter()
+        if self._last_frame is not None:
+            self.frame_intervals_ms.append((now - self._last_frame) * 1000.0)
+        self._last_frame = now
+
+    def _check_done(self):
+        # 最後一個事件之後等串流結束，再多收集 tail_sec 秒
+        if self.window._is_streaming:
+            self._drain_started = time.perf_counter()
+            return
+        if time.perf_counter() - self._drain_started < self.tail_sec:
+            return
+        self._drain_timer.stop()
+        self._heartbeat.stop()
+        if self.finished_callback:
+            self.finished_callback()
+
+    def results(self) -> Dict:
+        window = self.window
+        widget = window.live2d_widget
+        chunk_us = [us for trace in window.telemetry.traces() for us in trace.gui_chunk_us]
+        return {
+            "session_ms": round(self.session.duration_ms, 1),
+            "replay_ms": round(self._elapsed_ms(), 1),
+            "speed": self.speed,
+            "events": {kind: len(ms) for kind, ms in self.handler_ms.items()},
+            "skipped_sends": self.skipped_sends,
+            "gui_latency_ms": _summary(self.heartbeat_late_ms),
+            "dispatch_lag_ms": _summary(self.dispatch_lag_ms),
+            "frame_interval_ms": _summary(self.frame_intervals_ms),
+            "frame_costs": widget.frame_meter.summary() if widget and widget.frame_meter else {},
+            "handler_ms": {kind: _summary(ms) for kind, ms in self.handler_ms.items()},
+            "chunk_gui_ms": _summary([us / 1000.0 for us in chunk_us]),
+        }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="回放錄製的互動 / 串流紀錄並收集幀時間與 GUI 延遲")
+    parser.add_argument("session", type=Path, help="SESSION_RECORD_FILE 錄下的紀錄檔")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放速度倍率")
+    parser.add_argument("--show", action="store_true", help="顯示視窗（預設使用離屏平台）")
+    parser.add_argument("--tail", type=float, default=2.0, help="最後一個事件後繼續收集的秒數")
+    parser.add_argument("--json", type=Path, help="將結果寫成 JSON")
+    args = parser.parse_args(argv)
+
+    session = load_session(args.session)
+
+    # 回放環境：不再錄製、不連網、不寫入使用者狀態，模擬時鐘固定步長
+    os.environ.pop("SESSION_RECORD_FILE", None)
+    if not args.show:
+        os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    for key, value in (
+        ("INTERACTION_PREFETCH", "0"),
+        ("ASSISTANT_TOOLS", "0"),
+        ("LONG_TERM_MEMORY", "0"),
+        ("LOW_POWER_IDLE", "0"),
+        ("HIBERNATE_IDLE_SEC", "0"),
+        ("HIBERNATE_HIDDEN_SEC", "0"),
+        ("STARTUP_SNAPSHOT", "0"),
+        ("LIVE2D_DETERMINISTIC", "1"),
+    ):
+        os.environ[key] = value
+
+    try:
+        from PyQt6.QtWidgets import QApplication
+
+        from src.app_log import setup_logging
+        from src.character_library import get_available_characters
+        from src.desktop_window import DesktopCharacterWindow
+        from src.live2d_runtime import enable_shared_gl_contexts
+    except ImportError as e:
+        print(f"缺少相依套件，無法回放：{e}")
+        return 1
+
+    setup_logging(log_file="0")
+    enable_shared_gl_contexts()
+    app = QApplication(sys.argv[:1])
+    window = DesktopCharacterWindow(
+        characters=get_available_characters(),
+        initial_character_id=session.header.get("character"),
+    )
+    window.show()
+
+    replayer = SessionReplayer(window, session, speed=args.speed, tail_sec=args.tail)
+    replayer.finished_callback = app.quit
+    replayer.start()
+    app.exec()
+
+    results = replayer.results()
+    # 不經過 closeEvent：避免以回放視窗的位置覆寫使用者的啟動狀態
+    window.hide()
+    if window.live2d_widget:
+        window.live2d_widget.cleanup()
+
+    print(f"session {results['session_ms'] / 1000:.1f}s → replay {results['replay_ms'] / 1000:.1f}s（×{args.speed:g}）")
+    print(f"events: {results['events']}  skipped_sends: {results['skipped_sends']}")
+    print(f"{'metric':<20} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    rows = [(name, results[name]) for name in ("gui_latency_ms", "dispatch_lag_ms", "frame_interval_ms", "chunk_gui_ms")]
+    rows += [(f"handler.{kind}", stats) for kind, stats in results["handler_ms"].items()]
+    for name, stats in rows:
+        if not stats["count"]:
+            print(f"{name:<20} {0:>6}")
+            continue
+        print(f"{name:<20} {stats['count']:>6} {stats['p50']:>8.2f} {stats['p95']:>8.2f} {stats['p99']:>8.2f} {stats['max']:>8.2f}")
+    for mode, cost in results["frame_costs"].items():
+        gpu = f"{cost['gpu_ms']:.2f}" if cost["gpu_ms"] is not None else "n/a"
+        print(f"frame_cost[{mode}]: frames={cost['frames']} cpu_ms={cost['cpu_ms']:.2f} gpu_ms={gpu}")
+    if args.json:
+        args.json.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"已寫入: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
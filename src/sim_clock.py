@@ -0,0 +1,130 @@
+"""
+模擬時鐘模組 - 以固定時間步長推進 Live2D 動作 / 物理，與繪製頻率脫鉤
+繪製時以累積器剩餘比例（alpha）在前後兩個模擬狀態間插值。
+"""
+from __future__ import annotations
+
+import os
+import time
+from typing import Callable, List, Optional, Sequence
+
+
+class SimulationClock:
+    """
+    固定步長模擬時鐘（accumulator 模式）。
+
+    - 每次 advance() 依實際經過時間回傳需要執行的模擬步數，步長固定為 step_dt
+    - 閒置時可切換到較低的模擬頻率（idle_hz），繪製端以 alpha 插值維持平滑
+    - deterministic 模式下不讀取系統時鐘：每次 advance() 固定推進一步、alpha 為 0，
+      相同輸入必定得到相同的模擬結果（用於基準測試）
+    """
+
+    def __init__(
+        self,
+        step_hz: float = 60.0,
+        idle_hz: Optional[float] = None,
+        max_steps_per_advance: int = 5,
+        deterministic: bool = False,
+        time_fn: Callable[[], float] = time.perf_counter,
+    ):
+        """
+        Args:
+            step_hz: 一般狀態的模擬頻率（步 / 秒）
+            idle_hz: 閒置狀態的模擬頻率；None 表示與 step_hz 相同
+            max_steps_per_advance: 單次最多補跑的步數（GUI 執行緒卡頓後避免一次追太多）
+            deterministic: 是否使用決定性模式
+            time_fn: 取得目前時間（秒）的函式，可替換以便測試
+        """
+        if step_hz <= 0:
+            raise ValueError("step_hz 必須大於 0")
+        self.step_hz = float(step_hz)
+        self.idle_hz = float(idle_hz) if idle_hz else self.step_hz
+        self.max_steps_per_advance = max(1, int(max_steps_per_advance))
+        self.deterministic = deterministic
+        self._time_fn = time_fn
+
+        self._idle = False
+        self._accumulator = 0.0
+        self._last: Optional[float] = None
+        self.steps = 0              # 累計模擬步數
+        self.sim_time = 0.0         # 累計模擬時間（秒）
+        self.dropped_time = 0.0     # 因超過 max_steps_per_advance 而捨棄的時間（秒）
+
+    @classmethod
+    def from_env(cls) -> "SimulationClock":
+        """
+        由環境變數建立：
+        LIVE2D_SIM_HZ（預設 60）、LIVE2D_IDLE_SIM_HZ（預設 30）、LIVE2D_DETERMINISTIC=1
+        """
+        return cls(
+            step_hz=float(os.getenv("LIVE2D_SIM_HZ", "60")),
+            idle_hz=float(os.getenv("LIVE2D_IDLE_SIM_HZ", "30")),
+            deterministic=os.getenv("LIVE2D_DETERMINISTIC", "0") == "1",
+        )
+
+    @property
+    def step_dt(self) -> float:
+        """目前的固定步長（秒）"""
+        return 1.0 / (self.idle_hz if self._idle else self.step_hz)
+
+    @property
+    def idle(self) -> bool:
+        return self._idle
+
+    def set_idle(self, idle: bool):
+        """切換閒置狀態（步長改變時保留累積時間，不會跳幀）"""
+        self._idle = bool(idle)
+
+    @property
+    def alpha(self) -> float:
+        """目前時間落在最後兩個模擬狀態之間的比例（0~1），供插值使用"""
+        if self.deterministic:
+            return 0.0
+        return min(1.0, self._accumulator / self.step_dt)
+
+    def reset(self):
+        """重置時間基準（例如載入新模型後），避免把載入耗時當成經過時間"""
+        self._accumulator = 0.0
+        self._last = None
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """
+        推進時鐘，回傳本次需要執行的模擬步數。
+
+        Args:
+            now: 目前時間（秒）；None 時使用 time_fn
+        """
+        if self.deterministic:
+            self._count(1)
+            return 1
+
+        now = self._time_fn() if now is None else now
+        if self._last is None:
+            # 第一次呼叫：建立時間基準並先跑一步，讓模型有初始姿勢
+            self._last = now
+            self._count(1)
+            return 1
+
+        self._accumulator += max(0.0, now - self._last)
+        self._last = now
+        dt = self.step_dt
+        steps = int(self._accumulator / dt)
+        if steps > self.max_steps_per_advance:
+            dropped = (steps - self.max_steps_per_advance) * dt
+            self.dropped_time += dropped
+            self._accumulator -= dropped
+            steps = self.max_steps_per_advance
+        self._accumulator -= steps * dt
+        self._count(steps)
+        return steps
+
+    def _count(self, steps: int):
+        self.steps += steps
+        self.sim_time += steps * self.step_dt
+
+
+def lerp_values(previous: Sequence[float], current: Sequence[float], alpha: float) -> List[float]:
+    """兩組參數值的線性插值（長度不同時以 current 為準）"""
+    if len(previous) != len(current):
+        return list(current)
+    return [p + (c - p) * alpha for p, c in zip(previous, current)]
@@ -0,0 +1,101 @@
+"""
+啟動快照模組 - 結束時保存最後一幀與視窗位置，下次啟動立即顯示靜態畫面
+並記錄啟動各階段時間（第一個可見畫面、模型就緒）。
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from PyQt6.QtGui import QImage
+
+from src.app_paths import cache_subdir
+
+_STATE_FILE = "startup.json"
+
+
+class StartupTimer:
+    """啟動階段計時（毫秒，相對於 begin() 的時間點）"""
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self.marks: Dict[str, float] = {}
+
+    def begin(self, start: float):
+        """以行程實際開始的 perf_counter() 值作為基準"""
+        self._start = start
+
+    def mark(self, name: str) -> bool:
+        """記錄階段；同名只記錄第一次。回傳是否為第一次記錄"""
+        if name in self.marks:
+            return False
+        self.marks[name] = (time.perf_counter() - self._start) * 1000
+        return True
+
+    def summary(self) -> str:
+        return "，".join(f"{name} {ms:.0f} ms" for name, ms in self.marks.items())
+
+
+# 全域啟動計時器（main.py 於行程開始時呼叫 begin()）
+startup_timer = StartupTimer()
+
+
+def snapshot_enabled() -> bool:
+    """STARTUP_SNAPSHOT=0 可停用（用於比較啟動時間）"""
+    return os.getenv("STARTUP_SNAPSHOT", "1") != "0"
+
+
+@dataclass
+class StartupState:
+    """上次結束時的角色、視窗位置與快照"""
+
+    character_id: str
+    x: int
+    y: int
+    snapshot_file: Optional[str] = None
+
+    def load_snapshot(self) -> Optional[QImage]:
+        if not self.snapshot_file:
+            return None
+        image = QImage(str(cache_subdir("startup") / self.snapshot_file))
+        return None if image.isNull() else image
+
+
+def load_startup_state() -> Optional[StartupState]:
+    """讀取上次保存的啟動狀態；不存在或損毀時回傳 None"""
+    path = cache_subdir("startup") / _STATE_FILE
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return StartupState(
+            character_id=str(data["character_id"]),
+            x=int(data["x"]),
+            y=int(data["y"]),
+            snapshot_file=data.get("snapshot_file"),
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_startup_state(character_id: str, x: int, y: int, snapshot: Optional[QImage]) -> bool:
+    """保存目前角色、視窗位置與最後一幀（每個角色一張快照）"""
+    directory = cache_subdir("startup")
+    snapshot_file = None
+    if snapshot is not None and not snapshot.isNull():
+        snapshot_file = f"{character_id}.png"
+        if not snapshot.save(str(directory / snapshot_file), "PNG"):
+            print(f"保存啟動快照失敗: {directory / snapshot_file}")
+            snapshot_file = None
+    data = {"character_id": character_id, "x": x, "y": y, "snapshot_file": snapshot_file}
+    try:
+        tmp = directory / (_STATE_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, directory / _STATE_FILE)
+    except OSError as e:
+        print(f"保存啟動狀態失敗: {e}")
+        return False
+    return True
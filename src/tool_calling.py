@@ -0,0 +1,381 @@
+"""
+本機工具呼叫模組 - 讓 LLM 以 function calling 使用本機工具（檔案搜尋、剪貼簿、安全指令、計時提醒）
+工具在有上限的執行緒池中執行，同一輪的多個呼叫並行處理，每個呼叫各自有逾時。
+"""
+from __future__ import annotations
+
+import fnmatch
+import os
+import re
+import shlex
+import subprocess
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+
+@dataclass
+class Tool:
+    """
+    一個可供 LLM 呼叫的工具。
+
+    parameters 使用 Gemini function declaration 的 schema 格式
+    （type 為 "OBJECT" / "STRING" / "INTEGER" / "NUMBER" / "BOOLEAN"）。
+    """
+
+    name: str
+    description: str
+    func: Callable[..., Any]
+    parameters: Dict[str, Any] = field(default_factory=lambda: {"type": "OBJECT", "properties": {}})
+    timeout: float = 10.0
+
+    def declaration(self) -> Dict[str, Any]:
+        return {"name": self.name, "description": self.description, "parameters": self.parameters}
+
+
+@dataclass
+class ToolCall:
+    name: str
+    args: Dict[str, Any]
+
+
+@dataclass
+class ToolResult:
+    call: ToolCall
+    output: Any = None
+    error: Optional[str] = None
+    elapsed_ms: float = 0.0
+
+    def response(self) -> Dict[str, Any]:
+        """回傳給模型的 function response 內容"""
+        if self.error is not None:
+            return {"error": self.error}
+        return {"result": self.output}
+
+
+class ToolRegistry:
+    """工具登錄表"""
+
+    def __init__(self):
+        self._tools: Dict[str, Tool] = {}
+
+    def register(self, tool: Tool) -> Tool:
+        self._tools[tool.name] = tool
+        return tool
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self._tools.get(name)
+
+    def names(self) -> List[str]:
+        return list(self._tools)
+
+    def declarations(self) -> List[Dict[str, Any]]:
+        """Gemini tools 參數：[{"function_declarations": [...]}]"""
+        return [{"function_declarations": [t.declaration() for t in self._tools.values()]}]
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+
+class ToolExecutor:
+    """
+    工具執行器。
+
+    所有工具共用一個固定大小的執行緒池（max_workers），同一輪的呼叫一次全部送出並行執行；
+    超過各自逾時的呼叫以錯誤回報給模型。執行緒無法被強制中止，因此長時間的工具
+    （檔案搜尋、外部指令）需自行檢查期限或使用子行程逾時。
+    """
+
+    def __init__(self, registry: ToolRegistry, max_workers: int = 4):
+        self.registry = registry
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="Tool")
+
+    def run_iter(self, calls: Sequence[ToolCall]) -> Iterator[ToolResult]:
+        """並行執行，依完成順序產生結果（逾時者最後以錯誤產生）"""
+        started = time.perf_counter()
+        futures: Dict[Future, ToolCall] = {}
+        deadlines: Dict[Future, float] = {}
+        for call in calls:
+            tool = self.registry.get(call.name)
+            if tool is None:
+                yield ToolResult(call, error=f"未知的工具: {call.name}")
+                continue
+            future = self._pool.submit(self._invoke, tool, call)
+            futures[future] = call
+            deadlines[future] = started + tool.timeout
+
+        pending = set(futures)
+        while pending:
+            now = time.perf_counter()
+            timeout = max(0.0, min(deadlines[f] for f in pending) - now)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            elapsed = (time.perf_counter() - started) * 1000.0
+            for future in done:
+                result = future.result()
+                result.elapsed_ms = elapsed
+                yield result
+            now = time.perf_counter()
+            for future in [f for f in pending if deadlines[f] <= now]:
+                pending.discard(future)
+                future.cancel()
+                yield ToolResult(futures[future], error="執行逾時", elapsed_ms=elapsed)
+
+    def run_all(self, calls: Sequence[ToolCall]) -> List[ToolResult]:
+        """並行執行，依呼叫順序回傳結果"""
+        order = {id(call): i for i, call in enumerate(calls)}
+        return sorted(self.run_iter(calls), key=lambda r: order[id(r.call)])
+
+    @staticmethod
+    def _invoke(tool: Tool, call: ToolCall) -> ToolResult:
+        try:
+            return ToolResult(call, output=tool.func(**call.args))
+        except TypeError as e:
+            return ToolResult(call, error=f"參數錯誤: {e}")
+        except Exception as e:
+            return ToolResult(call, error=str(e))
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ---- 內建工具 ----
+
+# 主機名稱 / IPv4：以英數字開頭，避免被當成選項
+_HOST = r"[a-z0-9][a-z0-9.\-]{0,252}"
+# 允許的唯讀 / 查詢類指令與各自允許的參數（以空白連接後整串比對，不分大小寫；"" 表示不帶參數）。
+# 只允許不會改變系統狀態、也不會讀取任意路徑的形式（例如 ipconfig /release、hostname <新名稱> 不在其中）
+COMMAND_ARG_PATTERNS: Dict[str, tuple] = {
+    "whoami": ("",),
+    "hostname": ("",),
+    "ipconfig": ("", r"/all"),
+    "systeminfo": ("",),
+    "tasklist": ("",),
+    "ping": (rf"-[nc] [1-9] {_HOST}",),
+    "uptime": ("",),
+    "uname": ("", r"-[asnrvmpio]{1,8}"),
+    "df": ("", r"-[hk]"),
+}
+# 預設允許的指令（TOOL_ALLOWED_COMMANDS 以逗號分隔覆寫；不在上表的指令只能不帶參數執行）
+DEFAULT_ALLOWED_COMMANDS = tuple(COMMAND_ARG_PATTERNS)
+_MAX_OUTPUT_CHARS = 4000
+
+
+def _search_roots() -> List[Path]:
+    """檔案搜尋允許的根目錄（TOOL_SEARCH_ROOTS 以 os.pathsep 分隔，預設為家目錄）"""
+    raw = os.getenv("TOOL_SEARCH_ROOTS")
+    roots = [Path(p).expanduser() for p in raw.split(os.pathsep) if p] if raw else [Path.home()]
+    return [r.resolve() for r in roots if r.is_dir()]
+
+
+def search_files(pattern: str, directory: str = "", max_results: int = 20, time_budget: float = 5.0) -> Dict[str, Any]:
+    """
+    依檔名樣式（例如 *.pdf、report*）搜尋檔案；只搜尋允許的根目錄，超過時間預算時回傳目前結果。
+    """
+    roots = _search_roots()
+    if directory:
+        base = Path(directory).expanduser().resolve()
+        if not any(base == r or r in base.parents for r in roots):
+            raise PermissionError(f"不允許搜尋此目錄: {base}")
+        roots = [base]
+
+    deadline = time.monotonic() + time_budget
+    pattern = pattern if any(c in pattern for c in "*?[") else f"*{pattern}*"
+    matches: List[str] = []
+    truncated = False
+    for root in roots:
+        for dirpath, dirnames, filenames in os.walk(root):
+            # 略過隱藏目錄（.git、.cache 等）
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for name in fnmatch.filter(filenames, pattern):
+                matches.append(str(Path(dirpath) / name))
+                if len(matches) >= max_results:
+                    return {"files": matches, "truncated": True}
+            if time.monotonic() > deadline:
+                truncated = True
+                break
+    return {"files": matches, "truncated": truncated}
+
+
+def run_command(command: str, timeout: float = 8.0) -> Dict[str, Any]:
+    """
+    執行允許清單中的指令（不經過 shell，無法使用管線 / 重新導向），輸出截斷至 4000 字元。
+    參數也必須符合 COMMAND_ARG_PATTERNS 中該指令允許的形式。
+    """
+    allowed = os.getenv("TOOL_ALLOWED_COMMANDS")
+    allowed_set = {c.strip() for c in allowed.split(",")} if allowed else set(DEFAULT_ALLOWED_COMMANDS)
+    argv = shlex.split(command, posix=os.name != "nt")
+    if not argv:
+        raise ValueError("指令是空的")
+    if Path(argv[0]).name != argv[0]:
+        raise PermissionError("只能使用指令名稱，不能指定路徑")
+    program = argv[0].lower()
+    if program.endswith(".exe"):
+        program = program[:-4]
+    if program not in allowed_set:
+        raise PermissionError(f"不允許執行: {argv[0]}（允許：{', '.join(sorted(allowed_set))}）")
+    args = " ".join(argv[1:])
+    if not any(re.fullmatch(p, args, re.IGNORECASE) for p in COMMAND_ARG_PATTERNS.get(program, ("",))):
+        raise PermissionError(f"不允許此參數: {command}")
+    try:
+        proc = subprocess.run(argv, capture_output=True, text=True, timeout=timeout, errors="replace")
+    except subprocess.TimeoutExpired as e:
+        output = (e.stdout or "") if isinstance(e.stdout, str) else ""
+        return {"exit_code": None, "output": output[-_MAX_OUTPUT_CHARS:], "timed_out": True}
+    output = (proc.stdout + proc.stderr)[-_MAX_OUTPUT_CHARS:]
+    return {"exit_code": proc.returncode, "output": output}
+
+
+class TimerService:
+    """計時提醒：到時呼叫 on_fire(message)（於計時執行緒中，呼叫端需自行轉回 GUI 執行緒）"""
+
+    def __init__(self, on_fire: Callable[[str], None]):
+        self.on_fire = on_fire
+        self._timers: Dict[int, tuple] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def set_timer(self, seconds: float, message: str) -> Dict[str, Any]:
+        seconds = float(seconds)
+        if not 0 < seconds <= 24 * 3600:
+            raise ValueError("秒數需介於 0 與 86400 之間")
+        with self._lock:
+            timer_id = self._next_id
+            self._next_id += 1
+            timer = threading.Timer(seconds, self._fire, args=(timer_id, message))
+            timer.daemon = True
+            self._timers[timer_id] = (timer, time.time() + seconds, message)
+        timer.start()
+        due = datetime.fromtimestamp(time.time() + seconds).strftime("%H:%M:%S")
+        return {"timer_id": timer_id, "due": due}
+
+    def list_timers(self) -> Dict[str, Any]:
+        with self._lock:
+            items = [
+                {"timer_id": tid, "remaining_sec": round(due - time.time()), "message": msg}
+                for tid, (_, due, msg) in self._timers.items()
+            ]
+        return {"timers": items}
+
+    def cancel_timer(self, timer_id: int) -> Dict[str, Any]:
+        with self._lock:
+            entry = self._timers.pop(int(timer_id), None)
+        if entry:
+            entry[0].cancel()
+        return {"cancelled": entry is not None}
+
+    def cancel_all(self):
+        with self._lock:
+            timers = list(self._timers.values())
+            self._timers.clear()
+        for timer, _, _ in timers:
+            timer.cancel()
+
+    def _fire(self, timer_id: int, message: str):
+        with self._lock:
+            self._timers.pop(timer_id, None)
+        self.on_fire(message)
+
+
+def default_registry(
+    clipboard_get: Optional[Callable[[], str]] = None,
+    clipboard_set: Optional[Callable[[str], None]] = None,
+    timers: Optional[TimerService] = None,
+) -> ToolRegistry:
+    """
+    建立內建工具登錄表。剪貼簿與計時器需要 GUI 端提供（剪貼簿只能在 GUI 執行緒存取）。
+    """
+    registry = ToolRegistry()
+    registry.register(Tool(
+        "get_current_time",
+        "取得目前的本機日期與時間",
+        lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S (%A)"),
+        timeout=1.0,
+    ))
+    registry.register(Tool(
+        "search_files",
+        "在使用者的檔案中依檔名搜尋（支援 * ? 萬用字元），回傳完整路徑",
+        search_files,
+        {
+            "type": "OBJECT",
+            "properties": {
+                "pattern": {"type": "STRING", "description": "檔名樣式，例如 *.pdf 或 報告"},
+                "directory": {"type": "STRING", "description": "只搜尋此目錄（選填）"},
+                "max_results": {"type": "INTEGER", "description": "最多回傳幾筆（預設 20）"},
+            },
+            "required": ["pattern"],
+        },
+        timeout=8.0,
+    ))
+    registry.register(Tool(
+        "run_command",
+        "執行允許清單中的唯讀系統查詢指令（ipconfig、ipconfig /all、tasklist、ping -n 2 主機 等），回傳輸出",
+        run_command,
+        {
+            "type": "OBJECT",
+            "properties": {"command": {"type": "STRING", "description": "完整指令，例如 ping -n 2 example.com"}},
+            "required": ["command"],
+        },
+        timeout=10.0,
+    ))
+    if clipboard_get is not None:
+        registry.register(Tool("read_clipboard", "讀取剪貼簿中的文字", lambda: clipboard_get()[:_MAX_OUTPUT_CHARS], timeout=3.0))
+    if clipboard_set is not None:
+        def write_clipboard(text: str) -> Dict[str, Any]:
+            clipboard_set(text)
+            return {"copied_chars": len(text)}
+
+        registry.register(Tool(
+            "write_clipboard",
+            "將文字複製到剪貼簿",
+            write_clipboard,
+            {
+                "type": "OBJECT",
+                "properties": {"text": {"type": "STRING", "description": "要複製的文字"}},
+                "required": ["text"],
+            },
+            timeout=3.0,
+        ))
+    if timers is not None:
+        registry.register(Tool(
+            "set_timer",
+            "設定計時提醒，時間到時角色會提醒使用者",
+            timers.set_timer,
+            {
+                "type": "OBJECT",
+                "properties": {
+                    "seconds": {"type": "NUMBER", "description": "幾秒後提醒"},
+                    "message": {"type": "STRING", "description": "提醒內容"},
+                },
+                "required": ["seconds", "message"],
+            },
+            timeout=1.0,
+        ))
+        registry.register(Tool("list_timers", "列出尚未到期的計時提醒", timers.list_timers, timeout=1.0))
+        registry.register(Tool(
+            "cancel_timer",
+            "取消計時提醒",
+            timers.cancel_timer,
+            {
+                "type": "OBJECT",
+                "properties": {"timer_id": {"type": "INTEGER", "description": "set_timer 回傳的 timer_id"}},
+                "required": ["timer_id"],
+            },
+            timeout=1.0,
+        ))
+    return registry
+
+
+def plain_args(value: Any) -> Any:
+    """將 SDK 回傳的 function call 參數（MapComposite / RepeatedComposite）轉成一般 dict / list"""
+    if hasattr(value, "items"):
+        return {k: plain_args(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)) or (hasattr(value, "__iter__") and not isinstance(value, (str, bytes))):
+        return [plain_args(v) for v in value]
+    if isinstance(value, float) and value.is_integer():
+        # JSON 數字一律為 float；整數參數（max_results、timer_id）還原為 int
+        return int(value)
+    return value
@@ -0,0 +1,285 @@
+"""
+虛擬化文字檢視模組 - 只排版與繪製可見段落的長對話紀錄檢視
+離屏內容只以純文字保存；排版物件（QTextLayout）數量有上限，與內容長度無關。
+"""
+from __future__ import annotations
+
+import bisect
+import math
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from PyQt6.QtCore import QPointF, Qt
+from PyQt6.QtGui import QColor, QFont, QFontMetricsF, QPainter, QTextLayout, QTextOption
+from PyQt6.QtWidgets import QAbstractScrollArea, QFrame
+
+
+# 段落樣式
+STYLE_BODY = 0
+STYLE_USER_HEADER = 1
+STYLE_ASSISTANT_HEADER = 2
+
+_HEADER_COLORS = {
+    STYLE_USER_HEADER: QColor(60, 110, 220),
+    STYLE_ASSISTANT_HEADER: QColor(220, 110, 60),
+}
+
+
+class VirtualTextView(QAbstractScrollArea):
+    """
+    虛擬化的長文字 / 對話紀錄檢視。
+
+    - 文字以段落為單位存放在 list[str]，樣式存放在 bytearray
+    - 每個段落的高度先以字數估算，實際排版後才換成精確值
+    - 只有可見（與鄰近）段落會建立 QTextLayout，並以 LRU 保留固定數量
+    """
+
+    def __init__(self, parent=None, font: Optional[QFont] = None, max_cached_layouts: int = 64):
+        super().__init__(parent)
+        self.setFrameShape(QFrame.Shape.NoFrame)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+        self.viewport().setAutoFillBackground(False)
+        self.setStyleSheet("background: transparent;")
+
+        self._font = font or QFont("Microsoft YaHei", 10)
+        self._header_font = QFont(self._font)
+        self._header_font.setBold(True)
+        self._padding = 10
+        self._paragraph_spacing = 4
+        self._text_color = QColor(0, 0, 0)
+
+        # 文字儲存
+        self._paragraphs: List[str] = []
+        self._styles = bytearray()
+
+        # 高度：精確值（已排版）或估算值；prefix 於變動後延遲重算
+        self._heights: List[float] = []
+        self._exact = bytearray()
+        self._prefix: List[float] = [0.0]
+        self._prefix_dirty = False
+
+        # 排版快取（段落索引 -> QTextLayout），數量上限固定
+        self._layouts: "OrderedDict[int, QTextLayout]" = OrderedDict()
+        self._max_cached_layouts = max_cached_layouts
+        self._layout_width = -1.0
+        self._stick_to_bottom = True
+
+        self._update_metrics()
+
+    # ---- 內容 API ----
+
+    def clear(self):
+        """清除所有內容"""
+        self._paragraphs.clear()
+        self._styles = bytearray()
+        self._heights.clear()
+        self._exact = bytearray()
+        self._layouts.clear()
+        self._prefix = [0.0]
+        self._prefix_dirty = False
+        self._stick_to_bottom = True
+        self._sync_scrollbar()
+        self.viewport().update()
+
+    def set_entries(self, entries: Iterable[Tuple[str, str]]):
+        """以 (角色, 內容) 清單重設內容；角色為 "user" 或 "assistant" """
+        self.clear()
+        for role, content in entries:
+            self.append_message(role, content, update=False)
+        self._sync_scrollbar()
+        self.scroll_to_bottom()
+
+    def append_message(self, role: str, content: str, update: bool = True):
+        """附加一則訊息（標題段落 + 內容段落）"""
+        header = "你" if role == "user" else "助手"
+        style = STYLE_USER_HEADER if role == "user" else STYLE_ASSISTANT_HEADER
+        self._append_paragraph(header, style)
+        for line in content.split("\n"):
+            self._append_paragraph(line, STYLE_BODY)
+        if update:
+            self._after_content_change()
+
+    def append_delta(self, delta: str):
+        """串流追加文字到最後一個段落（遇到換行時開新段落）"""
+        if not delta:
+            return
+        lines = delta.split("\n")
+        if self._paragraphs and self._styles[-1] == STYLE_BODY:
+            last = len(self._paragraphs) - 1
+            self._paragraphs[last] += lines[0]
+            self._invalidate_paragraph(last)
+        else:
+            self._append_paragraph(lines[0], STYLE_BODY)
+        for line in lines[1:]:
+            self._append_paragraph(line, STYLE_BODY)
+        self._after_content_change()
+
+    def scroll_to_bottom(self):
+        self._ensure_prefix()
+        self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+        self._stick_to_bottom = True
+
+    def stats(self) -> Dict[str, int]:
+        """內容與快取統計（用於確認排版物件數量不隨內容成長）"""
+        return {
+            "paragraphs": len(self._paragraphs),
+            "chars": sum(len(p) for p in self._paragraphs),
+            "cached_layouts": len(self._layouts),
+            "exact_heights": sum(self._exact),
+            "content_height": int(self._content_height()),
+        }
+
+    # ---- 高度管理 ----
+
+    def _update_metrics(self):
+        fm = QFontMetricsF(self._font)
+        self._line_height = fm.lineSpacing()
+        self._latin_width = max(1.0, fm.averageCharWidth())
+        self._cjk_width = max(1.0, fm.horizontalAdvance("中"))
+
+    def _text_width(self) -> float:
+        return max(20.0, self.viewport().width() - self._padding * 2)
+
+    def _estimate_height(self, text: str) -> float:
+        if not text:
+            return self._line_height + self._paragraph_spacing
+        cjk = sum(1 for ch in text if ord(ch) > 0x2E80)
+        width = cjk * self._cjk_width + (len(text) - cjk) * self._latin_width
+        lines = max(1, math.ceil(width / self._text_width()))
+        return lines * self._line_height + self._paragraph_spacing
+
+    def _append_paragraph(self, text: str, style: int):
+        self._paragraphs.append(text)
+        self._styles.append(style)
+        self._heights.append(self._estimate_height(text))
+        self._exact.append(0)
+        self._prefix_dirty = True
+
+    def _invalidate_paragraph(self, index: int):
+        self._layouts.pop(index, None)
+        self._heights[index] = self._estimate_height(self._paragraphs[index])
+        self._exact[index] = 0
+        self._prefix_dirty = True
+
+    def _ensure_prefix(self):
+        if not self._prefix_dirty:
+            return
+        prefix = [0.0] * (len(self._heights) + 1)
+        total = 0.0
+        for i, h in enumerate(self._heights):
+            total += h
+            prefix[i + 1] = total
+        self._prefix = prefix
+        self._prefix_dirty = False
+        self._sync_scrollbar()
+
+    def _content_height(self) -> float:
+        self._ensure_prefix()
+        return self._prefix[-1] + self._padding * 2
+
+    def _sync_scrollbar(self):
+        bar = self.verticalScrollBar()
+        viewport_h = self.viewport().height()
+        total = self._prefix[-1] + self._padding * 2 if not self._prefix_dirty else 0
+        bar.setPageStep(viewport_h)
+        bar.setSingleStep(max(1, int(self._line_height)))
+        bar.setRange(0, max(0, int(total - viewport_h)))
+
+    def _after_content_change(self):
+        at_bottom = self._stick_to_bottom
+        self._ensure_prefix()
+        if at_bottom:
+            self.scroll_to_bottom()
+        self.viewport().update()
+
+    # ---- 排版 ----
+
+    def _layout_for(self, index: int) -> QTextLayout:
+        layout = self._layouts.get(index)
+        if layout is not None:
+            self._layouts.move_to_end(index)
+            return layout
+
+        style = self._styles[index]
+        layout = QTextLayout(self._paragraphs[index], self._header_font if style else self._font)
+        option = QTextOption()
+        option.setWrapMode(QTextOption.WrapMode.WrapAtWordBoundaryOrAnywhere)
+        layout.setTextOption(option)
+        width = self._text_width()
+        y = 0.0
+        layout.beginLayout()
+        while True:
+            line = layout.createLine()
+            if not line.isValid():
+                break
+            line.setLineWidth(width)
+            line.setPosition(QPointF(0, y))
+            y += line.height()
+        layout.endLayout()
+
+        height = max(y, self._line_height) + self._paragraph_spacing
+        if not self._exact[index] or abs(self._heights[index] - height) > 0.5:
+            self._heights[index] = height
+            self._exact[index] = 1
+            self._prefix_dirty = True
+
+        self._layouts[index] = layout
+        while len(self._layouts) > self._max_cached_layouts:
+            self._layouts.popitem(last=False)
+        return layout
+
+    # ---- Qt 事件 ----
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        width = self._text_width()
+        if abs(width - self._layout_width) > 0.5:
+            # 寬度改變：所有排版與精確高度失效，回到估算值
+            self._layout_width = width
+            self._layouts.clear()
+            self._heights = [self._estimate_height(p) for p in self._paragraphs]
+            self._exact = bytearray(len(self._paragraphs))
+            self._prefix_dirty = True
+        self._ensure_prefix()
+        self._sync_scrollbar()
+
+    def scrollContentsBy(self, dx: int, dy: int):
+        bar = self.verticalScrollBar()
+        self._stick_to_bottom = bar.value() >= bar.maximum()
+        self.viewport().update()
+
+    def paintEvent(self, event):
+        self._ensure_prefix()
+        painter = QPainter(self.viewport())
+        painter.setPen(self._text_color)
+
+        top = self.verticalScrollBar().value() - self._padding
+        bottom = top + self.viewport().height()
+        first = max(0, bisect.bisect_right(self._prefix, top) - 1)
+
+        heights_changed = False
+        i = first
+        y = self._prefix[first] if self._paragraphs else 0.0
+        while i < len(self._paragraphs) and y <= bottom:
+            before = self._heights[i]
+            layout = self._layout_for(i)
+            if self._heights[i] != before:
+                heights_changed = True
+            style = self._styles[i]
+            if style in _HEADER_COLORS:
+                painter.setPen(_HEADER_COLORS[style])
+            layout.draw(painter, QPointF(self._padding, y - top))
+            if style in _HEADER_COLORS:
+                painter.setPen(self._text_color)
+            # 以（可能剛更新的）精確高度累加，避免本次繪製中段落重疊
+            y += self._heights[i]
+            i += 1
+        painter.end()
+
+        if heights_changed:
+            # 精確高度與估算不同：更新捲軸範圍並重繪（下一次繪製會使用精確位置）
+            self._ensure_prefix()
+            if self._stick_to_bottom:
+                self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+            self.viewport().update()
@@ -0,0 +1,45 @@
+"""長期記憶：寫入中斷後重新開啟時，問答與向量仍一一對應"""
+from src.memory_index import ConversationMemory, _TURNS_FILE, _VECTORS_FILE
+
+
+def _reopen(directory):
+    memory = ConversationMemory(directory)
+    memory.close()
+    return memory
+
+
+def test_torn_line_in_middle_keeps_later_turns(tmp_path):
+    memory = ConversationMemory(tmp_path)
+    memory.add_turns_sync([("貓喜歡什麼", "貓喜歡曬太陽")])
+    memory.close()
+    with open(tmp_path / _TURNS_FILE, "a", encoding="utf-8") as f:
+        f.write('{"t": 1, "user": "半')
+    memory = ConversationMemory(tmp_path)
+    memory.add_turns_sync([("天氣如何", "今天晴天")])
+    memory.close()
+
+    for _ in range(2):
+        memory = _reopen(tmp_path)
+        assert len(memory) == 2
+        assert len(memory.index) == 2
+        assert memory.recall("天氣")[0].assistant == "今天晴天"
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    memory = ConversationMemory(tmp_path)
+    memory.add_turns_sync([("貓喜歡什麼", "貓喜歡曬太陽"), ("狗喜歡什麼", "狗喜歡散步")])
+    memory.close()
+    # 模擬向量已寫入、問答只寫了一半就中斷
+    with open(tmp_path / _VECTORS_FILE, "ab") as f:
+        f.write(memory.embedder.embed(["中斷"]).tobytes())
+    with open(tmp_path / _TURNS_FILE, "a", encoding="utf-8") as f:
+        f.write('{"t": 1, "user": "中')
+
+    memory = ConversationMemory(tmp_path)
+    assert len(memory) == 2 and len(memory.index) == 2
+    memory.add_turns_sync([("天氣如何", "今天晴天")])
+    memory.close()
+
+    memory = _reopen(tmp_path)
+    assert len(memory) == 3 and len(memory.index) == 3
+    assert memory.recall("狗")[0].assistant == "狗喜歡散步"
@@ -0,0 +1,116 @@
+"""動作佇列：以模擬時鐘驗證合併、優先度、過期與佇列滿時的丟棄"""
+import pytest
+
+from src.motion_queue import MotionPriority, MotionQueue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def played():
+    return []
+
+
+@pytest.fixture
+def queue(clock, played):
+    def start(request):
+        played.append((request.group, request.index))
+        return True
+
+    q = MotionQueue(start, coalesce_sec=1.5, max_wait_sec=8.0, max_pending=3, time_fn=clock)
+    q.set_motions({
+        "Idle": [{"Duration": 4.0}],
+        "Tap": [{"Duration": 2.0}, {"Duration": 2.0}],
+        "Talk": [{"Duration": 1.0}],
+    })
+    return q
+
+
+def test_repeated_taps_on_same_key_coalesce(queue, clock, played):
+    assert queue.submit("Tap", 0, key="head") == "started"
+    clock.now = 1.0
+    assert queue.submit("Tap", 0, key="head") == "coalesced"
+    # 超過 coalesce_sec 後不再合併進播放中的動作，而是排隊
+    clock.now = 1.75
+    assert queue.submit("Tap", 0, key="head") == "queued"
+    assert queue.submit("Tap", 1, MotionPriority.LLM, key="head") == "coalesced"
+    assert queue.pending == 1
+    assert queue.stats.coalesced == 2
+    assert played == [("Tap", 0)]
+
+
+def test_higher_priority_interrupts_and_lower_waits(queue, clock, played):
+    assert queue.submit("Tap", 0) == "started"
+    assert queue.submit("Tap", 1) == "queued"
+    assert queue.submit("Talk", 0, MotionPriority.LLM) == "started"
+    assert queue.stats.interrupted == 1
+    assert queue.submit("Idle", 0, MotionPriority.IDLE) == "dropped"
+
+    assert not queue.pump()
+    clock.now = 1.0  # Talk 長度 1 秒
+    assert queue.pump()
+    assert played == [("Tap", 0), ("Talk", 0), ("Tap", 1)]
+    assert queue.stats.wait_ms == [1000.0]
+
+
+def test_pump_picks_highest_priority_then_oldest(queue, clock, played):
+    queue.submit("Talk", 0, MotionPriority.LLM)
+    clock.now = 0.25
+    queue.submit("Tap", 0)
+    clock.now = 0.5
+    queue.submit("Tap", 1)
+    queue.submit("Talk", 0, MotionPriority.LLM)
+
+    for step in (1.0, 2.0, 4.0, 6.0):
+        clock.now = step
+        queue.pump()
+    assert played == [("Talk", 0), ("Talk", 0), ("Tap", 0), ("Tap", 1)]
+
+
+def test_stale_requests_expire(queue, clock, played):
+    queue.submit("Tap", 0)
+    queue.submit("Tap", 1)
+    clock.now = 8.0
+    assert not queue.pump()
+    assert queue.pending == 0 and queue.stats.expired == 1
+    assert played == [("Tap", 0)]
+
+
+def test_full_queue_evicts_oldest_lowest_priority(queue, clock, played):
+    queue.submit("Talk", 0, MotionPriority.LLM)
+    for i in range(3):
+        clock.now = i * 0.125
+        queue.submit("Tap", i % 2, key=f"area{i}")
+    assert queue.pending == 3
+
+    # 較低優先度的新請求不會擠掉較高優先度的請求；同優先度時丟棄最舊的
+    assert queue.submit("Tap", 0, key="area3") == "queued"
+    assert sorted(r.key for r in queue._pending) == ["area1", "area2", "area3"]
+    assert queue.stats.dropped == 1
+    assert queue.stats.max_depth == 3
+
+
+def test_full_queue_of_higher_priority_drops_new_request(queue, clock):
+    queue.submit("Talk", 0, MotionPriority.LLM)
+    for _ in range(3):
+        assert queue.submit("Talk", 0, MotionPriority.LLM) in ("started", "queued")
+    assert queue.submit("Tap", 0) == "dropped"
+    assert queue.pending == 3
+
+
+def test_failed_start_is_reported(clock):
+    queue = MotionQueue(lambda request: False, time_fn=clock)
+    assert queue.submit("Tap", 0) == "failed"
+    assert not queue.busy()
+    assert queue.stats.failed == 1
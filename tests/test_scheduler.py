@@ -0,0 +1,153 @@
+"""集中排程：以模擬時鐘驗證工作順序、合併喚醒與計時器週期"""
+import random
+
+import pytest
+from PyQt6.QtCore import QCoreApplication
+
+from src.scheduler import Scheduler, TaskQueue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def sched(app, clock):
+    scheduler = Scheduler(time_fn=clock)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def advance(sched, clock, until: float, step: float = 1 / 64):
+    """推進模擬時鐘，逐步執行到期的工作（取代 QTimer 喚醒；間隔皆取 2 的冪次分數，避免浮點誤差）"""
+    while clock.now < until - 1e-9:
+        clock.now += step
+        sched.queue.run_due()
+
+
+def test_task_queue_runs_due_tasks_in_due_order(clock):
+    queue = TaskQueue(clock)
+    calls = []
+    # deadline 順序（b 的 slack 較小）與 due 順序不同：執行時依 due
+    queue.call_at(1.0, lambda: calls.append("a"), slack=0.5)
+    queue.call_at(1.2, lambda: calls.append("b"), slack=0.0)
+    queue.call_at(5.0, lambda: calls.append("c"))
+    assert queue.next_deadline() == 1.2
+
+    clock.now = 1.3
+    assert queue.run_due() == 2
+    assert calls == ["a", "b"]
+    assert queue.coalesced == 1
+    assert len(queue) == 1 and queue.next_deadline() == 5.0
+
+
+def test_task_queue_cancel_skips_task(clock):
+    queue = TaskQueue(clock)
+    calls = []
+    task = queue.call_at(1.0, lambda: calls.append("a"))
+    queue.call_at(2.0, lambda: calls.append("b"))
+    queue.cancel(task)
+    queue.cancel(task)
+    assert len(queue) == 1
+    assert queue.next_deadline() == 2.0
+    clock.now = 3.0
+    queue.run_due()
+    assert calls == ["b"]
+
+
+def test_task_queue_failing_task_does_not_block_others(clock):
+    queue = TaskQueue(clock)
+    calls = []
+
+    def boom():
+        raise RuntimeError("boom")
+
+    queue.call_at(1.0, boom)
+    queue.call_at(1.0, lambda: calls.append("ok"))
+    clock.now = 1.0
+    assert queue.run_due() == 2
+    assert calls == ["ok"]
+
+
+def test_single_shot_timer_fires_once(sched, clock):
+    calls = []
+    timer = sched.timer(lambda: calls.append(clock.now))
+    timer.start(125)
+    assert timer.isActive() and timer.remainingTime() == 125
+    advance(sched, clock, 1.0)
+    assert calls == [0.125]
+    assert not timer.isActive() and timer.remainingTime() == -1
+
+
+def test_periodic_timer_keeps_period(sched, clock):
+    calls = []
+    timer = sched.timer(lambda: calls.append(clock.now), single_shot=False)
+    timer.start(250)
+    advance(sched, clock, 1.0)
+    assert calls == [0.25, 0.5, 0.75, 1.0]
+    timer.stop()
+    advance(sched, clock, 2.0)
+    assert len(calls) == 4 and not timer.isActive()
+
+
+def test_periodic_timer_survives_callback_exception(sched, clock):
+    calls = []
+
+    def sample():
+        calls.append(clock.now)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+
+    timer = sched.timer(sample, single_shot=False)
+    timer.start(125)
+    advance(sched, clock, 0.4)
+    assert calls == [0.125, 0.25, 0.375]
+    assert timer.isActive() and timer.remainingTime() >= 0
+    assert len(sched.queue) == 1
+
+
+def test_stop_inside_callback_ends_periodic_timer(sched, clock):
+    calls = []
+    timer = sched.timer(lambda: (calls.append(clock.now), timer.stop()), single_shot=False)
+    timer.start(125)
+    advance(sched, clock, 0.5)
+    assert calls == [0.125]
+    assert not timer.isActive() and len(sched.queue) == 0
+
+
+def test_jitter_stays_within_bounds(sched, clock):
+    random.seed(1234)
+    timer = sched.timer(lambda: None, jitter=0.2)
+    delays = set()
+    for _ in range(50):
+        timer.start(1000)
+        remaining = timer.remainingTime()
+        assert 800 <= remaining <= 1200
+        delays.add(remaining)
+    timer.stop()
+    assert len(delays) > 1
+
+
+def test_slack_lets_timers_share_a_wakeup(sched, clock):
+    calls = []
+    sched.timer(lambda: calls.append("a"), slack=0.5).start(1000)
+    sched.timer(lambda: calls.append("b")).start(1400)
+    # a 的期限延到 1.5 秒，與 b（1.4 秒）在同一次喚醒執行
+    assert sched.queue.next_deadline() == pytest.approx(1.4)
+    clock.now = 1.4
+    assert sched.queue.run_due() == 2
+    assert calls == ["a", "b"]
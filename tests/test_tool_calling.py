@@ -0,0 +1,163 @@
+"""本機工具：指令允許清單、檔案搜尋的根目錄限制與並行執行器"""
+import os
+import subprocess
+import threading
+import time
+
+import pytest
+
+from src import tool_calling
+from src.tool_calling import Tool, ToolCall, ToolExecutor, ToolRegistry, run_command, search_files
+
+
+@pytest.fixture
+def executed(monkeypatch):
+    """以假的 subprocess.run 記錄實際會執行的 argv（不真的執行指令）"""
+    calls = []
+
+    def fake_run(argv, **kwargs):
+        calls.append(argv)
+        return subprocess.CompletedProcess(argv, 0, stdout="ok", stderr="")
+
+    monkeypatch.setattr(tool_calling.subprocess, "run", fake_run)
+    monkeypatch.delenv("TOOL_ALLOWED_COMMANDS", raising=False)
+    return calls
+
+
+@pytest.mark.parametrize("command", [
+    "whoami",
+    "WHOAMI.exe",
+    "ipconfig /all",
+    "ping -n 2 example.com",
+    "ping -c 3 192.168.0.1",
+    "uname -a",
+    "df -h",
+])
+def test_run_command_allows_listed_forms(executed, command):
+    assert run_command(command) == {"exit_code": 0, "output": "ok"}
+    assert executed[-1] == command.split()
+
+
+@pytest.mark.parametrize("command", [
+    "/usr/bin/whoami",
+    "./whoami",
+    "../bin/uname -a",
+])
+def test_run_command_rejects_path_qualified_programs(executed, command):
+    with pytest.raises(PermissionError):
+        run_command(command)
+    assert executed == []
+
+
+@pytest.mark.parametrize("command", [
+    "whoami /all extra",
+    "hostname evil-name",
+    "ipconfig /release",
+    "ping -n 2 -f example.com",
+    "ping -n 2 --flood",
+    "ping -n 20 example.com",
+    "ping -n 2 example.com extra",
+    "uname -a -r",
+    "df /etc",
+    "df -h; rm -rf /",
+    "rm -rf /",
+    "",
+])
+def test_run_command_rejects_extra_or_option_like_arguments(executed, command):
+    with pytest.raises((PermissionError, ValueError)):
+        run_command(command)
+    assert executed == []
+
+
+def test_allowed_commands_override(executed, monkeypatch):
+    monkeypatch.setenv("TOOL_ALLOWED_COMMANDS", "whoami,echo")
+    run_command("whoami")
+    with pytest.raises(PermissionError):
+        run_command("hostname")
+    # 不在參數表中的指令只能不帶參數執行
+    run_command("echo")
+    with pytest.raises(PermissionError):
+        run_command("echo hello")
+    assert executed == [["whoami"], ["echo"]]
+
+
+@pytest.fixture
+def search_root(tmp_path, monkeypatch):
+    root = tmp_path / "root"
+    (root / "docs").mkdir(parents=True)
+    (root / "docs" / "report.pdf").write_text("x")
+    (tmp_path / "root2").mkdir()
+    (tmp_path / "root2" / "secret.pdf").write_text("x")
+    monkeypatch.setenv("TOOL_SEARCH_ROOTS", str(root))
+    return root
+
+
+def test_search_files_within_roots(search_root):
+    assert search_files("*.pdf")["files"] == [str((search_root / "docs" / "report.pdf").resolve())]
+    assert len(search_files("report", directory=str(search_root / "docs"))["files"]) == 1
+
+
+@pytest.mark.parametrize("directory", [
+    "{tmp}",
+    "{tmp}/root2",
+    "{tmp}/root/../root2",
+    "/",
+])
+def test_search_files_rejects_directories_outside_roots(search_root, directory):
+    with pytest.raises(PermissionError):
+        search_files("*.pdf", directory=directory.format(tmp=search_root.parent))
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="需要符號連結")
+def test_search_files_rejects_symlink_escaping_roots(search_root):
+    link = search_root / "outside"
+    try:
+        link.symlink_to(search_root.parent / "root2", target_is_directory=True)
+    except OSError:
+        pytest.skip("無法建立符號連結")
+    with pytest.raises(PermissionError):
+        search_files("*.pdf", directory=str(link))
+
+
+@pytest.fixture
+def executor():
+    release = threading.Event()
+    registry = ToolRegistry()
+    registry.register(Tool("slow", "", lambda: release.wait(5) and "slow", timeout=0.2))
+    registry.register(Tool("fast", "", lambda delay=0.0: time.sleep(delay) or f"fast {delay}", timeout=2.0))
+    registry.register(Tool("boom", "", lambda: 1 / 0, timeout=2.0))
+    executor = ToolExecutor(registry, max_workers=4)
+    yield executor
+    release.set()
+    executor.shutdown()
+
+
+def test_run_iter_yields_in_completion_order_and_times_out(executor):
+    calls = [
+        ToolCall("slow", {}),
+        ToolCall("fast", {"delay": 0.1}),
+        ToolCall("missing", {}),
+        ToolCall("fast", {"delay": 0.0}),
+        ToolCall("boom", {}),
+    ]
+    started = time.perf_counter()
+    results = list(executor.run_iter(calls))
+    elapsed = time.perf_counter() - started
+
+    names = [(r.call.name, r.call.args.get("delay")) for r in results]
+    assert names[0] == ("missing", None)
+    assert names.index(("fast", 0.0)) < names.index(("fast", 0.1))
+    assert names[-1] == ("slow", None)
+    assert results[-1].error == "執行逾時"
+    assert elapsed < 1.0
+    by_name = {r.call.name: r for r in results}
+    assert by_name["missing"].error.startswith("未知的工具")
+    assert "division by zero" in by_name["boom"].error
+
+
+def test_run_all_returns_results_in_call_order(executor):
+    calls = [ToolCall("fast", {"delay": 0.1}), ToolCall("fast", {"delay": 0.0}), ToolCall("fast", {"bad": 1})]
+    results = executor.run_all(calls)
+    assert [r.call for r in results] == calls
+    assert [r.output for r in results[:2]] == ["fast 0.1", "fast 0.0"]
+    assert results[2].error.startswith("參數錯誤")